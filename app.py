@@ -1,30 +1,97 @@
-import ccxt
+import numpy as np
+import orjson
 import pandas as pd
 import requests
 from datetime import datetime, timedelta
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, redirect, send_from_directory, url_for
 import time
+import gzip
+import hashlib
+import os
 import plotly.graph_objs as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import pytz
+from modules.api import BASE_URL, CRYPTOCOMPARE_URL, REPLAY_SPEED, fetch_data_with_retry, make_exchange
+from modules.shared_snapshot import open_snapshot, read_state, serving_role
+from modules.range_index import PriceRangeIndex
+from modules.rolling_stats import MAX_DRAWDOWN_WINDOW, compute_window_stats
+from modules.correlation import CorrelationEngine, load_aligned
+from modules.alerts import AlertEngine, connect_engine
+from modules import price_feed
+from modules.orderbook import OrderBookStore, TradeTape, store_path, vwap_to_fill
+from modules.fx import QuoteConverter
+from modules.forecasting import MAX_HORIZON, ForecastEngine
+from modules.analytics_cache import analytics_cache
+from modules.coin_registry import coin_registry
+from modules.export import FORMATS, export_chunks, parse_time
+from modules.chart_renderer import ChartRenderer
+from modules.anomaly import AnomalyDetector
+from modules.decoding import decode_market_chart, decode_records, ms_to_datetime, ohlcv_frame
+from modules.portfolio import Portfolio
+from modules.candle_store import latest_timestamp, store_version
+from modules.arbitrage import scanner_from_env
+from modules.volume_profile import candle_profile, volume_profiles
+from modules.pyramid import candle_pyramid
+from modules import replay
+from modules.replay import timeframe_ms
+
+try:
+    import brotli  # Optional: enables 'br' responses when installed
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
-# Function to fetch data with retries for exchanges
-def fetch_data_with_retry(exchange, symbol, timeframe, limit=100):
-    retries = 5
-    for attempt in range(retries):
-        try:
-            data = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-            return data
-        except Exception as e:
-            print(f"Attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                print("Max retries reached for fetching data.")
-                return None
+# Only text-like payloads above this size are worth compressing
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript')
+MIN_COMPRESS_SIZE = 500
+
+
+# Function to pick the best encoding the client accepts
+def negotiate_encoding(accept_encodings):
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+# Function to add content-hash ETags, answer conditional requests with 304 and compress the body
+@app.after_request
+def finalize_response(response):
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return response
+    response.headers.setdefault('Cache-Control', 'no-cache')
+
+    body = response.get_data()
+    compress = (response.mimetype.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_SIZE
+                and 'Content-Encoding' not in response.headers)
+    encoding = negotiate_encoding(request.accept_encodings) if compress else None
+
+    # The ETag names the representation, so each encoding gets its own tag
+    etag = hashlib.sha1(body).hexdigest()
+    if encoding:
+        etag = f'{etag}-{encoding}'
+    response.set_etag(etag)
+    if compress:
+        response.vary.add('Accept-Encoding')
+
+    # If-None-Match uses weak comparison (RFC 7232), so W/"..." from proxies still matches
+    if request.if_none_match.contains_weak(etag):
+        response.status_code = 304
+        response.set_data(b'')
+        response.headers.pop('Content-Length', None)
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=5))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(body, compresslevel=6))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
 
 # Function to fetch data from CoinGecko with retries and rate limit handling
 def fetch_data_with_retry_coingecko(url, params, retries=5):
@@ -33,7 +100,7 @@ def fetch_data_with_retry_coingecko(url, params, retries=5):
             print(f"Fetching data... Attempt {attempt + 1}/{retries}")
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()  # Raise an exception for HTTP errors
-            data = response.json()
+            data = decode_market_chart(response.content)  # Price pairs as a float64 [n, 2] array
             print("Data fetched successfully!")
             return data
         except requests.exceptions.HTTPError as e:
@@ -58,49 +125,81 @@ def fetch_data_with_retry_coingecko(url, params, retries=5):
                 return None
 
 # Function to analyze the best trading opportunities
-def analyze_trading_opportunities(data):
+def analyze_trading_opportunities(data, series_id=None):
     if "prices" not in data:
         print("No price data available for analysis.")
         return None
 
-    prices = data["prices"]  # List of [timestamp, price] pairs
-    if not prices:
+    prices = data["prices"]  # [n, 2] array of [timestamp, price] pairs
+    if not len(prices):
         print("Price data is empty.")
         return None
-
-    min_price = float('inf')
-    max_profit = 0
-    buy_time = None
-    sell_time = None
-    best_buy_price = None
-    best_sell_price = None
-
-    for timestamp, price in prices:
-        if price < min_price:
-            min_price = price
-            buy_time = timestamp
-            best_buy_price = price
-
-        profit = price - min_price
-        if profit > max_profit:
-            max_profit = profit
-            sell_time = timestamp
-            best_sell_price = price
-
-    if max_profit > 0:
-        return {
-            "best_buy_time": datetime.utcfromtimestamp(buy_time / 1000),
-            "best_buy_price": best_buy_price,
-            "best_sell_time": datetime.utcfromtimestamp(sell_time / 1000),
-            "best_sell_price": best_sell_price,
-            "max_profit": max_profit
-        }
-    else:
+    timestamps, values = prices[:, 0], prices[:, 1]
+
+    def init():
+        return {"min_price": float('inf'), "max_profit": 0, "buy_time": None, "sell_time": None,
+                "best_buy_price": None, "best_sell_price": None, "max_price": float('-inf'), "max_time": None}
+
+    # Resumable scan over points start:stop: running minimum and best profit against it,
+    # keeping the first point that reaches each new extreme
+    def extend(state, start, stop):
+        chunk = values[start:stop]
+        if not len(chunk):
+            return state
+        running_min = np.minimum.accumulate(np.minimum(chunk, state["min_price"]))
+        lowest = int(np.argmin(chunk))
+        if chunk[lowest] < state["min_price"]:
+            state["min_price"] = float(chunk[lowest])
+            state["buy_time"] = timestamps[start + lowest]
+            state["best_buy_price"] = float(chunk[lowest])
+        highest = int(np.argmax(chunk))
+        if chunk[highest] > state["max_price"]:
+            state["max_price"] = float(chunk[highest])
+            state["max_time"] = timestamps[start + highest]
+
+        profits = chunk - running_min
+        best = int(np.argmax(profits))
+        if profits[best] > state["max_profit"]:
+            state["max_profit"] = float(profits[best])
+            state["sell_time"] = timestamps[start + best]
+            state["best_sell_price"] = float(chunk[best])
+        return state
+
+    # Best profit over two adjacent stretches: either side's own, or buying at the left's low and
+    # selling at the right's high
+    def merge(left, right):
+        state = dict(left)
+        if right["min_price"] < left["min_price"]:
+            state.update(min_price=right["min_price"], buy_time=right["buy_time"],
+                         best_buy_price=right["best_buy_price"])
+        if right["max_price"] > left["max_price"]:
+            state.update(max_price=right["max_price"], max_time=right["max_time"])
+        cross = right["max_price"] - left["min_price"]
+        if right["max_profit"] > state["max_profit"] and right["max_profit"] >= cross:
+            state.update(max_profit=right["max_profit"], sell_time=right["sell_time"],
+                         best_sell_price=right["best_sell_price"])
+        elif cross > state["max_profit"]:
+            state.update(max_profit=float(cross), sell_time=right["max_time"], best_sell_price=right["max_price"])
+        return state
+
+    def finalize(state):
+        if state["max_profit"] > 0:
+            return {
+                "best_buy_time": datetime.utcfromtimestamp(state["buy_time"] / 1000),
+                "best_buy_price": state["best_buy_price"],
+                "best_sell_time": datetime.utcfromtimestamp(state["sell_time"] / 1000),
+                "best_sell_price": state["best_sell_price"],
+                "max_profit": state["max_profit"]
+            }
         return None
 
+    if series_id is None:
+        return finalize(extend(init(), 0, len(values)))
+    return analytics_cache.compute('trading_opportunities', series_id, timestamps, (), init, extend, finalize, merge)
+
 # Function to fetch 100-day historical data from CryptoCompare
 def fetch_100_day_historical_data(symbol, currency='USD'):
-    url = "https://min-api.cryptocompare.com/data/v2/histoday"
+    url = f"{CRYPTOCOMPARE_URL}/histoday"
     params = {
         'fsym': symbol,
         'tsym': currency,
@@ -108,52 +207,86 @@ def fetch_100_day_historical_data(symbol, currency='USD'):
     }
     print(f"Fetching 100-day historical data for {symbol}...")
     response = requests.get(url, params=params)
-    data = response.json()
+    data = orjson.loads(response.content)
     if data.get('Response') == 'Success':
         print("100-day historical data fetched successfully!")
-        return data['Data']['Data']
+        return decode_records(data['Data']['Data'], ['time', 'open', 'high', 'low', 'close', 'volumefrom'])
     else:
         print(f"Failed to fetch 100-day historical data for {symbol}: {data}")
         return []
 
+# Function to embed a figure with a div id derived from its content, so identical data gives identical
+# HTML (and ETag) instead of a fresh random id on every render
+def figure_html(fig):
+    div_id = 'plot-' + hashlib.sha1(fig.to_json().encode()).hexdigest()[:16]
+    return fig.to_html(full_html=False, include_plotlyjs=False, div_id=div_id)
+
 # Function to generate Plotly graph for historical data
 def plot_historical_data(prices, title):
-    df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-    df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
+    prices = np.asarray(prices, dtype=np.float64).reshape(-1, 2)
+    df = pd.DataFrame({'date': ms_to_datetime(prices[:, 0]), 'price': prices[:, 1]})
     fig = px.line(df, x='date', y='price', title=title)
-    return fig.to_html(full_html=False)
+    return figure_html(fig)
 
 # Function to generate Plotly graph for 100-day historical data
 def plot_100_day_historical_data(data, title):
     df = pd.DataFrame(data)
     if 'time' in df:
-        df['time'] = pd.to_datetime(df['time'], unit='s')
+        df['time'] = ms_to_datetime(df['time'].to_numpy() * 1000)
         fig = px.line(df, x='time', y='close', title=title)
-        return fig.to_html(full_html=False)
+        return figure_html(fig)
     print("No 'time' column found in 100-day historical data.")
     return "<p>100-Day historical data not available.</p>"
 
 # Function to generate Plotly graph for real-time data
 def plot_realtime_data(exchange_name, symbol, timeframe):
-    exchange = getattr(ccxt, exchange_name)()
-    print(f"Fetching real-time data for {symbol} from {exchange_name} with timeframe {timeframe}")
-    data = fetch_data_with_retry(exchange, symbol, timeframe, limit=100)
-    if data:
-        df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
+    snapshot = open_snapshot()
+    data = snapshot.candles(symbol) if snapshot is not None else None
+    if data is None:
+        exchange = make_exchange(exchange_name)
+        print(f"Fetching real-time data for {symbol} from {exchange_name} with timeframe {timeframe}")
+        data = fetch_data_with_retry(exchange, symbol, timeframe, limit=100)
+    if data is not None and len(data):
+        df = ohlcv_frame(data)
         print(df.head())  # Debug output to verify data
-        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1, row_heights=[0.8, 0.2])
+        # Volume by price level sits beside the candles, sharing their price axis
+        fig = make_subplots(rows=2, cols=2, shared_xaxes='columns', shared_yaxes='rows', vertical_spacing=0.1,
+                            horizontal_spacing=0.01, row_heights=[0.8, 0.2], column_widths=[0.82, 0.18],
+                            specs=[[{}, {}], [{}, None]])
         fig.add_trace(go.Candlestick(x=df['date'], open=df['open'], high=df['high'], low=df['low'], close=df['close'],
                                      name='Candlestick'), row=1, col=1)
         fig.add_trace(go.Bar(x=df['date'], y=df['volume'], name='Volume', marker_color='blue'), row=2, col=1)
+        profile = candle_profile(df, bins=40)
+        if profile is not None:
+            step = profile['step']
+            fig.add_trace(go.Bar(x=profile['volumes'], y=[price + step / 2 for price in profile['prices']],
+                                 orientation='h', width=step * 0.9, name='Volume Profile', marker_color='gray'),
+                          row=1, col=2)
+            fig.add_hrect(y0=profile['value_area_low'], y1=profile['value_area_high'], fillcolor='gray',
+                          opacity=0.1, line_width=0, row=1, col=1)
+            fig.add_hline(y=profile['poc'], line_dash='dot', line_color='orange', annotation_text='POC', row=1, col=1)
         fig.update_layout(title=f'{symbol} Price (Real-time)', xaxis_title='Time', yaxis_title='Price (USDT)',
-                          yaxis2_title='Volume', template="plotly_dark")
-        return fig.to_html(full_html=False)
+                          yaxis3_title='Volume', xaxis_rangeslider_visible=False, template="plotly_dark")
+        return figure_html(fig)
     return "<p>No real-time data available.</p>"
 
+# Converts one cached USD price per coin into any quote currency (FX staleness tolerance in seconds)
+quote_converter = QuoteConverter(fx_max_age=int(os.environ.get('MAICOIN_FX_MAX_AGE', 3600)))
+
 # Function to get current price from CoinGecko
 def get_current_price(symbol, currency):
-    url = f"https://api.coingecko.com/api/v3/simple/price"
+    # Accept tickers and names too ("btc", "Bitcoin"); CoinGecko itself only understands ids
+    coin = coin_registry.resolve(symbol)
+    if coin is not None:
+        symbol = coin['id']
+
+    # Derive the quote from the cached USD price and FX table; only unknown currencies go upstream
+    quote_converter.ensure_started()
+    price = quote_converter.price(symbol, currency)
+    if price is not None:
+        return price
+
+    url = f"{BASE_URL}/simple/price"
     params = {
         'ids': symbol,
         'vs_currencies': currency
@@ -166,7 +299,7 @@ def get_current_price(symbol, currency):
 
 # Function to fetch real-time data for a coin from CoinGecko API with timezone conversion
 def fetch_real_time_data(coin_id, currency, start_time, end_time):
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart/range"
+    url = f"{BASE_URL}/coins/{coin_id}/market_chart/range"
     params = {
         "vs_currency": currency,
         "from": int(start_time.timestamp()),
@@ -178,247 +311,566 @@ def fetch_real_time_data(coin_id, currency, start_time, end_time):
         print("Failed to fetch data from CoinGecko API")
         return pd.DataFrame()  # Return empty DataFrame if request failed
 
-    data = response.json()
+    data = decode_market_chart(response.content)
     if 'prices' not in data:
         print("No 'prices' in API response")
         return pd.DataFrame()  # Return empty DataFrame if no prices
 
-    prices = data['prices']  # [timestamp, price]
-    df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms').dt.tz_localize('UTC').dt.tz_convert('Asia/Manila')
+    prices = data['prices']  # [n, 2] array of [timestamp, price]
+    timestamps = pd.DatetimeIndex(ms_to_datetime(prices[:, 0])).tz_localize('UTC').tz_convert('Asia/Manila')
+    df = pd.DataFrame({'timestamp': timestamps, 'price': prices[:, 1]})
 
     return df
 
 # Function to analyze the best times to buy and sell for each 30-minute interval
-def analyze_best_times(df):
-    results = []
-    intervals = pd.date_range(start=df['timestamp'].min(), end=df['timestamp'].max(), freq='30min')
-
-    for i in range(len(intervals) - 1):
-        interval_df = df[(df['timestamp'] >= intervals[i]) & (df['timestamp'] < intervals[i + 1])]
-        if interval_df.empty:
-            continue
-
-        best_result = None
-        for j in range(len(interval_df) - 1):
-            buy_price = interval_df.iloc[j]['price']
-            buy_time = interval_df.iloc[j]['timestamp']
-
-            for k in range(j + 1, len(interval_df)):
-                sell_price = interval_df.iloc[k]['price']
-                sell_time = interval_df.iloc[k]['timestamp']
-                profit = sell_price - buy_price
-
-                if best_result is None or profit > best_result['Profit ($)']:
-                    best_result = {
-                        'Interval Start': intervals[i],
-                        'Buy Time': buy_time,
-                        'Buy Price ($)': buy_price,
-                        'Sell Time': sell_time,
-                        'Sell Price ($)': sell_price,
-                        'Profit ($)': profit
-                    }
-
-        if best_result:
-            results.append(best_result)
-
-    return pd.DataFrame(results)
-
-# Define the time range (e.g., last 48 hours)
-end_time = int(datetime.now().timestamp())
-start_time = end_time - 48 * 3600  # Last 48 hours
-
-# URLs and parameters for different cryptocurrencies
-urls_params = [
-    {
-        "url": "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart/range",
-        "params": {'vs_currency': 'usd', 'from': start_time, 'to': end_time},
-        "currency_name": "Bitcoin"
-    },
-    {
-        "url": "https://api.coingecko.com/api/v3/coins/dogecoin/market_chart/range",
-        "params": {'vs_currency': 'usd', 'from': start_time, 'to': end_time},
-        "currency_name": "Dogecoin"
-    },
-    {
-        "url": "https://api.coingecko.com/api/v3/coins/ethereum/market_chart/range",
-        "params": {'vs_currency': 'usd', 'from': start_time, 'to': end_time},
-        "currency_name": "Ethereum"
-    }
-]
+def analyze_best_times(df, series_id=None):
+    if df.empty:
+        return pd.DataFrame()
+    # Intervals sit on the clock (:00 and :30), so they stay put as the fetched window slides
+    times = list(df['timestamp'])
+    interval_starts = list(df['timestamp'].dt.floor('30min'))
+    prices = list(df['price'])
+
+    def init():
+        return {}  # interval start -> running min and best result inside that interval
+
+    # Best pair per interval = max over points of (price - lowest earlier price in the same interval)
+    def extend(state, start, stop):
+        for timestamp, i, price in zip(times[start:stop], interval_starts[start:stop], prices[start:stop]):
+            bucket = state.get(i)
+            if bucket is None:
+                state[i] = {'min_price': price, 'min_time': timestamp, 'best': None}
+                continue
+            profit = price - bucket['min_price']
+            if bucket['best'] is None or profit > bucket['best']['Profit ($)']:
+                bucket['best'] = {
+                    'Interval Start': i,
+                    'Buy Time': bucket['min_time'],
+                    'Buy Price ($)': bucket['min_price'],
+                    'Sell Time': timestamp,
+                    'Sell Price ($)': price,
+                    'Profit ($)': profit
+                }
+            if price < bucket['min_price']:
+                bucket['min_price'] = price
+                bucket['min_time'] = timestamp
+        return state
+
+    # Cache blocks hold whole intervals, so their buckets never overlap
+    def merge(left, right):
+        return {**left, **right}
+
+    # Only intervals that lie entirely inside the data (started after the first point and closed
+    # before the last one) are reported
+    def finalize(state):
+        return pd.DataFrame([state[i]['best'] for i in sorted(state)
+                             if times[0] <= i and i < interval_starts[-1] and state[i]['best'] is not None])
+
+    if series_id is None:
+        return finalize(extend(init(), 0, len(times)))
+    timestamps = df['timestamp'].dt.as_unit('ms').astype('int64')
+    return analytics_cache.compute('best_times', series_id, timestamps, (), init, extend, finalize, merge)
+
+# Range-query indexes over each coin's price series, extended as the dashboard fetches new points
+range_indexes = {}
+
+
+# Function to append newly fetched [timestamp, price] pairs to a coin's range index
+def update_range_index(coin_id, prices):
+    range_index = range_indexes.setdefault(coin_id, PriceRangeIndex())
+    for timestamp, price in np.asarray(prices).tolist():
+        range_index.append(timestamp, price)
+    return range_index
+
+# Online abnormal-move detection over every price tick of the watchlist
+anomaly_detector = AnomalyDetector()
+
+
+# Function to feed the watchlist's price ticks to the anomaly detector (idempotent)
+def ensure_anomaly_feed():
+    price_feed.subscribe(anomaly_detector.on_prices, [coin['id'] for coin in coin_registry.watchlist()])
+    ensure_price_feed()
+
+# Function to start the price feed: live polling, or the watchlist's stored candles replayed when
+# MAICOIN_REPLAY_SPEED is set
+def ensure_price_feed():
+    if REPLAY_SPEED:
+        replay.ensure_feed([coin['exchange_symbol'] for coin in coin_registry.watchlist()],
+                           os.environ.get('MAICOIN_REPLAY_TIMEFRAME', '1m'), replay.parse_speed(REPLAY_SPEED))
+    else:
+        price_feed.ensure_started()
 
 @app.route('/')
 def index():
-    results = []
-    for url_params in urls_params:
-        url = url_params["url"]
-        params = url_params["params"]
-        currency_name = url_params["currency_name"]
-
-        data = fetch_data_with_retry_coingecko(url, params)
-        if data:
-            best_trading_analysis = analyze_trading_opportunities(data)
-            historical_graph = plot_historical_data(data['prices'], f'{currency_name} Historical Data')
-            realtime_graph = plot_realtime_data('kraken', f'{currency_name}/USD', '1m')
-
-            # Fetch and plot 100-day historical data
-            symbol = 'BTC' if currency_name.lower() == 'bitcoin' else currency_name.upper()
-            print(f"Fetching 100-day historical data for {currency_name} with symbol {symbol}...")
-            historical_100_day_data = fetch_100_day_historical_data(symbol)
-            historical_100_day_graph = plot_100_day_historical_data(historical_100_day_data,
-                                                                    f'{currency_name} 100-Day Historical Data')
-
-            results.append({
-                "currency_name": currency_name,
-                "best_trading_analysis": best_trading_analysis,
-                "historical_graph": historical_graph,
-                "realtime_graph": realtime_graph,
-                "historical_100_day_graph": historical_100_day_graph
-            })
-
-    html_content = """
-    <!doctype html>
-    <html lang="en">
-      <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
-        <title>Cryptocurrency Data</title>
-        <style>
-          body {
-            background-color: black;
-            color: white;
-            font-family: Arial, sans-serif;
-          }
-          .container {
-            width: 90%;
-            margin: 0 auto;
-          }
-          button {
-            margin: 10px;
-            padding: 10px;
-            font-size: 16px;
-            background-color: #333;
-            color: white;
-            border: none;
-            cursor: pointer;
-          }
-          button:hover {
-            background-color: #555;
-          }
-          table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-bottom: 20px;
-          }
-          th, td {
-            border: 1px solid white;
-            padding: 10px;
-            text-align: center;
-          }
-          th {
-            background-color: #333;
-            color: white;
-          }
-          td {
-            background-color: #222;
-          }
-          .graph {
-            width: 100%;
-            margin: 20px 0;
-          }
-        </style>
-        <script>
-          function fetchCurrentPrice() {
-            const symbol = document.getElementById('crypto-symbol').value;
-            const currency = document.getElementById('currency').value;
-            fetch('/get_current_price/' + symbol + '/' + currency)
-              .then(response => response.json())
-              .then(data => {
-                let priceDiv = document.getElementById('price-display');
-                if (data.price !== null) {
-                  priceDiv.innerHTML = '<h3>Current ' + symbol + ' Price in ' + currency + ': ' + data.price + '</h3>';
-                } else {
-                  priceDiv.innerHTML = '<h3>Price data not available for ' + symbol + ' in ' + currency + '</h3>';
-                }
-              });
-          }
-
-          function fetch30MinEstimate(coin_id) {
-            fetch('/get_30min_estimate/' + coin_id)
-              .then(response => response.json())
-              .then(data => {
-                let estimateDiv = document.getElementById('estimate-display');
-                if (data.estimates) {
-                  let table = '<table><tr><th>Interval Start</th><th>Buy Time</th><th>Buy Price ($)</th><th>Sell Time</th><th>Sell Price ($)</th><th>Profit ($)</th></tr>';
-                  data.estimates.forEach(row => {
-                    table += `<tr><td>${row['Interval Start']}</td><td>${row['Buy Time']}</td><td>${row['Buy Price ($)']}</td><td>${row['Sell Time']}</td><td>${row['Sell Price ($)']}</td><td>${row['Profit ($)']}</td></tr>`;
-                  });
-                  table += '</table>';
-                  estimateDiv.innerHTML = table;
-                } else {
-                  estimateDiv.innerHTML = '<p>No 30-minute interval estimates available.</p>';
-                }
-              });
-          }
-        </script>
-      </head>
-      <body>
-        <div class="container">
-          <h1>"CRYPTOCURRENCY"</h1>
-            </p>Data Analysis and Visualization</p>
-            <p> Bitcoin, Ethereum, and Dogecoin<p>
-          <form onsubmit="event.preventDefault(); fetchCurrentPrice();">
-            <label for="crypto-symbol">Cryptocurrency Symbol (e.g., bitcoin, ethereum, dogecoin):</label>
-            <input type="text" id="crypto-symbol" name="crypto-symbol" required>
-            <label for="currency">Currency (e.g., usd, eur, php):</label>
-            <input type="text" id="currency" name="currency" required>
-            <button type="submit">Get Price</button>
-          </form>
-          <div id="price-display"></div>
-          <table>
-            <tr>
-              <th>Currency</th>
-              <th>Best Trading Analysis</th>
-              <th>30-Minute Interval Estimate</th>
-            </tr>
-            {% for result in results %}
-            <tr>
-              <td>{{ result.currency_name }}</td>
-              <td>
-                {% if result.best_trading_analysis %}
-                  <p>Best Buy Time: {{ result.best_trading_analysis.best_buy_time }} at ${{ result.best_trading_analysis.best_buy_price }}</p>
-                  <p>Best Sell Time: {{ result.best_trading_analysis.best_sell_time }} at ${{ result.best_trading_analysis.best_sell_price }}</p>
-                  <p>Maximum Profit: ${{ result.best_trading_analysis.max_profit }}</p>
-                {% else %}
-                  <p>No profitable trading opportunities found.</p>
-                {% endif %}
-              </td>
-              <td>
-                <button onclick="fetch30MinEstimate('{{ result.currency_name.lower() }}')">Get 30-Minute Estimate</button>
-              </td>
-            </tr>
-            {% endfor %}
-          </table>
-          <div id="estimate-display"></div>
-          {% for result in results %}
-            <div class="graph">
-              <h2>{{ result.currency_name }} Real-time Price</h2>
-              {{ result.realtime_graph | safe }}
-            </div>
-            <div class="graph">
-              <h2>{{ result.currency_name }} Historical Data</h2>
-              {{ result.historical_graph | safe }}
-            </div>
-            <div class="graph">
-              <h2>{{ result.currency_name }} 100-Day Historical Data</h2>
-              {{ result.historical_100_day_graph | safe }}
-            </div>
-          {% endfor %}
-        </div>
-      </body>
-    </html>
-    """
-    return render_template_string(html_content, results=results)
+    ensure_anomaly_feed()
+    # Skeleton only: each coin's panel is fetched by the page as it scrolls into view
+    return render_template('dashboard.html', coins=coin_registry.watchlist())
+
+# Function to build one coin's dashboard panel: trading analysis plus its three graphs
+@app.route('/panel/<string:coin_id>')
+def coin_panel(coin_id):
+    coin = coin_registry.resolve(coin_id)
+    if coin is None:
+        return f"<p>Unknown coin: {coin_id}</p>", 404
+
+    # Last 48 hours, relative to this request
+    end_time = int(datetime.now().timestamp())
+    start_time = end_time - 48 * 3600
+    url = f"{BASE_URL}/coins/{coin['id']}/market_chart/range"
+    params = {'vs_currency': 'usd', 'from': start_time, 'to': end_time}
+
+    data = fetch_data_with_retry_coingecko(url, params)
+    if not data:
+        return render_template('panel.html', coin=coin, available=False)
+
+    best_trading_analysis = analyze_trading_opportunities(data, series_id=coin['id'])
+    update_range_index(coin['id'], data['prices'])
+    historical_graph = plot_historical_data(data['prices'], f"{coin['name']} Historical Data")
+    realtime_graph = plot_realtime_data('kraken', coin['exchange_symbol'], '1m')
+
+    # Fetch and plot 100-day historical data
+    symbol = coin['cryptocompare_symbol']
+    print(f"Fetching 100-day historical data for {coin['name']} with symbol {symbol}...")
+    historical_100_day_data = fetch_100_day_historical_data(symbol)
+    historical_100_day_graph = plot_100_day_historical_data(historical_100_day_data,
+                                                            f"{coin['name']} 100-Day Historical Data")
+
+    return render_template('panel.html', coin=coin, available=True,
+                           best_trading_analysis=best_trading_analysis,
+                           historical_graph=historical_graph,
+                           realtime_graph=realtime_graph,
+                           historical_100_day_graph=historical_100_day_graph)
+
+@app.route('/api/range/<string:coin_id>')
+def range_query(coin_id):
+    # Arbitrary [from, to] millisecond range, e.g. from a chart's range selector
+    range_index = range_indexes.get(coin_id)
+    if range_index is None or not len(range_index):
+        return jsonify({'error': f'No price series loaded for {coin_id}'}), 404
+    t1 = request.args.get('from', type=int)
+    t2 = request.args.get('to', type=int)
+    return jsonify({
+        'high_low': range_index.high_low(t1, t2),
+        'best_trade': range_index.best_trade(t1, t2)
+    })
+
+@app.route('/api/stats')
+def stats_query():
+    # Window statistics over stored candles, e.g. /api/stats?symbols=BTC/USDT,ETH/USD&timeframe=1m&from=...&to=...
+    symbols = [symbol for symbol in request.args.get('symbols', '').split(',') if symbol]
+    if not symbols:
+        return jsonify({'error': 'symbols is required'}), 400
+    drawdown_window = request.args.get('drawdown_window', type=int)
+    if drawdown_window is not None and not 1 <= drawdown_window <= MAX_DRAWDOWN_WINDOW:
+        return jsonify({'error': f'drawdown_window must be between 1 and {MAX_DRAWDOWN_WINDOW}'}), 400
+    results = compute_window_stats(symbols,
+                                   timeframe=request.args.get('timeframe', '1m'),
+                                   t1=request.args.get('from', type=int),
+                                   t2=request.args.get('to', type=int),
+                                   drawdown_window=drawdown_window)
+    return jsonify({'stats': results})
+
+# Function to load closes of stored candles since `start` aligned on the timeframe's grid, one
+# column per symbol (NaN for symbols without candles since then)
+def aligned_closes(symbols, timeframe, start=None):
+    grid, loaded, prices = load_aligned(symbols, timeframe, freq=timeframe.replace('m', 'min'), start=start)
+    aligned = np.full((len(grid), len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        if symbol in loaded:
+            aligned[:, j] = prices[:, loaded.index(symbol)]
+    return grid, aligned
+
+# Function to get the start of the last `bars` bars of the newest stored candle (None: unknown, load everything)
+def trailing_start(symbols, timeframe, bars):
+    latest = [latest_timestamp(symbol, timeframe) for symbol in symbols]
+    if None in latest:
+        return None
+    return max(latest) - bars * timeframe_ms(timeframe)
+
+# Correlation engines keyed by (symbols, timeframe, window, benchmark), with the last grid time they have seen
+correlation_engines = {}
+
+@app.route('/api/correlation')
+def correlation_query():
+    # Cross-coin correlation, beta and relative strength, e.g. /api/correlation?symbols=BTC/USD,ETH/USD&window=60
+    symbols = tuple(symbol for symbol in request.args.get('symbols', '').split(',') if symbol)
+    if len(symbols) < 2:
+        return jsonify({'error': 'at least two symbols are required'}), 400
+    timeframe = request.args.get('timeframe', '1m')
+    window = request.args.get('window', 60, type=int)
+    benchmark = request.args.get('benchmark', symbols[0])
+    if benchmark not in symbols:
+        return jsonify({'error': f'benchmark {benchmark} is not one of the symbols'}), 400
+
+    missing = [symbol for symbol in symbols if store_version(symbol, timeframe) is None]
+    if missing:
+        return jsonify({'error': f'No stored candles for {sorted(missing)}'}), 404
+
+    # Only bars newer than the cached engine's last update are loaded; a new engine gets the last window
+    key = (symbols, timeframe, window, benchmark)
+    engine, last_time = correlation_engines.get(key, (None, None))
+    if engine is None:
+        engine = CorrelationEngine(symbols, window, benchmark)
+        start = trailing_start(symbols, timeframe, window + 1)
+    else:
+        start = last_time
+    grid, prices = aligned_closes(symbols, timeframe, start)
+    if last_time is not None:
+        prices, grid = prices[grid > last_time], grid[grid > last_time]
+    engine.update_many(prices)
+    correlation_engines[key] = (engine, int(grid[-1]) if len(grid) else last_time)
+    return jsonify(engine.summary())
+
+# Forecast engines keyed by (symbols, timeframe); each keeps fitted state and only sees new bars
+forecast_engines = {}
+
+@app.route('/api/forecast')
+def forecast_query():
+    # e.g. /api/forecast?symbols=BTC/USD,ETH/USD&timeframe=1m&horizons=1,5,30
+    symbols = tuple(symbol for symbol in request.args.get('symbols', '').split(',') if symbol)
+    if not symbols:
+        return jsonify({'error': 'symbols is required'}), 400
+    timeframe = request.args.get('timeframe', '1m')
+    try:
+        horizons = [int(h) for h in request.args.get('horizons', '1,5,30').split(',')]
+    except ValueError:
+        return jsonify({'error': 'horizons must be a comma-separated list of integers'}), 400
+    if min(horizons) < 1 or max(horizons) > MAX_HORIZON:
+        return jsonify({'error': f'horizons must be between 1 and {MAX_HORIZON}'}), 400
+
+    missing = [symbol for symbol in symbols if store_version(symbol, timeframe) is None]
+    if missing:
+        return jsonify({'error': f'No stored candles for {sorted(missing)}'}), 404
+
+    # A new engine warms up on the trailing bars its models need; after that only newer bars are loaded
+    engine = forecast_engines.get((symbols, timeframe))
+    if engine is None:
+        engine = forecast_engines[(symbols, timeframe)] = ForecastEngine(
+            symbols, pd.Timedelta(timeframe.replace('m', 'min')).total_seconds() * 1000)
+    if engine.last_time is None:
+        start = trailing_start(symbols, timeframe, engine.warmup_bars)
+    else:
+        start = engine.last_time
+    grid, prices = aligned_closes(symbols, timeframe, start)
+    engine.update_many(grid, prices)
+    if engine.last_time is None:
+        return jsonify({'error': f'No stored candles for {list(symbols)}'}), 404
+    return jsonify(engine.summary(horizons))
+
+# Price alerts, matched on every tick of the background price feed. Under gunicorn the engine lives
+# in the collector process and workers call it through a proxy, so every worker sees the same alerts.
+alert_engine = None
+
+
+# Function to get the alert engine: this process's own, or a proxy to the collector's
+def get_alert_engine():
+    global alert_engine
+    if alert_engine is None:
+        if serving_role() == 'worker':
+            alert_engine = connect_engine()
+        else:
+            alert_engine = AlertEngine(track=price_feed.track)
+            price_feed.subscribe(alert_engine.on_prices)
+    if serving_role() != 'worker':
+        ensure_price_feed()
+    return alert_engine
+
+# Function to run one alert engine call, dropping a proxy whose collector went away
+def call_alert_engine(method, *args):
+    global alert_engine
+    try:
+        return getattr(get_alert_engine(), method)(*args)
+    except (OSError, EOFError):
+        if serving_role() == 'worker':
+            alert_engine = None  # Reconnect on the next call, e.g. after the collector restarted
+        raise
+
+@app.route('/api/alerts', methods=['POST'])
+def create_alert():
+    # {"symbol": "dogecoin", "type": "threshold", "threshold": 0.40, "direction": "above"}
+    # {"symbol": "dogecoin", "type": "percent_move", "percent": 5}
+    # {"symbol": "dogecoin", "type": "sma_cross", "period": 20, "direction": "above"}
+    spec = request.get_json(silent=True) or {}
+    if not spec.get('symbol'):
+        return jsonify({'error': 'Invalid alert: symbol is required'}), 400
+    # Alerts are matched against the price feed, which is keyed by CoinGecko id ("DOGE" -> "dogecoin")
+    coin = coin_registry.resolve(str(spec['symbol']))
+    if coin is None:
+        return jsonify({'error': f"Unknown coin: {spec['symbol']}"}), 400
+    symbol = coin['id']
+    alert_type = spec.get('type', 'threshold')
+    try:
+        if alert_type == 'threshold':
+            alert_id = call_alert_engine('add_threshold', symbol, float(spec['threshold']),
+                                         spec.get('direction', 'above'))
+        elif alert_type == 'percent_move':
+            reference_price = spec.get('reference_price') or get_current_price(symbol, 'usd')
+            alert_id = call_alert_engine('add_percent_move', symbol, float(spec['percent']), reference_price)
+        elif alert_type == 'sma_cross':
+            alert_id = call_alert_engine('add_indicator_cross', symbol, int(spec['period']),
+                                         spec.get('direction', 'above'))
+        else:
+            raise ValueError(f"Unknown alert type: {alert_type}")
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid alert: {e}'}), 400
+    except (OSError, EOFError):
+        return jsonify({'error': 'Alert engine unavailable'}), 503
+    return jsonify({'id': alert_id}), 201
+
+@app.route('/api/alerts/<int:alert_id>', methods=['DELETE'])
+def delete_alert(alert_id):
+    try:
+        call_alert_engine('remove', alert_id)
+    except (OSError, EOFError):
+        return jsonify({'error': 'Alert engine unavailable'}), 503
+    return '', 204
+
+@app.route('/api/alerts/triggered')
+def triggered_alerts():
+    try:
+        events = call_alert_engine('drain', request.args.get('max', 1000, type=int))
+    except (OSError, EOFError):
+        return jsonify({'error': 'Alert engine unavailable'}), 503
+    return jsonify({'events': events})
+
+@app.route('/api/anomalies')
+def anomalies():
+    # Incremental polling: pass the last seen event id as ?since=
+    ensure_anomaly_feed()
+    limit = request.args.get('limit', 100, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+    events = anomaly_detector.recent(request.args.get('since', 0, type=int), limit)
+    return jsonify({'events': events})
+
+# Holdings recorded as lots of CoinGecko coin ids, persisted under the data directory
+portfolio = Portfolio()
+
+@app.route('/api/portfolio')
+def portfolio_summary():
+    # One batched price lookup (snapshot, then cache, then a single upstream call) for every holding
+    prices = quote_converter.base_prices(portfolio.symbols())
+    return jsonify(portfolio.valuation(prices))
+
+@app.route('/api/portfolio/lots', methods=['POST'])
+def add_portfolio_lot():
+    # {"symbol": "bitcoin", "quantity": 0.5, "price": 95000, "timestamp": 1734830400000}; sells are negative
+    spec = request.get_json(silent=True) or {}
+    coin = coin_registry.resolve(str(spec.get('symbol', '')))
+    if coin is None:
+        return jsonify({'error': f"Unknown coin: {spec.get('symbol')}"}), 400
+    try:
+        lot_id = portfolio.add_lot(coin['id'], float(spec['quantity']), float(spec['price']), spec.get('timestamp'))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid lot: {e}'}), 400
+    return jsonify({'id': lot_id}), 201
+
+@app.route('/api/portfolio/lots/<int:lot_id>', methods=['DELETE'])
+def delete_portfolio_lot(lot_id):
+    if not portfolio.remove_lot(lot_id):
+        return jsonify({'error': f'No lot {lot_id}'}), 404
+    return jsonify({'deleted': lot_id})
+
+@app.route('/api/portfolio/history')
+def portfolio_history():
+    # e.g. /api/portfolio/history?timeframe=1h&start=2025-01-01; holdings are valued on stored candle closes
+    timeframe = request.args.get('timeframe', '1h')
+    try:
+        start, end = parse_time(request.args.get('start')), parse_time(request.args.get('end'))
+        step = timeframe_ms(timeframe)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'start/end must be dates or millisecond timestamps and timeframe like 1h'}), 400
+    symbols = portfolio.symbols()
+    pairs = {}
+    for symbol in symbols:
+        coin = coin_registry.resolve(symbol)
+        pairs[symbol] = coin['exchange_symbol'] if coin else symbol
+    stored = [symbol for symbol in symbols if store_version(pairs[symbol], timeframe) is not None]
+    if not stored:
+        return jsonify({'error': f'No stored {timeframe} candles for any holding'}), 404
+
+    try:
+        grid, aligned_pairs, prices = load_aligned([pairs[symbol] for symbol in stored], timeframe,
+                                                   f'{step}ms', start, end)
+    except ValueError:  # No candles inside the requested range
+        return jsonify({'error': f'No stored {timeframe} candles in range'}), 404
+    coin_for_pair = {pairs[symbol]: symbol for symbol in stored}
+    stored = [coin_for_pair[pair] for pair in aligned_pairs]
+    history = portfolio.history(grid, stored, prices)
+    result = {key: history[key].tolist() for key in ('timestamps', 'value', 'invested', 'pnl', 'drawdown')}
+    result['max_drawdown'] = history['max_drawdown']
+    result['allocation'] = dict(zip(stored, history['allocation'][-1].tolist())) if len(grid) else {}
+    result['missing'] = [symbol for symbol in symbols if symbol not in stored]
+    return jsonify(result)
+
+# Cross-exchange spread scanner; venues and pairs are configurable, pairs default to the watchlist
+arbitrage_scanner = None
+
+
+# Function to get the process-wide scanner, creating it on first use
+def get_arbitrage_scanner():
+    global arbitrage_scanner
+    if arbitrage_scanner is None:
+        arbitrage_scanner = scanner_from_env()
+    return arbitrage_scanner
+
+@app.route('/api/arbitrage')
+def arbitrage_table():
+    # Ranked buy-here/sell-there routes net of taker fees, plus per-exchange fetch latency
+    if serving_role() == 'worker':
+        # Scanned by the collector process; workers only serve its latest table
+        result = read_state('arbitrage')
+        if result is None:
+            return jsonify({'error': 'No arbitrage scan published yet'}), 503
+    else:
+        scanner = get_arbitrage_scanner()
+        result = scanner.latest or scanner.scan_once()
+        scanner.ensure_started()
+    min_net = request.args.get('min_net_pct', type=float)
+    rows = [row for row in result['opportunities'] if min_net is None or row['net_pct'] >= min_net]
+    return jsonify(dict(result, opportunities=rows[:request.args.get('limit', 20, type=int)]))
+
+@app.route('/api/volume_profile/<path:symbol>')
+def volume_profile_query(symbol):
+    # Volume by price level over stored candles: ?days= trailing days, or ?start=&end= (ms or dates)
+    try:
+        start = parse_time(request.args.get('start'))
+        end = parse_time(request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    days, bins = request.args.get('days', type=int), request.args.get('bins', 100, type=int)
+    if bins < 1 or (days is not None and days < 1):
+        return jsonify({'error': 'bins and days must be at least 1'}), 400
+    result = volume_profiles.profile(symbol, request.args.get('timeframe', '1m'), start, end, days=days, bins=bins)
+    if result is None:
+        return jsonify({'error': f'No stored candles for {symbol} in range'}), 404
+    return jsonify(result)
+
+@app.route('/api/candles/<path:symbol>')
+def candles_query(symbol):
+    # Any zoom level in one bounded read: ?start=&end= (ms or dates) and ?width= points wanted across the chart
+    try:
+        start = parse_time(request.args.get('start'))
+        end = parse_time(request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    candle_pyramid.sync(symbol)  # Rolls up stored 1m history the pyramid has not seen yet
+    level, rows = candle_pyramid.query(symbol, start, end, request.args.get('width', 800, type=int))
+    if level is None:
+        return jsonify({'error': f'No 1m candles stored for {symbol}'}), 404
+    candles = {name: rows[:, i].tolist() for i, name in enumerate(['open', 'high', 'low', 'close', 'volume'], 1)}
+    return jsonify(dict(candles, symbol=symbol, level=level, timestamp=rows[:, 0].astype(np.int64).tolist()))
+
+# Saved order book stores and trade tapes, refreshed with the segments the collector appends
+orderbook_stores = {}
+trade_tapes = {}
+
+@app.route('/api/orderbook/<path:symbol>')
+def orderbook_query(symbol):
+    # Book as of ?at=<ms> (default: latest) and, with ?size=, the VWAP to fill that size on ?side=buy|sell
+    path = store_path(symbol)
+    if not os.path.isdir(path):
+        return jsonify({'error': f'No order book history for {symbol}'}), 404
+    store = orderbook_stores.get(symbol)
+    if store is None:
+        store = orderbook_stores[symbol] = OrderBookStore.load(symbol, path)
+    else:
+        store.refresh(path)  # Only segments the collector appended since the last request
+
+    at = request.args.get('at', type=int) or int(time.time() * 1000)
+    book = store.book_at(at)
+    if book is None:
+        return jsonify({'error': f'No order book for {symbol} at {at}'}), 404
+    depth = request.args.get('depth', 20, type=int)
+    result = {'symbol': symbol, 'at': at, 'bids': book[0][:depth].tolist(), 'asks': book[1][:depth].tolist()}
+    size = request.args.get('size', type=float)
+    if size is not None:
+        try:
+            result['fill'] = vwap_to_fill(book, size, request.args.get('side', 'buy'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@app.route('/api/trades/<path:symbol>')
+def trades_query(symbol):
+    # Saved trade prints between ?start= and ?end= (ms, default: everything), capped at ?limit= most recent
+    path = store_path(symbol, 'trades')
+    if not os.path.isdir(path):
+        return jsonify({'error': f'No trade history for {symbol}'}), 404
+    tape = trade_tapes.get(symbol)
+    if tape is None:
+        tape = trade_tapes[symbol] = TradeTape.load(path)
+    else:
+        tape.refresh(path)
+    trades = tape.between(request.args.get('start', type=int), request.args.get('end', type=int))
+    limit = request.args.get('limit', 1000, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+    return jsonify(dict({name: values[-limit:].tolist() for name, values in trades.items()}, symbol=symbol))
+
+@app.route('/export')
+def export_candles():
+    # e.g. /export?symbol=BTC/USDT&timeframe=1m&start=2024-12-01&format=ndjson
+    symbol = request.args.get('symbol')
+    timeframe = request.args.get('timeframe', '1m')
+    fmt = request.args.get('format', 'csv')
+    if not symbol:
+        return jsonify({'error': 'symbol is required'}), 400
+    try:
+        chunks = export_chunks(symbol, timeframe, parse_time(request.args.get('start')),
+                               parse_time(request.args.get('end')), fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+
+    # A generator body has no Content-Length, so it goes out chunked as each piece is produced
+    filename = f'{symbol.replace("/", "_")}_{timeframe}.{fmt}'
+    return Response(chunks, mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+# Server-side matplotlib charts, rendered in worker processes and cached on disk by data version
+chart_renderer = ChartRenderer(workers=int(os.environ.get('MAICOIN_CHART_WORKERS', 2)))
+
+
+# Function to get the immutable URL of a rendered chart (None when no candles are stored)
+def chart_url(symbol, timeframe='1d', range_name='all', fmt='png'):
+    name = chart_renderer.get(symbol, timeframe, range_name, fmt)
+    chart_renderer.ensure_watching()
+    return url_for('chart_file', name=name) if name else None
+
+@app.route('/chart/<path:symbol>')
+def chart(symbol):
+    # e.g. /chart/BTC/USD?timeframe=1d&range=100d&format=svg; redirects to the current render
+    try:
+        url = chart_url(symbol, request.args.get('timeframe', '1d'), request.args.get('range', 'all'),
+                        request.args.get('format', 'png'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if url is None:
+        return jsonify({'error': f'No chart available for {symbol}'}), 404
+    return redirect(url)
+
+@app.route('/charts/<string:name>')
+def chart_file(name):
+    # File names change whenever the data does, so a fetched chart never needs revalidating
+    response = send_from_directory(os.path.abspath(chart_renderer.chart_dir), name, max_age=31536000)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/coin/<string:coin_id>')
+def coin_page(coin_id):
+    coin = coin_registry.resolve(coin_id)
+    if coin is None:
+        return render_template('index.html', data={'title': coin_id, 'message': f'Unknown coin: {coin_id}'}), 404
+    timeframe = request.args.get('timeframe', '1d')
+    plot_url = chart_url(coin['exchange_symbol'], timeframe, request.args.get('range', 'all'))
+    data = {'title': f"{coin['name']} ({coin['exchange_symbol']}, {timeframe})", 'plot_url': plot_url,
+            'price': quote_converter.price(coin['id'], 'usd')}
+    return render_template('index.html', data=data)
 
 @app.route('/get_current_price/<string:symbol>/<string:currency>')
 def get_current_price_route(symbol, currency):
@@ -433,10 +885,12 @@ def get_30min_estimate(coin_id):
 
     df = fetch_real_time_data(coin_id, currency, start_time, end_time)
     if not df.empty:
-        estimates_df = analyze_best_times(df)
+        estimates_df = analyze_best_times(df, series_id=coin_id)
         return jsonify({'estimates': estimates_df.to_dict(orient='records')})
     else:
         return jsonify({'estimates': None})
 
 if __name__ == "__main__":
+    # Build the coin index in the background, so the first request does not wait for /coins/list
+    coin_registry.warm()
     app.run(port=5000)
\ No newline at end of file
@@ -0,0 +1,28 @@
+# Multi-process serving mode: gunicorn -c gunicorn.conf.py app:app
+# One collector process feeds a shared memory-mapped snapshot that every worker reads and runs the
+# other upstream jobs (FX, arbitrage, chart re-renders), so adding workers does not add upstream API calls.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+timeout = 120
+
+collector = None
+
+
+def on_starting(server):
+    global collector
+    from modules.shared_snapshot import run_collector
+    # Shared secret for the workers' connections to the collector's alert engine
+    os.environ.setdefault('MAICOIN_ALERTS_KEY', os.urandom(16).hex())
+    collector = multiprocessing.Process(target=run_collector, name='snapshot-collector', daemon=True)
+    collector.start()
+    server.log.info(f"Started snapshot collector (pid {collector.pid})")
+    # Workers forked from here read what the collector publishes instead of polling upstream themselves
+    os.environ['MAICOIN_ROLE'] = 'worker'
+
+
+def on_exit(server):
+    if collector is not None and collector.is_alive():
+        collector.terminate()
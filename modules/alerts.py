@@ -0,0 +1,267 @@
+import itertools
+import logging
+import os
+import threading
+from collections import deque
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+from modules.shared_snapshot import SNAPSHOT_PATH
+
+# Local socket on which the collector shares its engine with the gunicorn workers
+ALERTS_ADDRESS = os.environ.get('MAICOIN_ALERTS_SOCKET', f'{SNAPSHOT_PATH}.alerts.sock')
+
+
+class ThresholdBook:
+    """
+    Sorted threshold array for one symbol and one direction. A move from prev to cur touches only
+    the slice between two bisects, so matching costs O(log n + fired) instead of O(n).
+    """
+
+    def __init__(self):
+        self.thresholds = np.empty(0, dtype=np.float64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.active = np.empty(0, dtype=bool)
+        self._pending = []
+        self._inactive = 0
+
+    def add(self, threshold, alert_id):
+        # Buffered and merged in one sort before the next match, so bulk inserts stay cheap
+        self._pending.append((threshold, alert_id))
+
+    def _merge_pending(self):
+        if not self._pending and self._inactive * 2 <= len(self.ids):
+            return
+        keep = self.active
+        thresholds = self.thresholds[keep]
+        ids = self.ids[keep]
+        if self._pending:
+            new_thresholds, new_ids = zip(*self._pending)
+            thresholds = np.concatenate([thresholds, np.asarray(new_thresholds, dtype=np.float64)])
+            ids = np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)])
+            self._pending = []
+        order = np.argsort(thresholds, kind='stable')
+        self.thresholds = thresholds[order]
+        self.ids = ids[order]
+        self.active = np.ones(len(ids), dtype=bool)
+        self._inactive = 0
+
+    def cross(self, low, high, low_inclusive):
+        """Fire and deactivate every active alert with a threshold in (low, high] or [low, high)."""
+        self._merge_pending()
+        if low_inclusive:
+            lo = np.searchsorted(self.thresholds, low, side='left')
+            hi = np.searchsorted(self.thresholds, high, side='left')
+        else:
+            lo = np.searchsorted(self.thresholds, low, side='right')
+            hi = np.searchsorted(self.thresholds, high, side='right')
+        hit = np.flatnonzero(self.active[lo:hi]) + lo
+        self.active[hit] = False
+        self._inactive += len(hit)
+        return self.ids[hit]
+
+    def remove(self, threshold, alert_id):
+        """Deactivate an alert's entry, found by bisecting on its threshold; compacted like crossed ones."""
+        lo = np.searchsorted(self.thresholds, threshold, side='left')
+        hi = np.searchsorted(self.thresholds, threshold, side='right')
+        hit = np.flatnonzero(self.active[lo:hi] & (self.ids[lo:hi] == alert_id)) + lo
+        if len(hit):
+            self.active[hit] = False
+            self._inactive += len(hit)
+        elif (threshold, alert_id) in self._pending:
+            self._pending.remove((threshold, alert_id))
+
+
+class AlertEngine:
+    """
+    Stores threshold, percent-move and indicator-cross alerts and matches them against price ticks.
+    Triggered alerts are one-shot and are queued for batched delivery.
+    """
+
+    def __init__(self, max_queue=100000, track=None):
+        self.alerts = {}
+        self.track = track  # Called with [symbol] for every new alert, e.g. price_feed.track
+        self._books = {}  # (symbol, 'above' | 'below') -> ThresholdBook
+        self._indicator_groups = {}  # (symbol, period) -> {'above': set(ids), 'below': set(ids)}
+        self._windows = {}  # (symbol, period) -> deque of recent prices for the moving average
+        self._last_price = {}
+        self._last_side = {}  # (symbol, period) -> sign of price - SMA on the previous tick
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.triggered = deque(maxlen=max_queue)
+        self.listeners = []  # Callables receiving each tick's batch of triggered events
+
+    def symbols(self):
+        with self._lock:
+            return {alert['symbol'] for alert in self.alerts.values()}
+
+    def add_threshold(self, symbol, threshold, direction):
+        """Alert when the price crosses `threshold` moving 'above' or 'below' it."""
+        if direction not in ('above', 'below'):
+            raise ValueError("direction must be 'above' or 'below'")
+        with self._lock:
+            alert_id = self._add_threshold(symbol, float(threshold), direction, {'kind': 'threshold'})
+        self._tracked(symbol)
+        return alert_id
+
+    def add_percent_move(self, symbol, percent, reference_price=None):
+        """
+        Alert when the price moves `percent` (e.g. 5 for 5%) up or down from the reference price
+        (default: the last seen price). Stored as two thresholds sharing one alert id.
+        """
+        with self._lock:
+            reference_price = reference_price or self._last_price.get(symbol)
+            if reference_price is None:
+                raise ValueError(f"No reference price for {symbol} yet.")
+            alert_id = next(self._ids)
+            up = reference_price * (1 + percent / 100)
+            down = reference_price * (1 - percent / 100)
+            self._book(symbol, 'above').add(up, alert_id)
+            self._book(symbol, 'below').add(down, alert_id)
+            self.alerts[alert_id] = {'id': alert_id, 'symbol': symbol, 'kind': 'percent_move', 'percent': percent,
+                                     'reference_price': reference_price, 'thresholds': [down, up]}
+        self._tracked(symbol)
+        return alert_id
+
+    def add_indicator_cross(self, symbol, period, direction):
+        """Alert when the price crosses its `period`-tick simple moving average 'above' or 'below'."""
+        if direction not in ('above', 'below'):
+            raise ValueError("direction must be 'above' or 'below'")
+        with self._lock:
+            alert_id = next(self._ids)
+            group = self._indicator_groups.setdefault((symbol, period), {'above': set(), 'below': set()})
+            group[direction].add(alert_id)
+            self._windows.setdefault((symbol, period), deque(maxlen=period))
+            self.alerts[alert_id] = {'id': alert_id, 'symbol': symbol, 'kind': 'sma_cross',
+                                     'period': period, 'direction': direction}
+        self._tracked(symbol)
+        return alert_id
+
+    def remove(self, alert_id):
+        with self._lock:
+            self._discard(alert_id)
+
+    def _tracked(self, symbol):
+        if self.track is not None:
+            self.track([symbol])
+
+    def _book(self, symbol, direction):
+        return self._books.setdefault((symbol, direction), ThresholdBook())
+
+    def _add_threshold(self, symbol, threshold, direction, fields):
+        alert_id = next(self._ids)
+        self._book(symbol, direction).add(threshold, alert_id)
+        self.alerts[alert_id] = dict(fields, id=alert_id, symbol=symbol, threshold=threshold, direction=direction)
+        return alert_id
+
+    def _discard(self, alert_id):
+        alert = self.alerts.pop(alert_id, None)
+        if alert is None:
+            return
+        if alert['kind'] == 'sma_cross':
+            self._indicator_groups[(alert['symbol'], alert['period'])][alert['direction']].discard(alert_id)
+        elif alert['kind'] == 'percent_move':
+            down, up = alert['thresholds']
+            self._book(alert['symbol'], 'below').remove(down, alert_id)
+            self._book(alert['symbol'], 'above').remove(up, alert_id)
+        else:
+            self._book(alert['symbol'], alert['direction']).remove(alert['threshold'], alert_id)
+
+    def on_prices(self, prices, timestamp):
+        """Price-feed callback: match one tick of {symbol: price} and queue the triggered events."""
+        events = []
+        with self._lock:
+            for symbol, price in prices.items():
+                previous = self._last_price.get(symbol)
+                self._last_price[symbol] = price
+                if previous is not None and price != previous:
+                    fired = []
+                    if price > previous:
+                        book = self._books.get((symbol, 'above'))
+                        if book is not None:
+                            fired.extend(book.cross(previous, price, low_inclusive=False))
+                    else:
+                        book = self._books.get((symbol, 'below'))
+                        if book is not None:
+                            fired.extend(book.cross(price, previous, low_inclusive=True))
+                    for alert_id in fired:
+                        events.append(self._fire(int(alert_id), price, timestamp))
+                events.extend(self._check_indicators(symbol, price, timestamp))
+
+        events = [event for event in events if event is not None]
+        if events:
+            self.triggered.extend(events)
+            for listener in self.listeners:
+                try:
+                    listener(events)
+                except Exception as e:
+                    logging.error(f"Alert listener {listener} failed: {e}")
+        return events
+
+    def _check_indicators(self, symbol, price, timestamp):
+        events = []
+        for (group_symbol, period), group in self._indicator_groups.items():
+            if group_symbol != symbol:
+                continue
+            window = self._windows[(symbol, period)]
+            window.append(price)
+            if len(window) < period:
+                continue
+            side = np.sign(price - sum(window) / period)
+            previous_side = self._last_side.get((symbol, period))
+            self._last_side[(symbol, period)] = side
+            if previous_side is None or side == previous_side or side == 0:
+                continue
+            direction = 'above' if side > 0 else 'below'
+            for alert_id in list(group[direction]):
+                events.append(self._fire(alert_id, price, timestamp))
+        return events
+
+    def _fire(self, alert_id, price, timestamp):
+        alert = self.alerts.get(alert_id)
+        if alert is None:
+            return None
+        self._discard(alert_id)
+        return dict(alert, triggered_price=price, triggered_at=timestamp)
+
+    def drain(self, max_events=1000):
+        """Pop up to `max_events` queued events for batched delivery."""
+        batch = []
+        while self.triggered and len(batch) < max_events:
+            batch.append(self.triggered.popleft())
+        return batch
+
+
+class _EngineServer(BaseManager):
+    pass
+
+
+class _EngineClient(BaseManager):
+    pass
+
+
+_EngineClient.register('engine')
+
+
+def _authkey():
+    # Set by gunicorn.conf.py before the collector and workers start; otherwise this process's own key
+    key = os.environ.get('MAICOIN_ALERTS_KEY')
+    return key.encode() if key else None
+
+
+def serve_engine(engine, address=ALERTS_ADDRESS):
+    """Collector side: share `engine` with the server workers over a local socket, from a background thread."""
+    if os.path.exists(address):
+        os.remove(address)  # Left behind by a previous collector
+    _EngineServer.register('engine', callable=lambda: engine)
+    server = _EngineServer(address=address, authkey=_authkey()).get_server()
+    threading.Thread(target=server.serve_forever, name='alert-engine', daemon=True).start()
+    return server
+
+
+def connect_engine(address=ALERTS_ADDRESS):
+    """Worker side: a proxy with the engine's public methods, each call running in the collector."""
+    manager = _EngineClient(address=address, authkey=_authkey())
+    manager.connect()
+    return manager.engine()
@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+from functools import reduce
+
+import numpy as np
+
+BLOCK_MS = 60 * 60 * 1000  # Analytics state is kept per clock-hour block of the series
+
+
+class AnalyticsCache:
+    """
+    Memoizes analytics per (name, series id, parameters) together with the data they were computed
+    for. Running state is kept per clock-aligned block (`block_ms`) and blocks are combined with
+    `merge`, so a window that gained points at the end only extends its last block, and a window
+    that also slid forward (e.g. "the last 48 hours") drops the blocks that fell out and rebuilds
+    only the one block cut by the new start. A repeat call on the same data is a dictionary lookup.
+    Least recently used entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries=256, block_ms=BLOCK_MS):
+        self.max_entries = max_entries
+        self.block_ms = block_ms
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.incremental = 0
+        self.misses = 0
+
+    def compute(self, name, series_id, timestamps, params, init, extend, finalize, merge, finalize_key=None):
+        """
+        Return finalize(state) for the series. extend(state, start, stop) folds points start:stop of
+        `timestamps` into a state from init(); merge(left, right) combines the states of two adjacent
+        stretches (left first) into a new state without modifying either. `timestamps` (ms) must be
+        ascending; `finalize_key` captures anything else finalize depends on.
+        """
+        key = (name, series_id, params)
+        ms = np.asarray(timestamps).astype(np.int64)
+        n = len(ms)
+        first = int(ms[0]) if n else None
+        last = int(ms[-1]) if n else None
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+        if entry is not None and (entry['n'], entry['first'], entry['last']) == (n, first, last):
+            self.hits += 1
+            blocks = entry['blocks']
+            if entry['finalize_key'] == finalize_key:
+                result = entry['result']
+            else:
+                result = finalize(reduce(merge, [block['state'] for block in blocks.values()], init()))
+        else:
+            cached = entry['blocks'] if entry is not None else {}
+            blocks = {}
+            block_ids = ms // self.block_ms
+            ids, starts = np.unique(block_ids, return_index=True)
+            stops = np.append(starts[1:], n)
+            reused = False
+            for block_id, start, stop in zip(ids.tolist(), starts.tolist(), stops.tolist()):
+                block = cached.get(block_id)
+                count = stop - start
+                # A block is reusable if the series still has the same points there, or the same
+                # points followed by new ones; a block cut by a new window start is rebuilt
+                if (block is not None and block['first'] == ms[start] and block['count'] <= count
+                        and ms[start + block['count'] - 1] == block['last']):
+                    state = block['state']
+                    if block['count'] < count:
+                        state = extend(state, start + block['count'], stop)
+                    reused = True
+                else:
+                    state = extend(init(), start, stop)
+                blocks[block_id] = {'first': int(ms[start]), 'last': int(ms[stop - 1]), 'count': count,
+                                    'state': state}
+            if reused:
+                self.incremental += 1
+            else:
+                self.misses += 1
+            result = finalize(reduce(merge, [block['state'] for block in blocks.values()], init()))
+
+        with self._lock:
+            self._entries[key] = {'n': n, 'first': first, 'last': last, 'blocks': blocks,
+                                  'result': result, 'finalize_key': finalize_key}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+
+# Process-wide cache shared by the dashboard and analysis modules
+analytics_cache = AnalyticsCache()
@@ -1,8 +1,112 @@
 # api_utils.py
+import orjson
 import requests
 import logging
+import os
+import threading
+import time
+
+from modules.decoding import decode_ohlcv
+
+# Upstream endpoints; override to point the app at a local stand-in server (modules/standin_server.py)
+BASE_URL = os.environ.get('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3')
+CRYPTOCOMPARE_URL = os.environ.get('CRYPTOCOMPARE_API_URL', 'https://min-api.cryptocompare.com/data/v2')
+EXCHANGE_API_URL = os.environ.get('EXCHANGE_API_URL')  # When set, OHLCV calls go here instead of ccxt
+REPLAY_SPEED = os.environ.get('MAICOIN_REPLAY_SPEED')  # When set, OHLCV comes from stored candles (modules/replay.py)
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to an upstream API at least `interval` seconds apart."""
+
+    def __init__(self, calls_per_minute):
+        self.interval = 60.0 / calls_per_minute
+        self._lock = threading.Lock()
+        self._next_call = 0.0
+
+    def wait(self):
+        """Block until the caller is allowed to make the next request."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_call)
+            self._next_call = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+# Shared limiters so every fetcher in the process stays under the same budget
+coingecko_limiter = RateLimiter(calls_per_minute=30)
+cryptocompare_limiter = RateLimiter(calls_per_minute=50)
+
+
+class RemoteOHLCVExchange:
+    """Minimal ccxt-compatible client for OHLCV and tickers from EXCHANGE_API_URL/<exchange>/..."""
+
+    has = {'fetchOHLCV': True, 'fetchTickers': True}
+
+    def __init__(self, exchange_name, base_url=None):
+        self.id = exchange_name
+        self.base_url = base_url or EXCHANGE_API_URL
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        params = {'symbol': symbol, 'timeframe': timeframe, 'since': since, 'limit': limit}
+        response = requests.get(f'{self.base_url}/{self.id}/ohlcv', params=params, timeout=10)
+        response.raise_for_status()
+        return decode_ohlcv(response.content)
+
+    def fetch_tickers(self, symbols=None):
+        params = {'symbols': ','.join(symbols)} if symbols else None
+        response = requests.get(f'{self.base_url}/{self.id}/tickers', params=params, timeout=10)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def fetch_ticker(self, symbol):
+        return self.fetch_tickers([symbol])[symbol]
+
+
+def make_exchange(exchange_name, config=None):
+    """ccxt exchange by name, or the replay or stand-in OHLCV client when configured."""
+    if REPLAY_SPEED:
+        from modules.replay import parse_speed, shared_exchange
+        return shared_exchange(parse_speed(REPLAY_SPEED))
+    if EXCHANGE_API_URL:
+        return RemoteOHLCVExchange(exchange_name)
+    import ccxt
+    return getattr(ccxt, exchange_name)(config or {})
+
+
+def fetch_data_with_retry(exchange, symbol, timeframe, limit=100, retries=5):
+    """OHLCV rows from a ccxt-style exchange, retrying with exponential backoff; None if every attempt fails."""
+    for attempt in range(retries):
+        try:
+            return exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+        except Exception as e:
+            logging.warning(f"Attempt {attempt + 1} failed for {symbol} {timeframe}: {e}")
+            if attempt < retries - 1:
+                time.sleep(2 ** attempt)  # Exponential backoff
+    logging.error(f"Max retries reached for fetching {symbol} {timeframe}.")
+    return None
+
+
+def get_json_with_retry(url, params=None, limiter=None, retries=5, timeout=10, decode=orjson.loads):
+    """
+    GET a JSON payload, honoring the shared rate limit and backing off on 429s and errors.
+    `decode` turns the raw body into the result, e.g. decode_market_chart for NumPy price columns.
+    """
+    for attempt in range(retries):
+        if limiter is not None:
+            limiter.wait()
+        try:
+            response = requests.get(url, params=params, timeout=timeout)
+            response.raise_for_status()
+            return decode(response.content)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            logging.warning(f"Attempt {attempt + 1} failed for {url} (status {status}): {e}")
+            if attempt < retries - 1:
+                time.sleep(2 ** attempt)
+    logging.error(f"Max retries reached for {url}.")
+    return None
 
-BASE_URL = 'https://api.coingecko.com/api/v3'
 
 def get_prices(crypto_ids, currency='usd'):
     """Fetch prices for multiple cryptocurrencies."""
@@ -11,7 +115,7 @@ def get_prices(crypto_ids, currency='usd'):
     try:
         response = requests.get(url)
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return orjson.loads(response.content)
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
         logging.error(f"Error fetching prices: {e}")
         return {}
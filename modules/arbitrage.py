@@ -0,0 +1,189 @@
+"""
+Cross-exchange spread scanner: tickers for a set of symbols are pulled from several exchanges
+concurrently (one batched fetch_tickers call per exchange where supported), then the spread of
+every buy-here/sell-there pair is computed at once as a [symbol, buy exchange, sell exchange]
+array, net of taker fees on both legs.
+
+    python -m modules.arbitrage --exchanges kraken,bitstamp,coinbase --symbols BTC/USD,ETH/USD --interval 15
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from modules.api import make_exchange
+
+DEFAULT_EXCHANGES = ['kraken', 'bitstamp', 'coinbase', 'gemini']
+DEFAULT_SYMBOLS = ['BTC/USD', 'ETH/USD', 'DOGE/USD']
+DEFAULT_TAKER_FEE = 0.0025  # Used when an exchange does not report its own
+
+
+def spread_matrix(bids, asks, fees):
+    """
+    Net return of buying at ask on exchange i and selling at bid on exchange j, for every symbol:
+    bids/asks are [S, E] (NaN where unquoted), fees [E] taker fractions. Returns (gross, net), both
+    [S, E, E], with NaN on the diagonal and wherever a quote is missing.
+    """
+    bids = np.asarray(bids, dtype=np.float64)
+    asks = np.asarray(asks, dtype=np.float64)
+    fees = np.asarray(fees, dtype=np.float64)
+    buy = asks[:, :, None]  # [S, E, 1]: buy leg on exchange i
+    sell = bids[:, None, :]  # [S, 1, E]: sell leg on exchange j
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gross = sell / buy - 1
+        net = sell * (1 - fees)[None, None, :] / (buy * (1 + fees)[None, :, None]) - 1
+    diagonal = np.eye(bids.shape[1], dtype=bool)[None]
+    gross = np.where(diagonal, np.nan, gross)
+    net = np.where(diagonal, np.nan, net)
+    return gross, net
+
+
+def rank_opportunities(symbols, exchanges, bids, asks, gross, net, min_net=None, limit=50):
+    """Rows for the best (symbol, buy exchange, sell exchange) routes, highest net return first."""
+    flat = np.where(np.isnan(net), -np.inf, net).ravel()
+    order = np.argsort(flat)[::-1]
+    order = order[np.isfinite(flat[order])]
+    if min_net is not None:
+        order = order[flat[order] >= min_net]
+    rows = []
+    for s, i, j in zip(*np.unravel_index(order[:limit], net.shape)):
+        rows.append({'symbol': symbols[s], 'buy_exchange': exchanges[i], 'sell_exchange': exchanges[j],
+                     'buy_ask': float(asks[s, i]), 'sell_bid': float(bids[s, j]),
+                     'gross_pct': float(gross[s, i, j] * 100), 'net_pct': float(net[s, i, j] * 100)})
+    return rows
+
+
+class ArbitrageScanner:
+    """Keeps one client per exchange and the most recent ranked spread table."""
+
+    def __init__(self, exchanges=None, symbols=None, fees=None, interval=15):
+        self.exchanges = list(exchanges or DEFAULT_EXCHANGES)
+        self.symbols = list(symbols or DEFAULT_SYMBOLS)
+        self.interval = interval
+        self._fee_overrides = fees or {}
+        self._clients = {}
+        self._executor = ThreadPoolExecutor(max_workers=len(self.exchanges))
+        self._lock = threading.Lock()
+        self._scheduler = None
+        self.latest = None
+
+    def _client(self, exchange_name):
+        client = self._clients.get(exchange_name)
+        if client is None:
+            client = self._clients[exchange_name] = make_exchange(exchange_name, {'enableRateLimit': True})
+        return client
+
+    def fee(self, exchange_name):
+        if exchange_name in self._fee_overrides:
+            return self._fee_overrides[exchange_name]
+        fees = getattr(self._clients.get(exchange_name), 'fees', None) or {}
+        return fees.get('trading', {}).get('taker') or DEFAULT_TAKER_FEE
+
+    def _fetch(self, exchange_name):
+        """Tickers {symbol: ticker} from one exchange, and how long the fetch took."""
+        started = time.perf_counter()
+        client = self._client(exchange_name)
+        symbols = self.symbols
+        if hasattr(client, 'load_markets'):
+            # ccxt rejects a whole batch over one unlisted symbol; markets are cached after the first call
+            markets = client.load_markets()
+            symbols = [symbol for symbol in symbols if symbol in markets]
+        if getattr(client, 'has', {}).get('fetchTickers'):
+            tickers = client.fetch_tickers(symbols) if symbols else {}
+        else:
+            tickers = {}
+            for symbol in symbols:
+                try:
+                    tickers[symbol] = client.fetch_ticker(symbol)
+                except Exception as e:
+                    logging.debug(f"{exchange_name} has no ticker for {symbol}: {e}")
+        return tickers, time.perf_counter() - started
+
+    def scan_once(self, min_net=None, limit=50):
+        """Fetch every exchange concurrently, rebuild the bid/ask matrices and rank the routes."""
+        futures = {name: self._executor.submit(self._fetch, name) for name in self.exchanges}
+        bids = np.full((len(self.symbols), len(self.exchanges)), np.nan)
+        asks = np.full_like(bids, np.nan)
+        latency, errors = {}, {}
+        for j, name in enumerate(self.exchanges):
+            try:
+                tickers, latency[name] = futures[name].result()
+            except Exception as e:
+                errors[name] = str(e)
+                logging.warning(f"Ticker fetch from {name} failed: {e}")
+                continue
+            for s, symbol in enumerate(self.symbols):
+                ticker = tickers.get(symbol) or {}
+                if ticker.get('bid') and ticker.get('ask'):
+                    bids[s, j], asks[s, j] = ticker['bid'], ticker['ask']
+
+        fees = np.array([self.fee(name) for name in self.exchanges])
+        gross, net = spread_matrix(bids, asks, fees)
+        result = {
+            'timestamp': time.time(),
+            'opportunities': rank_opportunities(self.symbols, self.exchanges, bids, asks, gross, net, min_net, limit),
+            'latency_ms': {name: seconds * 1000 for name, seconds in latency.items()},
+            'fees': dict(zip(self.exchanges, fees.tolist())),
+            'errors': errors,
+        }
+        with self._lock:
+            self.latest = result
+        return result
+
+    def ensure_started(self):
+        """Refresh the table in the background every `interval` seconds (once per process)."""
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        with self._lock:
+            if self._scheduler is not None:
+                return self._scheduler
+            self._scheduler = BackgroundScheduler(daemon=True)
+            self._scheduler.add_job(self.scan_once, 'interval', seconds=self.interval, id='arbitrage_scan',
+                                    max_instances=1, coalesce=True)
+            self._scheduler.start()
+            return self._scheduler
+
+
+def scanner_from_env():
+    """
+    Scanner configured by MAICOIN_ARB_EXCHANGES and MAICOIN_ARB_SYMBOLS (comma-separated; pairs
+    default to the watchlist) and MAICOIN_ARB_INTERVAL (seconds).
+    """
+    from modules.coin_registry import coin_registry
+
+    exchanges = os.environ.get('MAICOIN_ARB_EXCHANGES')
+    symbols = os.environ.get('MAICOIN_ARB_SYMBOLS')
+    return ArbitrageScanner(
+        exchanges.split(',') if exchanges else None,
+        symbols.split(',') if symbols else [coin['exchange_symbol'] for coin in coin_registry.watchlist()],
+        interval=int(os.environ.get('MAICOIN_ARB_INTERVAL', 15)))
+
+
+def print_table(result, limit=20):
+    print(f"{'symbol':10} {'buy on':10} {'ask':>14} {'sell on':10} {'bid':>14} {'gross %':>8} {'net %':>8}")
+    for row in result['opportunities'][:limit]:
+        print(f"{row['symbol']:10} {row['buy_exchange']:10} {row['buy_ask']:>14.6f} {row['sell_exchange']:10} "
+              f"{row['sell_bid']:>14.6f} {row['gross_pct']:>8.3f} {row['net_pct']:>8.3f}")
+    print("latency: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in result['latency_ms'].items()))
+    for name, error in result['errors'].items():
+        print(f"error: {name}: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-exchange spread and arbitrage scanner.")
+    parser.add_argument('--exchanges', default=','.join(DEFAULT_EXCHANGES))
+    parser.add_argument('--symbols', default=','.join(DEFAULT_SYMBOLS))
+    parser.add_argument('--interval', type=float, default=15, help="Seconds between scans")
+    parser.add_argument('--once', action='store_true')
+    args = parser.parse_args()
+
+    scanner = ArbitrageScanner(args.exchanges.split(','), args.symbols.split(','))
+    while True:
+        print_table(scanner.scan_once())
+        if args.once:
+            break
+        time.sleep(args.interval)
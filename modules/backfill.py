@@ -0,0 +1,218 @@
+import argparse
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+import ccxt
+import numpy as np
+
+from modules.api import CRYPTOCOMPARE_URL, RateLimiter, cryptocompare_limiter, get_json_with_retry, make_exchange
+from modules.candle_store import append_candles, candle_file
+from modules.decoding import OHLCV_COLUMNS, decode_records
+from modules.pyramid import CandlePyramid, pyramid_dir
+
+logging.basicConfig(level=logging.INFO)
+
+# CryptoCompare endpoints and candle length (seconds) for each supported timeframe
+CRYPTOCOMPARE_TIMEFRAMES = {
+    '1d': ('histoday', 86400),
+    '1h': ('histohour', 3600),
+    '1m': ('histominute', 60),
+}
+CRYPTOCOMPARE_PAGE_LIMIT = 2000  # Max 'limit' accepted by CryptoCompare (returns limit + 1 candles)
+
+
+def plan_cryptocompare_pages(start, end, timeframe, limit=CRYPTOCOMPARE_PAGE_LIMIT):
+    """
+    Split [start, end] (unix seconds) into `toTs` anchors, newest first.
+    Each page returns `limit + 1` candles ending at its anchor. Anchors sit on a fixed grid counted
+    from the epoch, so runs with a different `end` (e.g. "now") plan the same pages.
+    """
+    step = CRYPTOCOMPARE_TIMEFRAMES[timeframe][1]
+    span = (limit + 1) * step
+    return [page * span + span - step for page in range(end // span, start // span - 1, -1)]
+
+
+def plan_ccxt_pages(start, end, timeframe, limit):
+    """Split [start, end] (unix milliseconds) into ccxt `since` anchors on a fixed grid, oldest first."""
+    span = ccxt.Exchange.parse_timeframe(timeframe) * 1000 * limit
+    return [page * span for page in range(start // span, end // span + 1)]
+
+
+def fetch_cryptocompare_page(fsym, tsym, timeframe, to_ts, limit=CRYPTOCOMPARE_PAGE_LIMIT,
+                             limiter=cryptocompare_limiter):
+    """Fetch one CryptoCompare page as a float64 array of [timestamp_ms, open, high, low, close, volume] rows."""
+    endpoint = CRYPTOCOMPARE_TIMEFRAMES[timeframe][0]
+    params = {'fsym': fsym, 'tsym': tsym, 'limit': limit, 'toTs': to_ts}
+    data = get_json_with_retry(f'{CRYPTOCOMPARE_URL}/{endpoint}', params, limiter=limiter)
+    if not data or data.get('Response') != 'Success':
+        raise RuntimeError(f"CryptoCompare page toTs={to_ts} failed: {data}")
+
+    columns = decode_records(data['Data']['Data'], ['time', 'open', 'high', 'low', 'close', 'volumefrom'])
+    rows = np.column_stack([columns['time'] * 1000] + [columns[field] for field in
+                                                       ['open', 'high', 'low', 'close', 'volumefrom']])
+    # Candles before a coin was listed come back as all zeros
+    return rows[(rows[:, 4] != 0) | (rows[:, 5] != 0)]
+
+
+class _ExchangePool:
+    """One ccxt client per worker thread, all sharing a single rate limiter."""
+
+    def __init__(self, exchange_name, calls_per_minute):
+        self.exchange_name = exchange_name
+        self.limiter = RateLimiter(calls_per_minute)
+        self._local = threading.local()
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        exchange = getattr(self._local, 'exchange', None)
+        if exchange is None:
+            exchange = self._local.exchange = make_exchange(self.exchange_name)
+        retries = 5
+        for attempt in range(retries):
+            self.limiter.wait()
+            try:
+                return exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+            except Exception as e:
+                logging.warning(f"Attempt {attempt + 1} failed for since={since}: {e}")
+                if attempt == retries - 1:
+                    raise
+
+
+def _load_checkpoint(path):
+    """Finished [first_ms, last_ms] ranges."""
+    if os.path.exists(path):
+        with open(path) as f:
+            return [tuple(done) for done in json.load(f)['done']]
+    return []
+
+
+def _save_checkpoint(path, done):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'done': sorted(done)}, f)
+    os.replace(tmp_path, path)
+
+
+def _covered(done, first, last):
+    return any(a <= first and last <= b for a, b in done)
+
+
+def _merge_ranges(done, step_ms):
+    """Sorted ranges with overlapping or back-to-back ones (next candle one step later) joined."""
+    merged = []
+    for first, last in sorted(done):
+        if merged and first <= merged[-1][1] + step_ms:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def backfill(symbol, timeframe, start, end, source='cryptocompare', currency='USD',
+             exchange_name='kraken', workers=4, limit=None, calls_per_minute=None, data_dir=None):
+    """
+    Download [start, end] (datetimes) of OHLCV history concurrently and stream each page into the
+    local candle store as soon as it arrives. Finished pages are checkpointed, so re-running the
+    same backfill after an interruption only fetches what is missing. The checkpoint records the
+    time range the returned candles actually covered, merged into as few ranges as possible: a page
+    cut short by `end`, or one the source answered with fewer candles or none (e.g. Kraken only
+    serves its latest 720), is fetched again on the next run.
+    `calls_per_minute` caps requests for either source (default: the shared CryptoCompare budget,
+    or 60 per minute for ccxt).
+
+    source='cryptocompare' pages with `toTs` (symbol is the coin ticker, e.g. 'DOGE');
+    source='ccxt' pages with `since` against `exchange_name` (symbol is a pair, e.g. 'DOGE/USD').
+    Returns the number of candles written.
+    """
+    start_s, end_s = int(start.timestamp()), int(end.timestamp())
+
+    if source == 'cryptocompare':
+        limit = limit or CRYPTOCOMPARE_PAGE_LIMIT
+        store_symbol = f'{symbol}/{currency}'
+        step_ms = CRYPTOCOMPARE_TIMEFRAMES[timeframe][1] * 1000
+        limiter = RateLimiter(calls_per_minute) if calls_per_minute else cryptocompare_limiter
+        pages = {anchor: (anchor * 1000 - limit * step_ms, anchor * 1000)
+                 for anchor in plan_cryptocompare_pages(start_s, end_s, timeframe, limit)}
+
+        def fetch_page(anchor):
+            return fetch_cryptocompare_page(symbol, currency, timeframe, anchor, limit, limiter)
+    elif source == 'ccxt':
+        limit = limit or 720
+        store_symbol = symbol
+        step_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        pages = {anchor: (anchor, anchor + (limit - 1) * step_ms)
+                 for anchor in plan_ccxt_pages(start_s * 1000, end_s * 1000, timeframe, limit)}
+        pool = _ExchangePool(exchange_name, calls_per_minute or 60)
+
+        def fetch_page(anchor):
+            return pool.fetch_ohlcv(symbol, timeframe, anchor, limit)
+    else:
+        raise ValueError(f"Unknown backfill source: {source}")
+
+    checkpoint_path = candle_file(store_symbol, timeframe, data_dir) + '.checkpoint.json'
+    done = _load_checkpoint(checkpoint_path)
+    # Each page only counts for the part of it inside [start, end]
+    wanted = {anchor: (max(first, start_s * 1000), min(last, end_s * 1000)) for anchor, (first, last) in pages.items()}
+    todo = [anchor for anchor in pages if not _covered(done, *wanted[anchor])]
+    logging.info(f"Backfilling {store_symbol} {timeframe}: {len(todo)} of {len(pages)} pages to fetch")
+
+    # 1m history also feeds the multi-resolution pyramid, page by page
+    pyramid = CandlePyramid(pyramid_dir(data_dir)) if timeframe == '1m' else None
+    written = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        queue = iter(todo)
+        while True:
+            # Keep a bounded number of pages in flight so memory stays flat for long ranges
+            for anchor in queue:
+                pending[executor.submit(fetch_page, anchor)] = anchor
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                anchor = pending.pop(future)
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    logging.error(f"Page {anchor} failed, will retry on next run: {e}")
+                    failed += 1
+                    continue
+                rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+                rows = rows[(rows[:, 0] >= start_s * 1000) & (rows[:, 0] <= end_s * 1000)]
+                if not len(rows):
+                    logging.warning(f"Page {anchor} returned no candles in range, will retry on next run")
+                    continue
+                written += append_candles(store_symbol, timeframe, rows, data_dir)
+                if pyramid is not None:
+                    pyramid.update(store_symbol, rows)
+                done = _merge_ranges(done + [(int(rows[:, 0].min()), int(rows[:, 0].max()))], step_ms)
+                _save_checkpoint(checkpoint_path, done)
+
+    logging.info(f"Backfill of {store_symbol} {timeframe} wrote {written} candles ({failed} pages failed)")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill OHLCV history into the local candle store.")
+    parser.add_argument('symbol', help="Coin ticker for CryptoCompare (DOGE) or pair for ccxt (DOGE/USD)")
+    parser.add_argument('--source', choices=['cryptocompare', 'ccxt'], default='cryptocompare')
+    parser.add_argument('--timeframe', default='1d')
+    parser.add_argument('--start', required=True, help="Start date, YYYY-MM-DD")
+    parser.add_argument('--end', default=None, help="End date, YYYY-MM-DD (default: now)")
+    parser.add_argument('--currency', default='USD')
+    parser.add_argument('--exchange', default='kraken')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--calls-per-minute', type=int, default=None, help="Request cap (default: per source)")
+    args = parser.parse_args()
+
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.now()
+    backfill(args.symbol, args.timeframe, datetime.strptime(args.start, '%Y-%m-%d'), end,
+             source=args.source, currency=args.currency, exchange_name=args.exchange, workers=args.workers,
+             calls_per_minute=args.calls_per_minute)
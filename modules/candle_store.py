@@ -0,0 +1,209 @@
+import io
+import json
+import os
+import threading
+import logging
+import numpy as np
+import pandas as pd
+
+# Directory for locally persisted candles (same CSV layout as BTC_USDT_data.csv)
+DATA_DIR = os.environ.get('MAICOIN_DATA_DIR', 'data')
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'date']
+
+_write_lock = threading.Lock()
+
+
+def candle_file(symbol, timeframe, data_dir=None):
+    """Return the CSV path holding candles for a symbol and timeframe."""
+    data_dir = data_dir or DATA_DIR
+    return os.path.join(data_dir, f'{symbol.replace("/", "_")}_{timeframe}_data.csv')
+
+
+def append_candles(symbol, timeframe, rows, data_dir=None):
+    """
+    Append OHLCV rows ([timestamp_ms, open, high, low, close, volume], a list or array) to the local store.
+    Rows may arrive out of order; readers sort and de-duplicate on load.
+    """
+    if len(rows) == 0:
+        return 0
+    path = candle_file(symbol, timeframe, data_dir)
+    df = pd.DataFrame(rows, columns=COLUMNS[:-1]).astype({'timestamp': 'int64'})
+    df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
+
+    with _write_lock:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        order = read_order(path) if size else {'size': 0, 'rows': 0, 'ordered_rows': 0, 'last': None,
+                                                'tail_min': None, 'max': None}
+        if size:
+            df.to_csv(path, mode='a', header=False, index=False)
+        else:
+            df.to_csv(path, index=False)
+        if order is not None and order['size'] == size:
+            _save_order(path, _extend_order(order, df['timestamp'].to_numpy(), os.path.getsize(path)))
+        elif os.path.exists(_order_path(path)):
+            os.remove(_order_path(path))  # Something else appended since: the order is unknown
+    return len(df)
+
+
+def _order_path(path):
+    return f'{path}.order.json'
+
+
+def read_order(path):
+    """
+    Order metadata kept by append_candles for a candle file, or None if unknown (the file predates it,
+    was appended to by another writer or was replaced). {'size', 'rows', 'ordered_rows', 'last',
+    'tail_min', 'max'}: of the first `rows` rows (`size` bytes), the first `ordered_rows` have strictly
+    increasing timestamps up to `last`, every later one is at or after `tail_min`, and `max` is the
+    newest timestamp of them all.
+    """
+    try:
+        with open(_order_path(path)) as f:
+            order = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        if os.path.getsize(path) < order['size']:
+            return None
+    except FileNotFoundError:
+        return None
+    return order
+
+
+def _extend_order(order, timestamps, size):
+    """Order metadata after appending rows with these timestamps (in written order)."""
+    newest = int(timestamps.max())
+    order = dict(order, size=size, rows=order['rows'] + len(timestamps),
+                 max=newest if order['max'] is None else max(order['max'], newest))
+    if order['ordered_rows'] < order['rows'] - len(timestamps):
+        # Already out of order: only the earliest later timestamp matters
+        order['tail_min'] = min(order['tail_min'], int(timestamps.min()))
+        return order
+    steps = np.diff(timestamps) > 0
+    if order['last'] is not None:
+        steps = np.append(timestamps[0] > order['last'], steps)
+    else:
+        steps = np.append(True, steps)
+    ordered = len(timestamps) if steps.all() else int(steps.argmin())
+    order['ordered_rows'] += ordered
+    if ordered:
+        order['last'] = int(timestamps[ordered - 1])
+    if ordered < len(timestamps):
+        order['tail_min'] = int(timestamps[ordered:].min())
+    return order
+
+
+def _save_order(path, order):
+    tmp_path = f'{_order_path(path)}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(order, f)
+    os.replace(tmp_path, _order_path(path))
+
+
+def latest_timestamp(symbol, timeframe, data_dir=None):
+    """Newest stored timestamp according to the order metadata, or None if unknown."""
+    order = read_order(candle_file(symbol, timeframe, data_dir))
+    return None if order is None else order['max']
+
+
+def _reverse_lines(f, end, block=1 << 16):
+    """(offset, line) for the lines of an open binary file that end before byte `end`, last line first."""
+    position, partial = end, b''
+    while position > 0:
+        read = min(block, position)
+        position -= read
+        f.seek(position)
+        lines = (f.read(read) + partial).split(b'\n')
+        partial = lines[0]
+        offset = position + len(partial) + 1
+        tail = []
+        for line in lines[1:]:
+            tail.append((offset, line))
+            offset += len(line) + 1
+        yield from reversed(tail)
+    yield 0, partial
+
+
+def _start_offset(path, order, start):
+    """
+    Byte offset of the first line any row at or after `start` can be on: rows written after the
+    ordered prefix may hold any timestamp, the prefix is searched backwards for the first row
+    before `start`. None if that is the first row.
+    """
+    unordered = order['rows'] - order['ordered_rows']
+    with open(path, 'rb') as f:
+        for offset, line in _reverse_lines(f, order['size']):
+            if not line:
+                continue  # The newline ending the file
+            if offset == 0:
+                return None  # Header
+            if unordered:
+                unordered -= 1
+            elif int(line.split(b',', 1)[0]) < start:
+                return offset + len(line) + 1
+    return None
+
+
+def load_candles(symbol, timeframe, start=None, end=None, data_dir=None):
+    """
+    Load stored candles as a sorted, de-duplicated DataFrame.
+    `start` and `end` are optional millisecond timestamps (inclusive). With `start`, a store with
+    order metadata is only read from the first row that can be in range.
+    """
+    path = candle_file(symbol, timeframe, data_dir)
+    if not os.path.exists(path):
+        logging.warning(f"No stored candles for {symbol} {timeframe} at {path}")
+        return pd.DataFrame(columns=COLUMNS)
+
+    order = read_order(path) if start is not None else None
+    offset = _start_offset(path, order, start) if order is not None else None
+    if offset is None:
+        df = pd.read_csv(path)
+    else:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        data = data[:data.rfind(b'\n') + 1]  # A row still being written is left out
+        df = pd.read_csv(io.BytesIO(data), header=None, names=COLUMNS) if data else pd.read_csv(path, nrows=0)
+    df = df.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
+    if start is not None:
+        df = df[df['timestamp'] >= start]
+    if end is not None:
+        df = df[df['timestamp'] <= end]
+    df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df.reset_index(drop=True)
+
+
+def load_appended_candles(symbol, timeframe, offset, data_dir=None):
+    """
+    Rows appended to a stored series after byte `offset` (as they were written: unsorted, possibly
+    duplicated), and the offset to continue from. Returns (None, 0) when the file is missing or
+    shorter than `offset`, i.e. it was replaced and must be read in full.
+    """
+    path = candle_file(symbol, timeframe, data_dir)
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < offset:
+                return None, 0
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return None, 0
+    # Stop at the last complete line; a row still being written is picked up next time
+    data = data[:data.rfind(b'\n') + 1]
+    if not data:
+        return pd.DataFrame(columns=COLUMNS), offset
+    df = pd.read_csv(io.BytesIO(data), header=None, names=COLUMNS)
+    return df, offset + len(data)
+
+
+def store_version(symbol, timeframe, data_dir=None):
+    """Cheap version stamp for a stored series; changes whenever candles are appended."""
+    path = candle_file(symbol, timeframe, data_dir)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
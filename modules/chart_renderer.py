@@ -0,0 +1,207 @@
+"""
+Headless PNG/SVG price charts rendered with matplotlib's Agg backend in a process pool (matplotlib
+is not thread-safe). Each render is a file named by a hash of (symbol, timeframe, range, format,
+data version), so its URL never changes content and can be cached forever by browsers; when new
+candles arrive the next request gets the previous image while the new one renders in the background.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from modules.candle_store import DATA_DIR, store_version
+from modules.shared_snapshot import serving_role
+
+CHART_DIR = os.environ.get('MAICOIN_CHART_DIR', os.path.join(DATA_DIR, 'charts'))
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# Named ranges, measured back from the newest stored candle so a render depends only on the data
+RANGES = {'1d': 86_400_000, '7d': 7 * 86_400_000, '30d': 30 * 86_400_000, '100d': 100 * 86_400_000, 'all': None}
+
+
+def chart_key(symbol, timeframe, range_name, fmt, version):
+    raw = f'{symbol}|{timeframe}|{range_name}|{fmt}|{version}'
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def render_chart(symbol, timeframe, range_name, fmt, path, data_dir=None):
+    """Process-pool worker: plot the stored closes for one range and write the image atomically to `path`."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from modules.candle_store import load_candles
+
+    df = load_candles(symbol, timeframe, data_dir=data_dir)
+    span = RANGES[range_name]
+    if span is not None and len(df):
+        df = df[df['timestamp'] >= df['timestamp'].iloc[-1] - span]
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    try:
+        ax.plot(df['date'], df['close'])
+        ax.set_title(f'{symbol} Price ({range_name})')
+        ax.set_xlabel('Date')
+        ax.set_ylabel(f'Close Price ({symbol.split("/")[-1]})')
+        ax.tick_params(axis='x', labelrotation=45)
+        fig.tight_layout()
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        fig.savefig(tmp_path, format=fmt, dpi=100)
+        os.replace(tmp_path, path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+class ChartRenderer:
+    """Cache of rendered charts on disk plus the process pool that fills it."""
+
+    def __init__(self, chart_dir=CHART_DIR, workers=2, data_dir=None):
+        self.chart_dir = chart_dir
+        self.data_dir = data_dir
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = {}  # file name -> Future
+        self._latest = {}  # (symbol, timeframe, range, fmt) -> file name of the newest finished render
+        self._latest_stamp = None  # mtime of latest.json when it was last merged in
+        self._scheduler = None
+
+    def _executor(self):
+        if self._pool is None:
+            # Spawned, not forked, workers: the web server process has threads and open sockets
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _submit(self, symbol, timeframe, range_name, fmt, name):
+        """Queue a render unless the same one is already running; returns its Future."""
+        with self._lock:
+            future = self._in_flight.get(name)
+            if future is None:
+                path = os.path.join(self.chart_dir, name)
+                os.makedirs(self.chart_dir, exist_ok=True)
+                future = self._executor().submit(render_chart, symbol, timeframe, range_name, fmt, path,
+                                                 self.data_dir)
+                self._in_flight[name] = future
+                future.add_done_callback(
+                    lambda done: self._finished(done, (symbol, timeframe, range_name, fmt), name))
+            return future
+
+    def _sync_latest(self, save=False):
+        """
+        Merge in latest.json, the newest render of every chart across server processes, so a worker
+        can serve another worker's image while re-rendering and the collector knows what to watch;
+        with save=True, write the merged index back. Call with the lock held.
+        """
+        path = os.path.join(self.chart_dir, 'latest.json')
+        try:
+            stamp = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            stamp = None
+        if stamp is not None and stamp != self._latest_stamp:
+            try:
+                with open(path) as f:
+                    shared = {tuple(chart): name for *chart, name in json.load(f)}
+            except (FileNotFoundError, ValueError):
+                shared = {}
+            # Entries in the file are the newest; keep ours only for charts it does not list yet
+            self._latest = {**self._latest, **shared}
+            self._latest_stamp = stamp
+        if save:
+            os.makedirs(self.chart_dir, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump([[*chart, name] for chart, name in self._latest.items()], f)
+            os.replace(tmp_path, path)
+            self._latest_stamp = os.stat(path).st_mtime_ns
+
+    def _finished(self, future, chart, name):
+        with self._lock:
+            self._in_flight.pop(name, None)
+            error = future.exception()
+            if error is None:
+                self._sync_latest()
+                previous = self._latest.get(chart)
+                self._latest[chart] = name
+                self._sync_latest(save=True)
+                # Superseded renders are dropped so the cache holds one file per chart
+                if previous not in (None, name):
+                    try:
+                        os.remove(os.path.join(self.chart_dir, previous))
+                    except FileNotFoundError:
+                        pass
+                return
+            logging.error(f"Rendering {chart} failed: {error}")
+            if isinstance(error, BrokenProcessPool):
+                # A worker died; start a fresh pool on the next submit
+                self._pool = None
+
+    def get(self, symbol, timeframe='1d', range_name='all', fmt='png', wait=True, timeout=60):
+        """
+        File name (inside chart_dir) of the chart for the current data, or None if nothing is stored
+        or the render failed.
+        If the data changed since the last render, the previous image is returned while the new
+        one renders; a first-ever render is waited for (unless wait=False).
+        """
+        if fmt not in FORMATS or range_name not in RANGES:
+            raise ValueError(f"Unsupported chart format or range: {fmt}, {range_name}")
+        version = store_version(symbol, timeframe, self.data_dir)
+        if version is None:
+            return None
+        name = f'{chart_key(symbol, timeframe, range_name, fmt, version)}.{fmt}'
+        if os.path.exists(os.path.join(self.chart_dir, name)):
+            return name
+
+        future = self._submit(symbol, timeframe, range_name, fmt, name)
+        with self._lock:
+            self._sync_latest()
+            stale = self._latest.get((symbol, timeframe, range_name, fmt))
+        if stale is not None and os.path.exists(os.path.join(self.chart_dir, stale)):
+            return stale
+        if not wait:
+            return None
+        try:
+            future.result(timeout)
+        except Exception as e:
+            logging.error(f"No chart for {symbol} {timeframe} {range_name}: {e}")
+            return None
+        return name
+
+    def refresh(self, charts):
+        """Re-render any of [(symbol, timeframe, range, fmt), ...] whose data changed, without waiting."""
+        for symbol, timeframe, range_name, fmt in charts:
+            self.get(symbol, timeframe, range_name, fmt, wait=False)
+
+    def watched(self):
+        """Every chart rendered so far, by any server process."""
+        with self._lock:
+            self._sync_latest()
+            return list(self._latest)
+
+    def ensure_watching(self, interval=60):
+        """
+        Periodically re-render every chart served so far once its candles change. Server workers
+        start nothing: the collector watches the charts they all served.
+        """
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        if serving_role() == 'worker':
+            return None
+        with self._lock:
+            if self._scheduler is not None:
+                return self._scheduler
+            self._scheduler = BackgroundScheduler(daemon=True)
+            self._scheduler.add_job(lambda: self.refresh(self.watched()), 'interval', seconds=interval,
+                                    id='chart_refresh', max_instances=1, coalesce=True)
+            self._scheduler.start()
+            return self._scheduler
+
+    def shutdown(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
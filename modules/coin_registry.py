@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from modules.api import BASE_URL, coingecko_limiter, get_json_with_retry
+from modules.candle_store import DATA_DIR
+
+# Watchlist config: a JSON list of coins, each {"id": ..., "ticker": ..., "exchange_symbol": ...}
+# where only "id" (the CoinGecko id) is required
+CONFIG_PATH = os.environ.get('MAICOIN_COINS_CONFIG', 'coins.json')
+COINS_LIST_TTL = 24 * 3600
+FAILED_INDEX_TTL = 300  # Retry sooner when CoinGecko could not be reached for the last build
+RANKED_COINS = 250  # Coins fetched with their market-cap rank (one /coins/markets page)
+
+DEFAULT_WATCHLIST = [
+    {'id': 'bitcoin', 'ticker': 'BTC', 'name': 'Bitcoin', 'exchange_symbol': 'BTC/USD'},
+    {'id': 'dogecoin', 'ticker': 'DOGE', 'name': 'Dogecoin', 'exchange_symbol': 'DOGE/USD'},
+    {'id': 'ethereum', 'ticker': 'ETH', 'name': 'Ethereum', 'exchange_symbol': 'ETH/USD'},
+]
+
+
+class CoinRegistry:
+    """
+    Maps CoinGecko ids, tickers and names to one coin record with its CryptoCompare ticker and
+    exchange pair. Built from a cached copy of CoinGecko /coins/list plus the watchlist config.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH, cache_path=None, quote='USD'):
+        self.config_path = config_path
+        self.cache_path = cache_path or os.path.join(DATA_DIR, 'coins_list.json')
+        self.ranks_path = os.path.join(os.path.dirname(self.cache_path), 'coins_ranks.json')
+        self.quote = quote
+        self._lock = threading.Lock()
+        # (id -> coin record, lower-case id, ticker or name -> id, expiry time), swapped in as one
+        # tuple so readers never see the records of one build with the aliases of another
+        self._index = None
+        self._watchlist = None  # (records, expiry time)
+        self._failed = False  # Whether a CoinGecko download failed during the current build
+
+    def _load_cached(self, path, url, params=None, what='coin list'):
+        """A CoinGecko response refreshed at most once per COINS_LIST_TTL and kept on disk."""
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < COINS_LIST_TTL:
+            with open(path) as f:
+                return json.load(f)
+
+        data = get_json_with_retry(url, params, limiter=coingecko_limiter, retries=3)
+        if data:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+            return data
+        self._failed = True
+        if os.path.exists(path):
+            logging.warning(f"Could not refresh the CoinGecko {what}; using the stale cached copy.")
+            with open(path) as f:
+                return json.load(f)
+        return None
+
+    def _expiry(self):
+        """When a build finishing now should be redone: sooner if any download failed."""
+        return time.time() + (FAILED_INDEX_TTL if self._failed else COINS_LIST_TTL)
+
+    def _load_coins_list(self):
+        """CoinGecko /coins/list (every id with its ticker and name)."""
+        coins = self._load_cached(self.cache_path, f'{BASE_URL}/coins/list')
+        if coins is None:
+            logging.warning("No CoinGecko coin list available; only configured coins can be resolved.")
+        return coins or []
+
+    def _load_ranks(self):
+        """Market-cap rank of the largest coins (id -> rank), used to settle shared tickers and names."""
+        params = {'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': RANKED_COINS, 'page': 1}
+        markets = self._load_cached(self.ranks_path, f'{BASE_URL}/coins/markets', params, 'market-cap ranks')
+        return {coin['id']: coin.get('market_cap_rank') or i + 1 for i, coin in enumerate(markets or [])}
+
+    def _load_watchlist(self):
+        if os.path.exists(self.config_path):
+            with open(self.config_path) as f:
+                return json.load(f)
+        return DEFAULT_WATCHLIST
+
+    def _record(self, entry):
+        coin = dict(entry)
+        coin.setdefault('ticker', coin['id'].upper())
+        coin.setdefault('name', coin['id'].capitalize())
+        coin.setdefault('cryptocompare_symbol', coin['ticker'])
+        coin.setdefault('exchange_symbol', f"{coin['ticker']}/{self.quote}")
+        return coin
+
+    def _build_watchlist(self):
+        entries = self._load_watchlist()
+        # Only reach for the full coin list when the config leaves a ticker or name to look up
+        if any('ticker' not in entry or 'name' not in entry for entry in entries):
+            if self._index is None or time.time() >= self._index[2]:
+                self._build_index()
+            known, expires = self._index[0], self._index[2]
+        else:
+            known, expires = {}, time.time() + COINS_LIST_TTL
+        self._watchlist = ([self._record(dict(known.get(entry['id'], {}), **entry)) for entry in entries],
+                           expires)
+
+    def _build_index(self):
+        self._failed = False
+        coins, candidates = {}, {}
+        for entry in self._load_coins_list():
+            coin = self._record({'id': entry['id'], 'ticker': entry['symbol'].upper(), 'name': entry['name']})
+            coins[coin['id']] = coin
+            for alias in (coin['ticker'].lower(), coin['name'].lower()):
+                candidates.setdefault(alias, []).append(coin['id'])
+
+        # Tickers and names are ambiguous on CoinGecko (many coins share one): the coin with the best
+        # market-cap rank wins, and a shared alias with no ranked coin resolves to nothing
+        ranks = self._load_ranks() if any(len(ids) > 1 for ids in candidates.values()) else {}
+        aliases = {}
+        for alias, ids in candidates.items():
+            ranked = [coin_id for coin_id in ids if coin_id in ranks]
+            if len(ids) == 1:
+                aliases[alias] = ids[0]
+            elif ranked:
+                aliases[alias] = min(ranked, key=ranks.get)
+        for coin_id in coins:
+            aliases[coin_id] = coin_id
+        # Watchlist coins override everything
+        for entry in self._load_watchlist():
+            coin = self._record(dict(coins.get(entry['id'], {}), **entry))
+            coins[coin['id']] = coin
+            for alias in (coin['id'], coin['ticker'].lower(), coin['name'].lower()):
+                aliases[alias] = coin['id']
+        self._index = (coins, aliases, self._expiry())
+
+    def _rebuild_expired(self):
+        with self._lock:
+            if self._index is None or time.time() >= self._index[2]:
+                self._build_index()
+
+    def resolve(self, query):
+        """
+        Coin record for an id, ticker or name (case-insensitive), or None.
+        An expired index keeps answering while a background thread rebuilds it.
+        """
+        index = self._index
+        if index is None:
+            self._rebuild_expired()
+            index = self._index
+        elif time.time() >= index[2] and not self._lock.locked():
+            threading.Thread(target=self._rebuild_expired, name='coin-registry-refresh', daemon=True).start()
+        coins, aliases, _ = index
+        coin_id = aliases.get(query.lower())
+        return coins.get(coin_id) if coin_id else None
+
+    def watchlist(self):
+        """Coin records for the configured dashboard watchlist, in config order."""
+        with self._lock:
+            if self._watchlist is None or time.time() >= self._watchlist[1]:
+                self._build_watchlist()
+            return self._watchlist[0]
+
+    def reload(self):
+        with self._lock:
+            self._index = self._watchlist = None
+
+    def warm(self):
+        """Build the index in a background thread, so the first request does not download /coins/list."""
+        thread = threading.Thread(target=self.resolve, args=('',), name='coin-registry-warm', daemon=True)
+        thread.start()
+        return thread
+
+
+coin_registry = CoinRegistry()
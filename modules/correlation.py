@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from modules.candle_store import load_candles
+
+
+def align_series(series, freq='1min', start=None, end=None):
+    """
+    As-of join of many [timestamp_ms, price] series onto one common grid.
+    `series` maps symbol -> (timestamps, prices); returns (grid, symbols, price matrix [T, N]) where
+    each cell holds the last known price at or before the grid time (NaN before the first one).
+    With no observations to bound the grid, the grid and matrix are empty.
+    """
+    symbols = list(series)
+    step = int(pd.Timedelta(freq).total_seconds() * 1000)
+    if not any(len(ts) for ts, _ in series.values()) and (start is None or end is None):
+        return np.empty(0, dtype=np.int64), symbols, np.empty((0, len(symbols)))
+    if start is None:
+        start = min(int(ts[0]) for ts, _ in series.values() if len(ts))
+    if end is None:
+        end = max(int(ts[-1]) for ts, _ in series.values() if len(ts))
+    grid = np.arange(start - start % step, end + 1, step, dtype=np.int64)
+
+    matrix = np.full((len(grid), len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        timestamps, prices = series[symbol]
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        # Index of the last observation at or before each grid point
+        idx = np.searchsorted(timestamps, grid, side='right') - 1
+        valid = idx >= 0
+        matrix[valid, j] = prices[idx[valid]]
+    return grid, symbols, matrix
+
+
+def load_aligned(symbols, timeframe='1m', freq='1min', start=None, end=None):
+    """Load stored candles for several symbols and align their closes on a common grid."""
+    series = {}
+    for symbol in symbols:
+        df = load_candles(symbol, timeframe, start, end)
+        if len(df):
+            series[symbol] = (df['timestamp'].to_numpy(), df['close'].to_numpy())
+    return align_series(series, freq, start, end)
+
+
+class CorrelationEngine:
+    """
+    Rolling correlation, beta and relative strength for N coins at once. Keeps a ring buffer of the
+    last `window` log-return rows plus their running sums and cross-product matrix, so each new bar
+    updates every pair with a rank-one matrix update instead of a per-pair loop.
+    """
+
+    def __init__(self, symbols, window=60, benchmark=None):
+        self.symbols = list(symbols)
+        self.window = window
+        self.benchmark = self.symbols.index(benchmark) if benchmark else 0
+        n = len(self.symbols)
+        self._returns = np.zeros((window, n))
+        self._count = 0
+        self._pos = 0
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._last_prices = None
+
+    @classmethod
+    def from_prices(cls, symbols, prices, window=60, benchmark=None):
+        """Build an engine from an aligned [T, N] price matrix (rows with NaNs are skipped)."""
+        engine = cls(symbols, window, benchmark)
+        engine.update_many(prices)
+        return engine
+
+    def update(self, prices):
+        """Add one aligned bar of N prices."""
+        self.update_many(np.asarray(prices, dtype=np.float64)[None, :])
+
+    def update_many(self, prices):
+        """Add several aligned bars ([T, N]); only the last `window` returns are kept."""
+        prices = np.asarray(prices, dtype=np.float64)
+        prices = prices[~np.isnan(prices).any(axis=1)]
+        if not len(prices):
+            return
+        if self._last_prices is not None:
+            prices = np.vstack([self._last_prices, prices])
+        self._last_prices = prices[-1]
+        returns = np.diff(np.log(prices), axis=0)[-self.window:]
+
+        for row in returns:
+            if self._count == self.window:
+                old = self._returns[self._pos]
+                self._sum -= old
+                self._cross -= np.outer(old, old)
+            else:
+                self._count += 1
+            self._returns[self._pos] = row
+            self._sum += row
+            self._cross += np.outer(row, row)
+            self._pos = (self._pos + 1) % self.window
+            if self._pos == 0:
+                # Resum once per full window so rank-one downdates don't accumulate rounding error
+                self._sum = self._returns.sum(axis=0)
+                self._cross = self._returns.T @ self._returns
+
+    def _covariance(self):
+        n = self._count
+        if n < 2:
+            return None
+        mean = self._sum / n
+        return (self._cross - n * np.outer(mean, mean)) / (n - 1)
+
+    def correlation(self):
+        """N x N correlation matrix of log returns over the window, or None with fewer than 2 returns."""
+        cov = self._covariance()
+        if cov is None:
+            return None
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return cov / np.outer(std, std)
+
+    def beta(self):
+        """Beta of every coin against the benchmark coin."""
+        cov = self._covariance()
+        if cov is None:
+            return None
+        variance = cov[self.benchmark, self.benchmark]
+        return cov[:, self.benchmark] / variance if variance > 0 else np.full(len(self.symbols), np.nan)
+
+    def relative_strength(self):
+        """Window return of every coin divided by the benchmark's window return (both as growth factors)."""
+        if not self._count:
+            return None
+        growth = np.exp(self._sum)
+        return growth / growth[self.benchmark]
+
+    def summary(self):
+        """JSON-friendly snapshot of the current correlation, beta and relative strength."""
+        def to_list(values):
+            return None if values is None else np.where(np.isnan(values), None, np.round(values, 6)).tolist()
+
+        return {
+            'symbols': self.symbols,
+            'benchmark': self.symbols[self.benchmark],
+            'window': self.window,
+            'observations': self._count,
+            'correlation': to_list(self.correlation()),
+            'beta': to_list(self.beta()),
+            'relative_strength': to_list(self.relative_strength()),
+        }
+
+
+def rolling_correlation_matrices(prices, window):
+    """
+    Vectorized rolling correlation for a full aligned [T, N] price matrix: returns [T - window, N, N]
+    correlation matrices, one per window of log returns, with no loop over pairs or windows.
+    """
+    returns = np.diff(np.log(np.asarray(prices, dtype=np.float64)), axis=0)
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window, axis=0)  # [W, N, window]
+    centered = windows - windows.mean(axis=2, keepdims=True)
+    cov = np.einsum('wik,wjk->wij', centered, centered) / (window - 1)
+    std = np.sqrt(np.einsum('wii->wi', cov))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return cov / (std[:, :, None] * std[:, None, :])
@@ -4,6 +4,11 @@ import datetime
 import logging
 from time import sleep
 
+try:
+    from modules.analytics_cache import analytics_cache
+except ImportError:  # Run directly as a script from inside modules/
+    from analytics_cache import analytics_cache
+
 # Setup logging configuration
 logging.basicConfig(level=logging.INFO)
 
@@ -32,42 +37,62 @@ def fetch_crypto_data(crypto_id, currency='usd', hours=48):
     return response.json()
 
 
-def analyze_best_trading_opportunities(crypto_data):
+def analyze_best_trading_opportunities(crypto_data, series_id=None):
     """
     Analyze the best time to buy and sell based on hourly average prices.
+    With a series_id, per-hour sums are memoized per block of the series, so a later call on a newer
+    (or slid) window only adds the new prices and rebuilds the block cut by the window start.
     """
     if "prices" not in crypto_data or not crypto_data["prices"]:
         raise ValueError("No price data available for analysis.")
 
     prices = crypto_data["prices"]
-    df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-    df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
-
-    # Grouping by hour and computing average price
-    df['hour'] = df['date'].dt.hour
-    current_hour = datetime.datetime.now().hour
-    df = df[df['hour'] != current_hour]  # Exclude current hour
-
-    # Compute hourly average prices
-    hourly_avg_prices = df.groupby('hour')['price'].mean()
-
-    # Handle case where there might be NaN values
-    hourly_avg_prices = hourly_avg_prices.fillna(0)  # Replace NaN with 0 (or use other strategies)
 
-    best_buy_hour = hourly_avg_prices.idxmin()  # Best hour to buy (min price)
-    best_sell_hour = hourly_avg_prices.idxmax()  # Best hour to sell (max price)
-
-    # Log and return the results
-    logging.info(f"Best Buy Hour: {best_buy_hour} at price {hourly_avg_prices[best_buy_hour]}")
-    logging.info(f"Best Sell Hour: {best_sell_hour} at price {hourly_avg_prices[best_sell_hour]}")
-
-    return {
-        'hourly_avg_prices': hourly_avg_prices.to_dict(),
-        'best_buy_hour': best_buy_hour,
-        'best_sell_hour': best_sell_hour,
-        'best_buy_price': hourly_avg_prices[best_buy_hour],
-        'best_sell_price': hourly_avg_prices[best_sell_hour]
-    }
+    def init():
+        return {'sums': [0.0] * 24, 'counts': [0] * 24}
+
+    # Per-hour running sums; hours come from the UTC timestamp like the DataFrame version
+    def extend(state, start, stop):
+        df = pd.DataFrame(prices[start:stop], columns=['timestamp', 'price'])
+        df['hour'] = pd.to_datetime(df['timestamp'], unit='ms').dt.hour
+        grouped = df.groupby('hour')['price'].agg(['sum', 'count'])
+        for hour, row in grouped.iterrows():
+            state['sums'][hour] += row['sum']
+            state['counts'][hour] += int(row['count'])
+        return state
+
+    def merge(left, right):
+        return {'sums': [a + b for a, b in zip(left['sums'], right['sums'])],
+                'counts': [a + b for a, b in zip(left['counts'], right['counts'])]}
+
+    def finalize(state):
+        current_hour = datetime.datetime.now().hour
+        hours = [hour for hour in range(24) if state['counts'][hour] and hour != current_hour]  # Exclude current hour
+
+        # Compute hourly average prices
+        hourly_avg_prices = pd.Series([state['sums'][hour] / state['counts'][hour] for hour in hours],
+                                      index=pd.Index(hours, name='hour'), name='price', dtype=float)
+
+        best_buy_hour = hourly_avg_prices.idxmin()  # Best hour to buy (min price)
+        best_sell_hour = hourly_avg_prices.idxmax()  # Best hour to sell (max price)
+
+        # Log and return the results
+        logging.info(f"Best Buy Hour: {best_buy_hour} at price {hourly_avg_prices[best_buy_hour]}")
+        logging.info(f"Best Sell Hour: {best_sell_hour} at price {hourly_avg_prices[best_sell_hour]}")
+
+        return {
+            'hourly_avg_prices': hourly_avg_prices.to_dict(),
+            'best_buy_hour': best_buy_hour,
+            'best_sell_hour': best_sell_hour,
+            'best_buy_price': hourly_avg_prices[best_buy_hour],
+            'best_sell_price': hourly_avg_prices[best_sell_hour]
+        }
+
+    if series_id is None:
+        return finalize(extend(init(), 0, len(prices)))
+    timestamps = [timestamp for timestamp, _ in prices]
+    return analytics_cache.compute('best_trading_opportunities', series_id, timestamps, (), init, extend, finalize,
+                                   merge, finalize_key=datetime.datetime.now().hour)
 
 
 def analyze_multiple_cryptos(crypto_ids, currency='usd', hours=48):
@@ -83,7 +108,7 @@ def analyze_multiple_cryptos(crypto_ids, currency='usd', hours=48):
 
             if crypto_data:
                 # Analyze trading opportunities
-                analysis = analyze_best_trading_opportunities(crypto_data)
+                analysis = analyze_best_trading_opportunities(crypto_data, series_id=f'{crypto_id}:{currency}')
                 analysis_results[crypto_id] = analysis
             else:
                 logging.warning(f"No data returned for {crypto_id}.")
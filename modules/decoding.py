@@ -0,0 +1,152 @@
+"""
+Fast decoding of upstream JSON payloads into NumPy columns. The numeric arrays (CoinGecko
+market_chart pairs, OHLCV rows) are cut out of the raw response bytes and parsed by NumPy in one
+pass, so no Python list or float is created per value; everything else goes through orjson.
+
+    python -m modules.decoding --points 1000000
+"""
+import argparse
+import re
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import orjson
+import pandas as pd
+
+MARKET_CHART_KEYS = ('prices', 'market_caps', 'total_volumes')
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+_STRIP = b'[] \t\r\n'
+_ARRAY_END = re.compile(rb'\]\s*\]')
+
+
+def _array_span(body, key):
+    """(start, end) byte offsets of the nested numeric array stored under top-level `key`, or None."""
+    at = body.find(b'"%s"' % key.encode())
+    if at < 0:
+        return None
+    start = body.find(b'[', at)
+    if start < 0:
+        return None
+    # Numeric arrays hold no strings or objects, so the first ']]' (or an empty '[]') closes it
+    inner = body[start + 1:start + 64].lstrip()
+    if inner.startswith(b']'):
+        return start, body.find(b']', start) + 1
+    end = _ARRAY_END.search(body, start)
+    return (start, end.end()) if end else None
+
+
+def numeric_rows(body, key=None, width=2):
+    """
+    Parse a JSON array of `width`-number arrays (the whole body, or the value under top-level `key`)
+    into a float64 array [n, width]. Payloads NumPy cannot take in one pass (nulls, odd row widths)
+    fall back to orjson, with nulls as NaN. Returns None when `key` is absent.
+    """
+    if key is None:
+        span = (0, len(body))
+    else:
+        span = _array_span(body, key)
+        if span is None:
+            return None
+    text = body[span[0]:span[1]].translate(None, _STRIP)
+    if not text:
+        return np.empty((0, width))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(text, sep=',')
+        except (DeprecationWarning, ValueError):
+            values = None
+    if values is None or values.size != text.count(b',') + 1 or values.size % width:
+        rows = orjson.loads(body[span[0]:span[1]])
+        return np.array([[np.nan if v is None else v for v in row] for row in rows], dtype=np.float64).reshape(-1, width)
+    return values.reshape(-1, width)
+
+
+def decode_market_chart(body):
+    """
+    CoinGecko market_chart(/range) response as {'prices': [n, 2] float64, ...}, columns timestamp
+    (ms) and value. Error payloads without price data are returned as the parsed JSON object.
+    """
+    if b'"prices"' not in body:
+        return orjson.loads(body)
+    data = {}
+    for key in MARKET_CHART_KEYS:
+        rows = numeric_rows(body, key)
+        if rows is not None:
+            data[key] = rows
+    return data
+
+
+def decode_ohlcv(body):
+    """ccxt-style OHLCV payload ([[timestamp_ms, o, h, l, c, v], ...]) as a float64 array [n, 6]."""
+    return numeric_rows(body, width=len(OHLCV_COLUMNS))
+
+
+def decode_records(records, fields):
+    """Columns {field: array} from a list of JSON objects (e.g. CryptoCompare candles), one pass per field."""
+    return {field: np.fromiter((record[field] for record in records), dtype=np.float64, count=len(records))
+            for field in fields}
+
+
+def ms_to_datetime(timestamps):
+    """Millisecond epoch values as datetime64[ms], without pandas' per-value parsing."""
+    return np.asarray(timestamps).astype(np.int64).astype('datetime64[ms]')
+
+
+def ohlcv_frame(rows):
+    """OHLCV rows (list of lists or [n, 6] array) as a DataFrame with int64 timestamps and a 'date' column."""
+    rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+    df = pd.DataFrame(rows, columns=OHLCV_COLUMNS)
+    df['timestamp'] = df['timestamp'].astype(np.int64)
+    df['date'] = ms_to_datetime(df['timestamp'].to_numpy())
+    return df
+
+
+def _synthetic_market_chart(points):
+    start = 1_700_000_000_000
+    prices = [[start + i * 60_000, 40000 + (i % 1000) * 1.2345] for i in range(points)]
+    volumes = [[start + i * 60_000, 1.5e9 + i] for i in range(points)]
+    return orjson.dumps({'prices': prices, 'market_caps': volumes, 'total_volumes': volumes})
+
+
+def _measure(fn):
+    """Wall time of one untraced run and peak traced allocation of a second run (tracing slows it down)."""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == "__main__":
+    import json
+
+    parser = argparse.ArgumentParser(description="Compare response.json() + pandas with the NumPy decoding path.")
+    parser.add_argument('--points', type=int, default=500_000, help="Price points in the synthetic payload")
+    args = parser.parse_args()
+    body = _synthetic_market_chart(args.points)
+
+    def baseline():
+        # What the fetchers did: response.json(), DataFrame of pairs, pd.to_datetime
+        df = pd.DataFrame(json.loads(body)['prices'], columns=['timestamp', 'price'])
+        df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def decoded():
+        prices = decode_market_chart(body)['prices']
+        return pd.DataFrame({'timestamp': prices[:, 0].astype(np.int64), 'price': prices[:, 1],
+                             'date': ms_to_datetime(prices[:, 0])})
+
+    old, old_time, old_peak = _measure(baseline)
+    new, new_time, new_peak = _measure(decoded)
+    assert (old['price'].to_numpy() == new['price'].to_numpy()).all()
+    assert (old['date'].to_numpy() == new['date'].to_numpy()).all()
+    print(f"payload: {len(body) / 1e6:.1f} MB, {args.points:,} points per series")
+    print(f"{'path':28} {'seconds':>9} {'peak MB':>9}")
+    print(f"{'json + DataFrame + to_datetime':28} {old_time:>9.3f} {old_peak / 1e6:>9.1f}")
+    print(f"{'numpy decoding':28} {new_time:>9.3f} {new_peak / 1e6:>9.1f}")
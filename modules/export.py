@@ -0,0 +1,233 @@
+"""
+Streaming export of stored candles as CSV, NDJSON or Parquet. Output is produced chunk by chunk
+from a generator, so exports of any size run in constant memory.
+
+    python -m modules.export BTC/USDT --timeframe 1m --start 2024-12-01 --format ndjson -o btc.ndjson
+"""
+import argparse
+import io
+import itertools
+import os
+import sys
+import tempfile
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from modules.candle_store import COLUMNS, candle_file, read_order
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+CHUNK_ROWS = 50_000
+
+
+def _read_rows(path, chunksize, nrows=None):
+    """
+    Stored rows in file order as [timestamp, open, high, low, close, volume, row number] arrays of
+    up to `chunksize` rows; the row number tells later duplicates from earlier ones.
+    """
+    row = 0
+    for chunk in pd.read_csv(path, usecols=COLUMNS[:-1], chunksize=chunksize, nrows=nrows):
+        yield np.column_stack([chunk[COLUMNS[:-1]].to_numpy(dtype=np.float64),
+                               np.arange(row, row + len(chunk), dtype=np.float64)])
+        row += len(chunk)
+
+
+def _in_range(values, start, end):
+    if start is not None:
+        values = values[values[:, 0] >= start]
+    if end is not None:
+        values = values[values[:, 0] <= end]
+    return values
+
+
+def _frame(values):
+    return _with_dates(pd.DataFrame(values[:, :-1], columns=COLUMNS[:-1]))
+
+
+def _merged_chunks(rows, start, end, chunksize):
+    """
+    Spill-and-merge path for out-of-order rows: each chunk of `rows` within [start, end] is sorted
+    into a temporary .npy run, then the runs are merged into DataFrames in timestamp order, each
+    timestamp once with its latest stored row. Memory stays bounded by `chunksize` rows per run.
+    """
+    with tempfile.TemporaryDirectory(prefix='export-') as directory:
+        runs = []
+        for i, values in enumerate(rows):
+            values = _in_range(values, start, end)
+            if len(values):
+                run_path = os.path.join(directory, f'run{i}.npy')
+                np.save(run_path, values[np.argsort(values[:, 0], kind='stable')])
+                runs.append(np.load(run_path, mmap_mode='r'))
+        positions = [0] * len(runs)
+        while True:
+            live = [i for i, run in enumerate(runs) if positions[i] < len(run)]
+            if not live:
+                break
+            # Everything up to the earliest "chunksize rows ahead" timestamp of any run can be
+            # emitted: no run holds more than chunksize rows at or before it
+            bound = min(runs[i][min(positions[i] + chunksize, len(runs[i])) - 1, 0] for i in live)
+            parts = []
+            for i in live:
+                stop = int(np.searchsorted(runs[i][:, 0], bound, side='right'))
+                parts.append(runs[i][positions[i]:stop])
+                positions[i] = stop
+            values = np.concatenate(parts)
+            values = values[np.lexsort((values[:, -1], values[:, 0]))]
+            # Keep the last stored row (highest row number) for each timestamp
+            yield _frame(values[np.append(values[1:, 0] != values[:-1, 0], True)])
+        del runs  # Release the memory maps before the directory is removed
+
+
+def iter_candle_chunks(path, start=None, end=None, chunksize=CHUNK_ROWS):
+    """
+    Yield DataFrames of stored candles with `start` <= timestamp <= `end` (milliseconds, inclusive)
+    in timestamp order, each timestamp once with its latest stored row. The append-only store is
+    normally in order, and the order metadata append_candles keeps says how far: rows up to the
+    first out-of-order one are streamed chunk by chunk as they are read. Only from there on (a
+    backfill appended after live data, an overlapping fetch window), or for files without that
+    metadata, are rows sorted through temporary runs and merged.
+    """
+    order = read_order(path)
+    if order is None:
+        yield from _merged_chunks(_read_rows(path, chunksize), start, end, chunksize)
+        return
+    # Rows appended while exporting are left out, so the metadata describes everything read
+    rows = _read_rows(path, chunksize, order['rows'])
+    tail_min = np.inf if order['tail_min'] is None else order['tail_min']
+    for values in rows:
+        # The ordered rows before the earliest later timestamp are final; the prefix is ascending,
+        # so they form the head of the chunk
+        final = int(np.count_nonzero((values[:, -1] < order['ordered_rows']) & (values[:, 0] < tail_min)))
+        head = _in_range(values[:final], start, end)
+        if len(head):
+            yield _frame(head)
+        if final < len(values):
+            yield from _merged_chunks(itertools.chain([values[final:]], rows), start, end, chunksize)
+            return
+        if end is not None and len(values) and values[-1, 0] > end and tail_min > end:
+            return  # Everything after is ordered and past the end
+
+
+def _with_dates(chunk):
+    chunk = chunk.astype({'timestamp': 'int64'})
+    chunk['date'] = pd.to_datetime(chunk['timestamp'], unit='ms').dt.strftime('%Y-%m-%d %H:%M:%S')
+    return chunk
+
+
+def _csv_chunks(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+
+
+def _ndjson_chunks(chunks):
+    for chunk in chunks:
+        records = chunk.to_dict(orient='records')
+        yield b''.join(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in records)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_chunks(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        # One row group per chunk, flushed to the client as soon as it is written
+        writer.write_table(table)
+        data = sink.drain()
+        if data:
+            yield data
+    if writer is None:
+        schema = pa.schema([('timestamp', pa.int64())] + [(c, pa.float64()) for c in COLUMNS[1:-1]]
+                           + [('date', pa.string())])
+        writer = pq.ParquetWriter(sink, schema)
+    writer.close()
+    yield sink.drain()
+
+
+def export_chunks(symbol, timeframe, start=None, end=None, fmt='csv', chunksize=CHUNK_ROWS, data_dir=None,
+                  path=None):
+    """
+    Generator of encoded byte chunks for one stored series. `path` overrides the candle store
+    location, e.g. for the legacy BTC_USDT_data.csv written by bitcoinreal.py.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet':
+        # Checked up front so a missing dependency fails before any bytes are sent
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    path = path or candle_file(symbol, timeframe, data_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No stored candles for {symbol} {timeframe} at {path}")
+    chunks = iter_candle_chunks(path, start, end, chunksize)
+    encoders = {'csv': _csv_chunks, 'ndjson': _ndjson_chunks, 'parquet': _parquet_chunks}
+    return encoders[fmt](chunks)
+
+
+def parse_time(value):
+    """Millisecond timestamp from an integer string or a YYYY-MM-DD[ HH:MM] date (UTC, like the stored dates)."""
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    return pd.Timestamp(value).value // 10 ** 6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream stored candles out as CSV, NDJSON or Parquet.")
+    parser.add_argument('symbol', help="Pair as stored, e.g. BTC/USDT")
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--start', default=None, help="YYYY-MM-DD[ HH:MM] or millisecond timestamp")
+    parser.add_argument('--end', default=None, help="YYYY-MM-DD[ HH:MM] or millisecond timestamp")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--file', default=None, help="Read this CSV instead of the candle store")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('-o', '--output', default=None, help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for data in export_chunks(args.symbol, args.timeframe, parse_time(args.start), parse_time(args.end),
+                                  args.format, args.chunk_rows, path=args.file):
+            out.write(data)
+    finally:
+        if args.output:
+            out.close()
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+MAX_HORIZON = 1440  # Longest forecast horizon in bars (a day of 1m bars)
+
+
+class ForecastEngine:
+    """
+    Short-horizon forecasts for N coins at once from three lightweight models on log prices:
+    Holt exponential smoothing, AR(p) on log returns (exponentially weighted least squares) and an
+    hour-of-day seasonal baseline of mean returns. Every model keeps running state that a new bar
+    updates in O(N * p^2) with array operations, so nothing is refit from scratch.
+    """
+
+    def __init__(self, symbols, step_ms, ar_order=3, alpha=0.2, beta=0.02, ar_decay=0.995, ridge=1e-8):
+        self.symbols = list(symbols)
+        self.step_ms = int(step_ms)
+        self.ar_order = ar_order
+        self.alpha = alpha
+        self.beta = beta
+        self.ar_decay = ar_decay
+        self.ridge = ridge
+
+        n, k = len(self.symbols), ar_order + 1  # AR design row: [1, r(t-1), ..., r(t-p)]
+        self.level = np.full(n, np.nan)
+        self.trend = np.zeros(n)
+        self.last_log = np.full(n, np.nan)
+        self.last_time = None
+        self._lags = np.zeros((n, ar_order))
+        self._lag_count = np.zeros(n, dtype=np.int64)
+        self._xtx = np.zeros((n, k, k))
+        self._xty = np.zeros((n, k))
+        self._season_sum = np.zeros((n, 24))
+        self._season_count = np.zeros((n, 24))
+
+    @property
+    def warmup_bars(self):
+        """
+        Trailing bars a new engine is fed before forecasting: enough for the AR weights to decay
+        below 1% and for the seasonal baseline to see every hour of the day.
+        """
+        return max(int(np.ceil(np.log(0.01) / np.log(self.ar_decay))), -(-86_400_000 // self.step_ms))
+
+    def update_many(self, timestamps, prices):
+        """Feed aligned bars: timestamps [T] (ms) and prices [T, N]; bars not newer than the last are skipped."""
+        prices = np.asarray(prices, dtype=np.float64).reshape(len(timestamps), len(self.symbols))
+        for timestamp, row in zip(timestamps, prices):
+            if self.last_time is None or timestamp > self.last_time:
+                self.update(int(timestamp), row)
+
+    def update(self, timestamp, prices):
+        """Feed one aligned bar of N prices (NaN for coins without a quote)."""
+        log_price = np.log(np.asarray(prices, dtype=np.float64))
+        seen = ~np.isnan(log_price)
+        has_return = seen & ~np.isnan(self.last_log)
+        returns = np.where(has_return, log_price - self.last_log, 0.0)
+
+        # Holt's linear smoothing on log price
+        first = seen & np.isnan(self.level)
+        self.level[first] = log_price[first]
+        previous_level = self.level.copy()
+        smoothed = self.alpha * log_price + (1 - self.alpha) * (self.level + self.trend)
+        self.level = np.where(seen & ~first, smoothed, self.level)
+        self.trend = np.where(seen & ~first,
+                              self.beta * (self.level - previous_level) + (1 - self.beta) * self.trend, self.trend)
+
+        # AR(p): accumulate decayed normal equations once p lags are available
+        ready = has_return & (self._lag_count >= self.ar_order)
+        x = np.concatenate([np.ones((len(self.symbols), 1)), self._lags], axis=1)
+        decay = np.where(ready, self.ar_decay, 1.0)
+        self._xtx = decay[:, None, None] * self._xtx + np.where(ready[:, None, None], x[:, :, None] * x[:, None, :], 0)
+        self._xty = decay[:, None] * self._xty + np.where(ready[:, None], x * returns[:, None], 0)
+        self._lags[has_return] = np.concatenate([returns[has_return, None], self._lags[has_return, :-1]], axis=1)
+        self._lag_count += has_return
+
+        # Hour-of-day seasonal mean return
+        hour = pd.Timestamp(timestamp, unit='ms').hour
+        self._season_sum[:, hour] += returns
+        self._season_count[:, hour] += has_return
+
+        self.last_log = np.where(seen, log_price, self.last_log)
+        self.last_time = timestamp
+
+    def _ar_coefficients(self):
+        k = self.ar_order + 1
+        system = self._xtx + self.ridge * np.eye(k)
+        return np.linalg.solve(system, self._xty[:, :, None])[:, :, 0]
+
+    def forecast(self, horizons=(1, 5, 30)):
+        """
+        Forecast prices `h` bars ahead for every horizon and model.
+        Returns {model: [N, len(horizons)] array} with NaN where a coin has no data yet.
+        Raises ValueError unless every horizon is between 1 and MAX_HORIZON.
+        """
+        horizons = sorted(horizons)
+        if not horizons or horizons[0] < 1 or horizons[-1] > MAX_HORIZON:
+            raise ValueError(f"horizons must be between 1 and {MAX_HORIZON}")
+        steps = np.arange(1, horizons[-1] + 1)
+        base = self.last_log[:, None]
+        picks = np.asarray(horizons) - 1
+
+        smoothing = self.level[:, None] + self.trend[:, None] * steps[None, :]
+
+        # Iterate the AR recursion for all coins at once, one step at a time
+        coefficients = self._ar_coefficients()
+        lags = self._lags.copy()
+        ar_path = np.empty((len(self.symbols), len(steps)))
+        for i in range(len(steps)):
+            predicted = coefficients[:, 0] + (coefficients[:, 1:] * lags).sum(axis=1)
+            ar_path[:, i] = predicted
+            lags = np.concatenate([predicted[:, None], lags[:, :-1]], axis=1)
+        ar = base + np.cumsum(ar_path, axis=1)
+
+        hours = pd.to_datetime(self.last_time + steps * self.step_ms, unit='ms').hour.to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            seasonal_means = np.nan_to_num(self._season_sum / self._season_count)
+        seasonal = base + np.cumsum(seasonal_means[:, hours], axis=1)
+
+        return {
+            'exponential_smoothing': np.exp(smoothing[:, picks]),
+            'autoregressive': np.exp(ar[:, picks]),
+            'seasonal_baseline': np.exp(seasonal[:, picks]),
+        }
+
+    def summary(self, horizons=(1, 5, 30)):
+        """JSON-friendly forecasts keyed by symbol, then model, then horizon."""
+        forecasts = self.forecast(horizons)
+        result = {}
+        for i, symbol in enumerate(self.symbols):
+            result[symbol] = {
+                model: {str(h): (None if np.isnan(values[i, j]) else round(float(values[i, j]), 8))
+                        for j, h in enumerate(sorted(horizons))}
+                for model, values in forecasts.items()
+            }
+        return {'as_of': self.last_time, 'step_ms': self.step_ms, 'forecasts': result}
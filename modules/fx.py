@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+from modules.api import BASE_URL, coingecko_limiter, get_json_with_retry
+from modules.shared_snapshot import open_snapshot, publish_state, read_state, serving_role
+
+
+class QuoteConverter:
+    """
+    Fetches each coin once in a base currency and derives every other quote currency locally from
+    a cached FX table (CoinGecko /exchange_rates, one call for all currencies). Adding quote
+    currencies therefore costs no extra upstream calls.
+    """
+
+    def __init__(self, base='usd', price_max_age=60, fx_refresh=600, fx_max_age=3600, fx_retry=60):
+        self.base = base
+        self.price_max_age = price_max_age  # Seconds a base-currency coin price is reused
+        self.fx_refresh = fx_refresh  # Seconds between FX table refreshes
+        self.fx_max_age = fx_max_age  # Staleness tolerance: older FX tables are not used at all
+        self.fx_retry = fx_retry  # Seconds to wait after a failed refresh before trying again
+        self._prices = {}  # coin id -> (price in base, fetched at)
+        self._rates = {}  # currency -> units per 1 BTC, as returned by /exchange_rates
+        self._rates_at = 0.0
+        self._attempted_at = 0.0  # Last refresh attempt, successful or not
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # Single flight: one refresh at a time
+        self._scheduler = None
+
+    def refresh_rates(self):
+        """Reload the FX table; keeps the previous table if the call fails."""
+        with self._refresh_lock:
+            return self._refresh_rates()
+
+    def _refresh_rates(self):
+        self._attempted_at = time.time()
+        data = get_json_with_retry(f'{BASE_URL}/exchange_rates', limiter=coingecko_limiter, retries=3)
+        if not data or 'rates' not in data:
+            logging.warning("Could not refresh FX rates; keeping the previous table.")
+            return False
+        with self._lock:
+            self._rates = {currency: rate['value'] for currency, rate in data['rates'].items()}
+            self._rates_at = time.time()
+        if serving_role() == 'collector':
+            publish_state('fx_rates', {'rates': self._rates, 'at': self._rates_at})
+        return True
+
+    def _load_shared(self):
+        """Worker side: take the FX table the collector published, if it is newer than ours."""
+        state = read_state('fx_rates')
+        if state is not None and state['at'] > self._rates_at:
+            with self._lock:
+                self._rates, self._rates_at = state['rates'], state['at']
+
+    def ensure_started(self):
+        """
+        Refresh the FX table in the background every `fx_refresh` seconds (once per process). Server
+        workers start nothing: the collector refreshes the table and they read what it publishes.
+        """
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        if serving_role() == 'worker':
+            return None
+        with self._lock:
+            if self._scheduler is not None:
+                return self._scheduler
+            self._scheduler = BackgroundScheduler(daemon=True)
+            self._scheduler.add_job(self.refresh_rates, 'interval', seconds=self.fx_refresh, id='fx_refresh',
+                                    max_instances=1, coalesce=True, next_run_time=datetime.now())
+            self._scheduler.start()
+            return self._scheduler
+
+    def _refresh_due(self):
+        """Inline refresh (no background job): due when stale, but at most once per `fx_retry` after a failure."""
+        now = time.time()
+        return (self._scheduler is None and now - self._rates_at > self.fx_refresh
+                and now - self._attempted_at > self.fx_retry)
+
+    def fx_rate(self, currency):
+        """Units of `currency` per one unit of the base currency, or None if unknown or too stale."""
+        currency = currency.lower()
+        if currency == self.base:
+            return 1.0
+        # Requests arriving while another thread refreshes use the current table instead of waiting
+        if serving_role() == 'worker':
+            self._load_shared()
+        elif self._refresh_due() and self._refresh_lock.acquire(blocking=False):
+            try:
+                self._refresh_rates()
+            finally:
+                self._refresh_lock.release()
+        with self._lock:
+            if time.time() - self._rates_at > self.fx_max_age:
+                return None
+            rate, base_rate = self._rates.get(currency), self._rates.get(self.base)
+        if not rate or not base_rate:
+            return None
+        return rate / base_rate
+
+    def base_prices(self, coin_ids):
+        """Base-currency prices for several coins, fetching only the missing or expired ones in one call."""
+        now = time.time()
+        result, missing = {}, []
+        snapshot = open_snapshot() if self.base == 'usd' else None
+        for coin_id in coin_ids:
+            cached = self._prices.get(coin_id)
+            if cached and now - cached[1] <= self.price_max_age:
+                result[coin_id] = cached[0]
+            elif snapshot is not None and snapshot.price(coin_id) is not None:
+                result[coin_id] = snapshot.price(coin_id)
+            else:
+                missing.append(coin_id)
+
+        if missing:
+            params = {'ids': ','.join(missing), 'vs_currencies': self.base}
+            data = get_json_with_retry(f'{BASE_URL}/simple/price', params, limiter=coingecko_limiter, retries=3) or {}
+            for coin_id, quote in data.items():
+                if self.base in quote:
+                    self._prices[coin_id] = (quote[self.base], now)
+                    result[coin_id] = quote[self.base]
+        return result
+
+    def price(self, coin_id, currency):
+        """Price of a coin in any quote currency, or None if it cannot be derived."""
+        rate = self.fx_rate(currency)
+        if rate is None:
+            return None
+        base_price = self.base_prices([coin_id]).get(coin_id)
+        return None if base_price is None else base_price * rate
@@ -0,0 +1,109 @@
+"""
+Load-test driver for the Flask app: concurrent simulated users hit a weighted mix of routes for a
+fixed duration, then throughput and latency percentiles are reported per route.
+
+    python -m modules.loadtest --base-url http://localhost:5000 --users 20 --duration 60
+"""
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# (path, weight) pairs; the dashboard panels are heavy, the JSON routes are what the page polls
+DEFAULT_MIX = [
+    ('/', 1),
+    ('/panel/bitcoin', 1),
+    ('/get_current_price/bitcoin/usd', 4),
+    ('/get_current_price/dogecoin/eur', 4),
+    ('/get_current_price/ethereum/php', 4),
+    ('/get_30min_estimate/bitcoin', 2),
+    ('/get_30min_estimate/dogecoin', 2),
+]
+
+
+def run_user(base_url, mix, deadline, think_time, results, lock):
+    """One simulated user: pick a weighted route, request it, record latency, repeat until the deadline."""
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = 'gzip, br'
+    paths, weights = zip(*mix)
+    local = defaultdict(lambda: {'latencies': [], 'errors': 0, 'statuses': defaultdict(int)})
+    while time.monotonic() < deadline:
+        path = random.choices(paths, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = session.get(base_url + path, timeout=60)
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            status = 'exception'
+        elapsed = time.perf_counter() - started
+        stats = local[path]
+        stats['latencies'].append(elapsed)
+        stats['statuses'][status] += 1
+        if status == 'exception' or status >= 400:
+            stats['errors'] += 1
+        if think_time:
+            time.sleep(random.uniform(0, 2 * think_time))
+
+    with lock:
+        for path, stats in local.items():
+            merged = results[path]
+            merged['latencies'].extend(stats['latencies'])
+            merged['errors'] += stats['errors']
+            for status, count in stats['statuses'].items():
+                merged['statuses'][status] += count
+
+
+def run_load_test(base_url, users=10, duration=30, mix=None, think_time=0.0):
+    """Run the test and return {path: {...}} plus an 'all' row with RPS and p50/p95/p99 latency (ms)."""
+    mix = mix or DEFAULT_MIX
+    results = defaultdict(lambda: {'latencies': [], 'errors': 0, 'statuses': defaultdict(int)})
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + duration
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        for _ in range(users):
+            executor.submit(run_user, base_url, mix, deadline, think_time, results, lock)
+    wall = time.monotonic() - started
+
+    def summarize(latencies, errors, statuses):
+        latencies = np.asarray(latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+        return {'requests': len(latencies), 'errors': errors, 'rps': len(latencies) / wall,
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'statuses': dict(statuses)}
+
+    report = {path: summarize(stats['latencies'], stats['errors'], stats['statuses'])
+              for path, stats in results.items()}
+    all_statuses = defaultdict(int)
+    for stats in results.values():
+        for status, count in stats['statuses'].items():
+            all_statuses[status] += count
+    report['all'] = summarize([latency for stats in results.values() for latency in stats['latencies']],
+                              sum(stats['errors'] for stats in results.values()), all_statuses)
+    return report
+
+
+def print_report(report):
+    print(f"{'route':45} {'reqs':>7} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for path in sorted(report, key=lambda p: (p == 'all', p)):
+        row = report[path]
+        print(f"{path:45} {row['requests']:>7} {row['errors']:>7} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for the maicoin Flask app.")
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Mean pause between a user's requests")
+    parser.add_argument('--path', action='append', default=None,
+                        help="Route to include (repeatable); defaults to the built-in weighted mix")
+    args = parser.parse_args()
+
+    mix = [(path, 1) for path in args.path] if args.path else None
+    print_report(run_load_test(args.base_url, args.users, args.duration, mix, args.think_time))
@@ -0,0 +1,376 @@
+import argparse
+import logging
+import os
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from modules.candle_store import DATA_DIR
+
+logging.basicConfig(level=logging.INFO)
+
+
+class GrowableArray:
+    """Append-only NumPy column with amortized doubling."""
+
+    def __init__(self, dtype, capacity=1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:needed] = values
+        self._size = needed
+
+    @property
+    def values(self):
+        return self._data[:self._size]
+
+
+def book_levels(levels):
+    """ccxt [[price, amount], ...] levels as an (n, 2) float array."""
+    return np.asarray([level[:2] for level in levels], dtype=np.float64).reshape(-1, 2)
+
+
+def _level_deltas(old, new):
+    """Per-level changes turning `old` into `new`: (prices, amounts) with amount 0 for removed levels."""
+    old_map = dict(map(tuple, old))
+    new_map = dict(map(tuple, new))
+    changed = [(price, amount) for price, amount in new_map.items() if old_map.get(price) != amount]
+    changed += [(price, 0.0) for price in old_map if price not in new_map]
+    return changed
+
+
+class OrderBookStore:
+    """
+    Order book history for one symbol: a full snapshot every `snapshot_every` updates plus compact
+    per-level deltas in between. Reconstructing the book at any time replays at most
+    `snapshot_every` updates from the nearest earlier snapshot, never from the start of the day.
+    """
+
+    def __init__(self, symbol, snapshot_every=60):
+        self.symbol = symbol
+        self.snapshot_every = snapshot_every
+        self.snapshot_times = []
+        self.snapshot_offsets = []  # Delta row index at which each snapshot was taken
+        self.snapshots = []  # (bids, asks) arrays
+        self.delta_time = GrowableArray(np.int64)
+        self.delta_side = GrowableArray(np.int8)  # 0 = bid, 1 = ask
+        self.delta_price = GrowableArray(np.float64)
+        self.delta_amount = GrowableArray(np.float64)
+        self._updates_since_snapshot = 0
+        self._last = None
+        self._saved = (0, 0)  # Snapshots and delta rows already written to a segment
+        self._segment = -1  # Number of the last segment written or loaded
+
+    def add(self, timestamp, bids, asks):
+        """Record one fetched book (ccxt format levels)."""
+        bids, asks = book_levels(bids), book_levels(asks)
+        if self._last is None or self._updates_since_snapshot >= self.snapshot_every:
+            self.snapshot_times.append(int(timestamp))
+            self.snapshot_offsets.append(len(self.delta_time))
+            self.snapshots.append((bids, asks))
+            self._updates_since_snapshot = 0
+        else:
+            for side, old, new in ((0, self._last[0], bids), (1, self._last[1], asks)):
+                changes = _level_deltas(old, new)
+                if changes:
+                    prices, amounts = zip(*changes)
+                    self.delta_time.extend(np.full(len(changes), timestamp))
+                    self.delta_side.extend(np.full(len(changes), side))
+                    self.delta_price.extend(prices)
+                    self.delta_amount.extend(amounts)
+            self._updates_since_snapshot += 1
+        self._last = (bids, asks)
+
+    def book_at(self, timestamp):
+        """(bids, asks) as sorted (n, 2) arrays as of `timestamp`, or None before the first snapshot."""
+        i = bisect_right(self.snapshot_times, timestamp) - 1
+        if i < 0:
+            return None
+        bids, asks = self.snapshots[i]
+        start = self.snapshot_offsets[i]
+        end = self.snapshot_offsets[i + 1] if i + 1 < len(self.snapshot_offsets) else len(self.delta_time)
+        end = start + int(np.searchsorted(self.delta_time.values[start:end], timestamp, side='right'))
+
+        sides = [dict(map(tuple, bids)), dict(map(tuple, asks))]
+        for side, price, amount in zip(self.delta_side.values[start:end], self.delta_price.values[start:end],
+                                       self.delta_amount.values[start:end]):
+            if amount == 0:
+                sides[side].pop(price, None)
+            else:
+                sides[side][price] = amount
+        bids = np.array(sorted(sides[0].items(), reverse=True), dtype=np.float64).reshape(-1, 2)
+        asks = np.array(sorted(sides[1].items()), dtype=np.float64).reshape(-1, 2)
+        return bids, asks
+
+    def save(self, directory, release=False):
+        """
+        Append everything recorded since the last save as a new segment file in `directory`; earlier
+        segments are never rewritten. With release=True the saved history is dropped from memory
+        (only the last book is kept to diff against), as the collector does.
+        """
+        saved_snapshots, saved_deltas = self._saved
+        if len(self.snapshot_times) == saved_snapshots and len(self.delta_time) == saved_deltas:
+            return None
+        snapshots = self.snapshots[saved_snapshots:]
+        path = _write_segment(
+            directory, max(self._segment, _last_segment(directory)) + 1,
+            snapshot_times=np.asarray(self.snapshot_times[saved_snapshots:], dtype=np.int64),
+            snapshot_offsets=np.asarray(self.snapshot_offsets[saved_snapshots:], dtype=np.int64) - saved_deltas,
+            snapshot_sizes=np.asarray([(len(b), len(a)) for b, a in snapshots], dtype=np.int64).reshape(-1, 2),
+            snapshot_levels=np.concatenate([np.vstack([b, a]) for b, a in snapshots]) if snapshots
+            else np.empty((0, 2)),
+            delta_time=self.delta_time.values[saved_deltas:], delta_side=self.delta_side.values[saved_deltas:],
+            delta_price=self.delta_price.values[saved_deltas:], delta_amount=self.delta_amount.values[saved_deltas:])
+        self._segment = _segment_number(path)
+        if release:
+            self.snapshot_times, self.snapshot_offsets, self.snapshots = [], [], []
+            for name in ('delta_time', 'delta_side', 'delta_price', 'delta_amount'):
+                setattr(self, name, GrowableArray(getattr(self, name).values.dtype))
+        self._saved = (len(self.snapshot_times), len(self.delta_time))
+        return path
+
+    def refresh(self, directory):
+        """Read segments written since the last refresh (e.g. by the collector); returns how many."""
+        paths = _segments(directory, after=self._segment)
+        for path in paths:
+            with np.load(path) as data:
+                base = len(self.delta_time)
+                self.snapshot_times.extend(data['snapshot_times'].tolist())
+                self.snapshot_offsets.extend((data['snapshot_offsets'] + base).tolist())
+                levels, position = data['snapshot_levels'], 0
+                for n_bids, n_asks in data['snapshot_sizes']:
+                    self.snapshots.append((levels[position:position + n_bids],
+                                           levels[position + n_bids:position + n_bids + n_asks]))
+                    position += n_bids + n_asks
+                for name in ('delta_time', 'delta_side', 'delta_price', 'delta_amount'):
+                    getattr(self, name).extend(data[name])
+            self._segment = _segment_number(path)
+        self._saved = (len(self.snapshot_times), len(self.delta_time))
+        return len(paths)
+
+    @classmethod
+    def load(cls, symbol, directory):
+        store = cls(symbol)
+        store.refresh(directory)
+        return store
+
+
+def _segment_number(path):
+    return int(os.path.basename(path).split('.')[0])
+
+
+def _segments(directory, after=-1):
+    """Segment files in `directory` numbered above `after`, in order."""
+    if not os.path.isdir(directory):
+        return []
+    numbered = [(int(name[:-4]), name) for name in os.listdir(directory)
+                if name.endswith('.npz') and name[:-4].isdigit()]
+    return [os.path.join(directory, name) for number, name in sorted(numbered) if number > after]
+
+
+def _last_segment(directory):
+    paths = _segments(directory)
+    return _segment_number(paths[-1]) if paths else -1
+
+
+def _write_segment(directory, number, **arrays):
+    """Write one numbered segment atomically, so readers never see a partial file."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{number:08d}.npz')
+    tmp_path = os.path.join(directory, f'{number:08d}.tmp.npz')
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def vwap_to_fill(book, size, side='buy'):
+    """
+    Average fill price for a market order of `size` against the book (buys walk the asks, sells the
+    bids), plus slippage versus the best price. Returns None if the book is too thin.
+    """
+    if not size > 0:
+        raise ValueError("size must be positive")
+    if side not in ('buy', 'sell'):
+        raise ValueError("side must be 'buy' or 'sell'")
+    bids, asks = book
+    levels = asks if side == 'buy' else bids
+    if not len(levels):
+        return None
+    cumulative = np.cumsum(levels[:, 1])
+    if cumulative[-1] < size:
+        return None
+    last = int(np.searchsorted(cumulative, size))
+    filled = levels[:last + 1, 1].copy()
+    filled[-1] -= cumulative[last] - size
+    vwap = float((levels[:last + 1, 0] * filled).sum() / size)
+    best = float(levels[0, 0])
+    return {'vwap': vwap, 'best_price': best, 'slippage': abs(vwap - best) / best, 'levels_used': last + 1}
+
+
+class TradeTape:
+    """Trade prints in NumPy columns, de-duplicated by trade id across overlapping fetches."""
+
+    def __init__(self, dedup_window_ms=10 * 60 * 1000):
+        self.time = GrowableArray(np.int64)
+        self.price = GrowableArray(np.float64)
+        self.amount = GrowableArray(np.float64)
+        self.side = GrowableArray(np.int8)  # 1 = buy, -1 = sell, 0 = unknown
+        self.dedup_window_ms = dedup_window_ms
+        self._recent_ids = {}  # trade id -> timestamp, pruned to the dedup window
+        self._saved = 0
+        self._segment = -1
+        # After loading saved trades their ids are unknown: anything older than the last saved
+        # millisecond is skipped, and trades in that millisecond are matched by their contents
+        self._resume_after = None
+        self._resume_trades = set()  # (timestamp, price, amount, side) saved in that millisecond
+
+    def _resume_from(self, time, price, amount, side):
+        """Continue after the given saved trades (time-sorted columns)."""
+        if not len(time):
+            return
+        self._resume_after = int(time[-1])
+        tail = slice(int(np.searchsorted(time, time[-1], side='left')), len(time))
+        self._resume_trades = set(zip(time[tail].tolist(), price[tail].tolist(), amount[tail].tolist(),
+                                      side[tail].tolist()))
+
+    def _resumed(self, trade, side):
+        """Whether a fetched trade was already saved before the tape was released or reloaded."""
+        if self._resume_after is None or trade['timestamp'] > self._resume_after:
+            return False
+        return (trade['timestamp'] < self._resume_after
+                or (trade['timestamp'], trade['price'], trade['amount'], side) in self._resume_trades)
+
+    def add(self, trades):
+        """Append ccxt trades, skipping ids already seen; returns the number added."""
+        fresh = []
+        for trade in trades:
+            side = {'buy': 1, 'sell': -1}.get(trade.get('side'), 0)
+            if trade['id'] not in self._recent_ids and not self._resumed(trade, side):
+                fresh.append((trade, side))
+        if not fresh:
+            return 0
+        fresh.sort(key=lambda item: item[0]['timestamp'])
+        self.time.extend([trade['timestamp'] for trade, _ in fresh])
+        self.price.extend([trade['price'] for trade, _ in fresh])
+        self.amount.extend([trade['amount'] for trade, _ in fresh])
+        self.side.extend([side for _, side in fresh])
+        fresh = [trade for trade, _ in fresh]
+        for trade in fresh:
+            self._recent_ids[trade['id']] = trade['timestamp']
+
+        cutoff = fresh[-1]['timestamp'] - self.dedup_window_ms
+        self._recent_ids = {trade_id: ts for trade_id, ts in self._recent_ids.items() if ts >= cutoff}
+        return len(fresh)
+
+    @property
+    def last_time(self):
+        if len(self.time):
+            return int(self.time.values[-1])
+        return self._resume_after
+
+    def between(self, t1=None, t2=None):
+        """Trades with t1 <= time <= t2 (ms) as {'time', 'price', 'amount', 'side'} arrays."""
+        times = self.time.values
+        lo = 0 if t1 is None else int(np.searchsorted(times, t1, side='left'))
+        hi = len(times) if t2 is None else int(np.searchsorted(times, t2, side='right'))
+        return {name: getattr(self, name).values[lo:hi] for name in ('time', 'price', 'amount', 'side')}
+
+    def save(self, directory, release=False):
+        """Append trades added since the last save as a new segment; release=True drops them from memory."""
+        if len(self.time) == self._saved:
+            return None
+        path = _write_segment(directory, max(self._segment, _last_segment(directory)) + 1,
+                              **{name: getattr(self, name).values[self._saved:]
+                                 for name in ('time', 'price', 'amount', 'side')})
+        self._segment = _segment_number(path)
+        if release:
+            self._resume_from(*(getattr(self, name).values for name in ('time', 'price', 'amount', 'side')))
+            for name in ('time', 'price', 'amount', 'side'):
+                setattr(self, name, GrowableArray(getattr(self, name).values.dtype))
+        self._saved = len(self.time)
+        return path
+
+    def refresh(self, directory):
+        """Read segments written since the last refresh; returns how many."""
+        paths = _segments(directory, after=self._segment)
+        for path in paths:
+            with np.load(path) as data:
+                for name in ('time', 'price', 'amount', 'side'):
+                    getattr(self, name).extend(data[name])
+            self._segment = _segment_number(path)
+        self._saved = len(self.time)
+        self._resume_from(*(getattr(self, name).values for name in ('time', 'price', 'amount', 'side')))
+        return len(paths)
+
+    @classmethod
+    def load(cls, directory):
+        tape = cls()
+        tape.refresh(directory)
+        return tape
+
+    @classmethod
+    def resume(cls, directory):
+        """Empty tape that continues after the last saved trade, without loading the saved history."""
+        tape = cls()
+        paths = _segments(directory)
+        if paths:
+            with np.load(paths[-1]) as data:
+                tape._resume_from(*(data[name] for name in ('time', 'price', 'amount', 'side')))
+            tape._segment = _segment_number(paths[-1])
+        return tape
+
+
+def store_path(symbol, kind='orderbook', data_dir=None):
+    """Segment directory of the order book ('orderbook') or trade tape ('trades') history for a symbol."""
+    return os.path.join(data_dir or DATA_DIR, f'{symbol.replace("/", "_")}_{kind}')
+
+
+def collect(exchange_name, symbols, interval=10, depth=50, save_every=30, data_dir=None):
+    """
+    Poll order books and trades for each symbol, appending a new segment every `save_every` polls.
+    Saved history is released from memory; after a restart the trade tape resumes from the last
+    saved trade and the book starts over from a fresh snapshot.
+    """
+    from modules.api import make_exchange
+
+    exchange = make_exchange(exchange_name, {'enableRateLimit': True})
+    books = {symbol: OrderBookStore(symbol) for symbol in symbols}
+    tapes = {symbol: TradeTape.resume(store_path(symbol, 'trades', data_dir)) for symbol in symbols}
+
+    polls = 0
+    while True:
+        for symbol in symbols:
+            try:
+                book = exchange.fetch_order_book(symbol, limit=depth)
+                books[symbol].add(book['timestamp'] or exchange.milliseconds(), book['bids'], book['asks'])
+                added = tapes[symbol].add(exchange.fetch_trades(symbol, since=tapes[symbol].last_time))
+                logging.info(f"{symbol}: book updated, {added} new trades")
+            except Exception as e:
+                logging.error(f"Failed to collect {symbol} from {exchange_name}: {e}")
+        polls += 1
+        if polls % save_every == 0:
+            for symbol in symbols:
+                books[symbol].save(store_path(symbol, 'orderbook', data_dir), release=True)
+                tapes[symbol].save(store_path(symbol, 'trades', data_dir), release=True)
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect order book and trade history.")
+    parser.add_argument('symbols', nargs='+', help="Exchange pairs, e.g. BTC/USD ETH/USD")
+    parser.add_argument('--exchange', default='kraken')
+    parser.add_argument('--interval', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=50)
+    args = parser.parse_args()
+    collect(args.exchange, args.symbols, args.interval, args.depth)
@@ -0,0 +1,238 @@
+"""
+Portfolio of coin holdings recorded as lots (a buy or, with negative quantity, a sell at a price
+and time). Current value needs one batched price lookup for all holdings; P&L, allocation and
+drawdown history come from aligning the lots with stored price series as [time, asset] matrices.
+
+    python -m modules.portfolio --assets 200 --hours 8760
+"""
+import argparse
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from modules.candle_store import DATA_DIR
+
+try:
+    import fcntl  # POSIX: lets several server workers share one lots file
+except ImportError:
+    fcntl = None
+
+PORTFOLIO_PATH = os.environ.get('MAICOIN_PORTFOLIO_PATH', os.path.join(DATA_DIR, 'portfolio_lots.csv'))
+LOT_COLUMNS = ['id', 'symbol', 'quantity', 'price', 'timestamp']
+
+
+class Portfolio:
+    """
+    Lots persisted to a CSV file, with holdings, valuation and history computed from them. Several
+    processes may share the file: every change re-reads it under an exclusive file lock before
+    writing, and queries pick up changes made by other processes.
+    """
+
+    def __init__(self, path=PORTFOLIO_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None  # (mtime_ns, size) of the file the lots were read from
+        self.lots = pd.DataFrame(columns=LOT_COLUMNS)
+        self._reload()
+
+    def _reload(self):
+        """Re-read the lots file if it changed since it was last read."""
+        try:
+            stat = os.stat(self.path) if self.path else None
+        except FileNotFoundError:
+            stat = None
+        stamp = (stat.st_mtime_ns, stat.st_size) if stat else None
+        if stamp == self._stamp:
+            return
+        lots = pd.read_csv(self.path) if stamp else pd.DataFrame(columns=LOT_COLUMNS)
+        self.lots = lots.astype({'id': 'int64', 'symbol': 'str', 'quantity': 'float64', 'price': 'float64',
+                                 'timestamp': 'int64'})
+        self._stamp = stamp
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive access across threads and processes, with the lots freshly read from disk."""
+        with self._lock:
+            if not self.path or fcntl is None:
+                self._reload()
+                yield
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(f'{self.path}.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._reload()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        self.lots.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+        stat = os.stat(self.path)
+        self._stamp = (stat.st_mtime_ns, stat.st_size)
+
+    def _current_lots(self):
+        with self._lock:
+            self._reload()
+            return self.lots
+
+    def add_lot(self, symbol, quantity, price, timestamp=None):
+        """Record a buy (quantity > 0) or sell (quantity < 0) of `symbol` at `price`; returns the lot id."""
+        if not quantity:
+            raise ValueError("quantity must be non-zero")
+        if price is None or price < 0:
+            raise ValueError("price must be a non-negative number")
+        timestamp = int(time.time() * 1000) if timestamp is None else int(timestamp)
+        with self._locked():
+            lot_id = int(self.lots['id'].max()) + 1 if len(self.lots) else 1
+            lot = pd.DataFrame([[lot_id, symbol, float(quantity), float(price), timestamp]], columns=LOT_COLUMNS)
+            self.lots = lot if not len(self.lots) else pd.concat([self.lots, lot], ignore_index=True)
+            self._save()
+        return lot_id
+
+    def remove_lot(self, lot_id):
+        with self._locked():
+            found = bool((self.lots['id'] == lot_id).any())
+            if found:
+                self.lots = self.lots[self.lots['id'] != lot_id].reset_index(drop=True)
+                self._save()
+        return found
+
+    def symbols(self):
+        return sorted(self._current_lots()['symbol'].unique())
+
+    @staticmethod
+    def _filled(lots):
+        """
+        Lots in time order with sells clamped to the quantity held at that point (a sell of more
+        than is held closes the position), as the 'filled' column.
+        """
+        lots = lots.sort_values(['timestamp', 'id'])
+        filled = lots['quantity'].to_numpy().copy()
+        held = {}
+        for i, (symbol, quantity) in enumerate(zip(lots['symbol'], filled)):
+            if quantity < 0:
+                filled[i] = -min(-quantity, held.get(symbol, 0.0))
+            held[symbol] = held.get(symbol, 0.0) + filled[i]
+        return lots.assign(filled=filled)
+
+    def holdings(self):
+        """
+        {symbol: {'quantity', 'cost_basis', 'realized_pnl'}} using average cost: a sell realizes
+        (sell price - average cost) per unit and leaves the average cost of the rest unchanged.
+        """
+        result = {}
+        for symbol, lots in self._filled(self._current_lots()).groupby('symbol'):
+            quantity = cost = realized = 0.0
+            for lot_quantity, price in zip(lots['filled'], lots['price']):
+                if lot_quantity > 0:
+                    quantity += lot_quantity
+                    cost += lot_quantity * price
+                else:
+                    sold = -lot_quantity
+                    average = cost / quantity if quantity else 0.0
+                    realized += sold * (price - average)
+                    cost -= sold * average
+                    quantity -= sold
+            result[symbol] = {'quantity': quantity, 'cost_basis': cost, 'realized_pnl': realized}
+        return result
+
+    def valuation(self, prices):
+        """
+        Value the current holdings against `prices` ({symbol: price}, from one batched lookup):
+        per-holding value, unrealized P&L and allocation, plus portfolio totals.
+        """
+        holdings = self.holdings()
+        symbols = list(holdings)
+        quantity = np.array([holdings[s]['quantity'] for s in symbols])
+        cost = np.array([holdings[s]['cost_basis'] for s in symbols])
+        realized = np.array([holdings[s]['realized_pnl'] for s in symbols])
+        price = np.array([np.nan if prices.get(s) is None else prices[s] for s in symbols], dtype=np.float64)
+
+        value = quantity * price
+        total = np.nansum(value)
+        allocation = value / total if total else np.zeros_like(value)
+        unrealized = value - cost
+        rows = {symbol: {'quantity': float(quantity[i]), 'price': _number(price[i]), 'value': _number(value[i]),
+                         'cost_basis': float(cost[i]), 'unrealized_pnl': _number(unrealized[i]),
+                         'realized_pnl': float(realized[i]), 'allocation': _number(allocation[i])}
+                for i, symbol in enumerate(symbols)}
+        return {'holdings': rows, 'total_value': float(total), 'total_cost_basis': float(cost.sum()),
+                'unrealized_pnl': float(np.nansum(unrealized)), 'realized_pnl': float(realized.sum()),
+                'unpriced': [s for i, s in enumerate(symbols) if np.isnan(price[i]) and quantity[i]]}
+
+    def history(self, grid, symbols, prices):
+        """
+        Portfolio history on a time grid: `grid` [T] (ms), `symbols` [N] and `prices` [T, N] as from
+        correlation.align_series. Returns arrays for value, net invested cash, P&L (value minus net
+        invested, so realized gains included), drawdown from the running peak and allocation [T, N].
+        Oversells are clamped to the position held, as in holdings().
+        """
+        grid = np.asarray(grid, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        column = {symbol: j for j, symbol in enumerate(symbols)}
+        lots = self._filled(self._current_lots())
+        lots = lots[lots['symbol'].isin(column)]
+
+        # Each lot lands on the first grid point at or after it; cumulative sums give positions over time
+        rows = np.searchsorted(grid, lots['timestamp'].to_numpy(), side='left')
+        cols = lots['symbol'].map(column).to_numpy()
+        keep = rows < len(grid)
+        quantity = np.zeros(prices.shape)
+        np.add.at(quantity, (rows[keep], cols[keep]), lots['filled'].to_numpy()[keep])
+        quantity = np.cumsum(quantity, axis=0)
+        flows = np.zeros(len(grid))
+        np.add.at(flows, rows[keep], (lots['filled'] * lots['price']).to_numpy()[keep])
+        invested = np.cumsum(flows)
+
+        positions = np.where(quantity != 0, quantity * prices, 0.0)
+        positions = np.nan_to_num(positions)  # Held before the first stored price: counted as 0
+        value = positions.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            allocation = np.where(value[:, None] > 0, positions / value[:, None], 0.0)
+            peak = np.maximum.accumulate(value)
+            drawdown = np.where(peak > 0, value / peak - 1, 0.0)
+        return {'timestamps': grid, 'symbols': list(symbols), 'value': value, 'invested': invested,
+                'pnl': value - invested, 'drawdown': drawdown, 'max_drawdown': float(drawdown.min(initial=0.0)),
+                'allocation': allocation}
+
+
+def _number(value):
+    """JSON-friendly float: NaN becomes None."""
+    return None if np.isnan(value) else float(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark portfolio history over synthetic hourly prices.")
+    parser.add_argument('--assets', type=int, default=200)
+    parser.add_argument('--hours', type=int, default=24 * 365)
+    parser.add_argument('--lots', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    symbols = [f'coin{i}' for i in range(args.assets)]
+    grid = 1_700_000_000_000 + np.arange(args.hours, dtype=np.int64) * 3_600_000
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (args.hours, args.assets)), axis=0))
+    portfolio = Portfolio(path=None)
+    for _ in range(args.lots):
+        t = int(rng.integers(args.hours))
+        j = int(rng.integers(args.assets))
+        portfolio.add_lot(symbols[j], float(rng.uniform(0.1, 5)), prices[t, j], grid[t])
+
+    started = time.perf_counter()
+    result = portfolio.history(grid, symbols, prices)
+    elapsed = time.perf_counter() - started
+    print(f"{args.assets} assets x {args.hours} points, {args.lots} lots: history in {elapsed * 1000:.1f} ms, "
+          f"final value {result['value'][-1]:,.2f}, max drawdown {result['max_drawdown']:.1%}")
+    started = time.perf_counter()
+    portfolio.valuation({symbol: prices[-1, j] for j, symbol in enumerate(symbols)})
+    print(f"valuation in {(time.perf_counter() - started) * 1000:.1f} ms")
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from modules.api import get_prices
+from modules.shared_snapshot import open_snapshot, serving_role
+
+# Callbacks receiving {coin_id: usd_price} and the tick time (unix seconds) on every poll
+_subscribers = []
+_symbols = set()
+_lock = threading.Lock()
+_scheduler = None
+
+
+def subscribe(callback, symbols=()):
+    """Register a callback for every price tick and add its coin ids to the tracked set."""
+    with _lock:
+        if callback not in _subscribers:
+            _subscribers.append(callback)
+        _symbols.update(symbols)
+
+
+def track(symbols):
+    """Add coin ids to the set polled on each tick."""
+    with _lock:
+        _symbols.update(symbols)
+
+
+def poll_once():
+    """
+    Fetch one tick for all tracked coins with a single batched call (or from the shared snapshot
+    when a collector is running) and hand it to every subscriber. Server workers only read the
+    snapshot: coins the collector does not publish are not polled once per worker.
+    """
+    with _lock:
+        symbols = sorted(_symbols)
+        subscribers = list(_subscribers)
+    if not symbols:
+        return {}
+
+    snapshot = open_snapshot()
+    prices = {}
+    if snapshot is not None:
+        prices = {coin_id: snapshot.price(coin_id) for coin_id in symbols}
+    missing = [coin_id for coin_id in symbols if prices.get(coin_id) is None]
+    if missing and serving_role() != 'worker':
+        data = get_prices(missing)
+        prices.update({coin_id: quote.get('usd') for coin_id, quote in data.items()})
+    prices = {coin_id: price for coin_id, price in prices.items() if price is not None}
+    publish(prices, time.time(), subscribers)
+    return prices
+
+
+def publish(prices, now, subscribers=None):
+    """Hand one tick to every subscriber; also the entry point for replayed ticks (modules/replay.py)."""
+    if subscribers is None:
+        with _lock:
+            subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(prices, now)
+        except Exception as e:
+            logging.error(f"Price feed subscriber {callback} failed: {e}")
+
+
+def ensure_started(interval=60):
+    """Start the background polling job once per process."""
+    global _scheduler
+    with _lock:
+        if _scheduler is not None:
+            return _scheduler
+        _scheduler = BackgroundScheduler(daemon=True)
+        _scheduler.add_job(poll_once, 'interval', seconds=interval, id='price_feed',
+                           max_instances=1, coalesce=True)
+        _scheduler.start()
+        logging.info(f"Price feed started, polling every {interval} seconds")
+        return _scheduler
@@ -0,0 +1,314 @@
+"""
+Multi-resolution OHLCV pyramid: 1m candles are rolled up into 5m, 1h, 1d and 1w levels kept on disk
+next to them. Every level lives on a fixed time grid (row = candle index since the epoch), split into
+fixed-size .npy blocks, so a range read is a slice and a new batch of 1m candles only rewrites the
+parent buckets it touches. A query picks the coarsest level that still gives the requested number of
+points, so any zoom from years to an hour reads a bounded number of rows.
+
+    python -m modules.pyramid build BTC/USDT
+    python -m modules.pyramid sync BTC/USDT
+    python -m modules.pyramid query BTC/USDT --start 2024-01-01 --points 800
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from modules.candle_store import DATA_DIR, load_appended_candles, load_candles, store_version
+
+PYRAMID_DIR = os.environ.get('MAICOIN_PYRAMID_DIR', os.path.join(DATA_DIR, 'pyramid'))
+# (name, candle length ms, grid offset ms); weeks start on Monday, the epoch was a Thursday
+LEVELS = [
+    ('1m', 60_000, 0),
+    ('5m', 300_000, 0),
+    ('1h', 3_600_000, 0),
+    ('1d', 86_400_000, 0),
+    ('1w', 604_800_000, 4 * 86_400_000),
+]
+BLOCK_ROWS = 65_536  # Rows per block file: about 45 days of 1m candles, 3 MB
+WIDTH = 6  # timestamp, open, high, low, close, volume
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+MAX_GAP_MS = 86_400_000  # Batches are rolled up in runs split at gaps longer than this
+
+_write_lock = threading.Lock()
+
+
+def aggregate(child, ratio, timestamps):
+    """
+    Roll `ratio` consecutive child rows up into one parent row per bucket: first open, highest high,
+    lowest low, last close, summed volume. Missing (NaN) children are skipped; empty buckets stay NaN.
+    """
+    rows = child.reshape(-1, ratio, WIDTH)
+    valid = ~np.isnan(rows[:, :, 4])
+    filled = valid.any(axis=1)
+    buckets = np.arange(len(rows))
+    first = valid.argmax(axis=1)
+    last = ratio - 1 - valid[:, ::-1].argmax(axis=1)
+    parent = np.column_stack([
+        timestamps,
+        rows[buckets, first, 1],
+        np.where(valid, rows[:, :, 2], -np.inf).max(axis=1),
+        np.where(valid, rows[:, :, 3], np.inf).min(axis=1),
+        rows[buckets, last, 4],
+        np.where(valid, rows[:, :, 5], 0.0).sum(axis=1),
+    ])
+    parent[~filled] = np.nan
+    return parent
+
+
+class CandlePyramid:
+    """Block files per (symbol, level) under `root`, plus a small JSON extent per symbol."""
+
+    def __init__(self, root=PYRAMID_DIR):
+        self.root = root
+
+    def _dir(self, symbol):
+        return os.path.join(self.root, symbol.replace('/', '_'))
+
+    def _block_path(self, symbol, level, block):
+        return os.path.join(self._dir(symbol), f'{level}_{block}.npy')
+
+    def _read(self, symbol, level, lo, hi):
+        """Rows lo..hi (inclusive grid indices) of a level; NaN where nothing is stored."""
+        out = np.full((hi - lo + 1, WIDTH), np.nan)
+        for block in range(lo // BLOCK_ROWS, hi // BLOCK_ROWS + 1):
+            path = self._block_path(symbol, level, block)
+            if not os.path.exists(path):
+                continue
+            base = block * BLOCK_ROWS
+            a, b = max(lo, base), min(hi, base + BLOCK_ROWS - 1)
+            data = np.load(path, mmap_mode='r')
+            out[a - lo:b - lo + 1] = data[a - base:b - base + 1]
+        return out
+
+    def _write(self, symbol, level, lo, rows):
+        """Store rows at grid indices lo.. of a level, creating NaN-filled blocks as needed."""
+        hi = lo + len(rows) - 1
+        for block in range(lo // BLOCK_ROWS, hi // BLOCK_ROWS + 1):
+            path = self._block_path(symbol, level, block)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                np.save(path, np.full((BLOCK_ROWS, WIDTH), np.nan))
+            base = block * BLOCK_ROWS
+            a, b = max(lo, base), min(hi, base + BLOCK_ROWS - 1)
+            data = np.load(path, mmap_mode='r+')
+            data[a - base:b - base + 1] = rows[a - lo:b - lo + 1]
+            data.flush()
+            del data
+
+    def extent(self, symbol):
+        """(first, last) stored 1m timestamps for a symbol, or None."""
+        try:
+            with open(os.path.join(self._dir(symbol), 'extent.json')) as f:
+                extent = json.load(f)
+        except FileNotFoundError:
+            return None
+        return extent['first'], extent['last']
+
+    def _save_extent(self, symbol, first, last):
+        current = self.extent(symbol)
+        if current is not None:
+            first, last = min(first, current[0]), max(last, current[1])
+        path = os.path.join(self._dir(symbol), 'extent.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'first': first, 'last': last}, f)
+        os.replace(tmp_path, path)
+
+    def update(self, symbol, rows):
+        """
+        Add 1m candles ([timestamp_ms, open, high, low, close, volume] rows, any order, may overlap
+        what is stored) and re-aggregate only the parent buckets they fall into. Returns rows stored.
+        """
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, WIDTH)
+        rows = rows[~np.isnan(rows[:, 0])]
+        if not len(rows):
+            return 0
+        rows = rows[np.argsort(rows[:, 0], kind='stable')]
+        # Later rows for the same minute win, as in the candle store
+        index = rows[:, 0].astype(np.int64) // LEVELS[0][1]
+        keep = np.append(index[1:] != index[:-1], True)
+        rows, index = rows[keep], index[keep]
+        rows[:, 0] = index * LEVELS[0][1]
+
+        with _write_lock:
+            breaks = np.flatnonzero(np.diff(index) * LEVELS[0][1] > MAX_GAP_MS) + 1
+            for run_rows, run_index in zip(np.split(rows, breaks), np.split(index, breaks)):
+                self._update_run(symbol, run_rows, run_index)
+            self._save_extent(symbol, int(rows[0, 0]), int(rows[-1, 0]))
+        return len(rows)
+
+    def _update_run(self, symbol, rows, index):
+        lo, hi = int(index[0]), int(index[-1])
+        if hi - lo + 1 == len(rows):
+            self._write(symbol, LEVELS[0][0], lo, rows)
+        else:
+            # Fill the run's gaps from what is already stored
+            block = self._read(symbol, LEVELS[0][0], lo, hi)
+            block[index - lo] = rows
+            self._write(symbol, LEVELS[0][0], lo, block)
+
+        # Each parent level is rebuilt only over the buckets covering the changed child range
+        start, end = lo * LEVELS[0][1], hi * LEVELS[0][1]
+        for (child, child_ms, child_offset), (name, period, offset) in zip(LEVELS, LEVELS[1:]):
+            parent_lo, parent_hi = (start - offset) // period, (end - offset) // period
+            bucket_starts = np.arange(parent_lo, parent_hi + 1, dtype=np.int64) * period + offset
+            child_lo = (bucket_starts[0] - child_offset) // child_ms
+            ratio = period // child_ms
+            children = self._read(symbol, child, child_lo, child_lo + len(bucket_starts) * ratio - 1)
+            self._write(symbol, name, parent_lo, aggregate(children, ratio, bucket_starts))
+            start, end = int(bucket_starts[0]), int(bucket_starts[-1])
+
+    def _missing(self, symbol, lo, hi):
+        """Mask of the 1m grid rows lo..hi (inclusive) holding no candle, read a block at a time."""
+        missing = np.empty(hi - lo + 1, dtype=bool)
+        for a in range(lo, hi + 1, BLOCK_ROWS):
+            b = min(a + BLOCK_ROWS - 1, hi)
+            missing[a - lo:b - lo + 1] = np.isnan(self._read(symbol, LEVELS[0][0], a, b)[:, 4])
+        return missing
+
+    def pick_level(self, start, end, points):
+        """Coarsest level with at least `points` candles between start and end (the finest otherwise)."""
+        for name, period, offset in reversed(LEVELS):
+            if (end - start) // period >= points:
+                return name, period, offset
+        return LEVELS[0]
+
+    def query(self, symbol, start=None, end=None, points=800):
+        """
+        Candles [timestamp_ms, open, high, low, close, volume] for [start, end] (ms, default the whole
+        stored extent) at the coarsest level giving at least `points` of them. Returns (level, rows),
+        or (None, empty) when nothing is stored.
+        """
+        extent = self.extent(symbol)
+        if extent is None:
+            return None, np.empty((0, WIDTH))
+        start = extent[0] if start is None else max(start, extent[0])
+        end = extent[1] if end is None else min(end, extent[1])
+        if end < start:
+            return None, np.empty((0, WIDTH))
+        name, period, offset = self.pick_level(start, end, points)
+        rows = self._read(symbol, name, (start - offset) // period, (end - offset) // period)
+        return name, rows[~np.isnan(rows[:, 4])]
+
+    def _update_chunked(self, symbol, rows, chunk_days=30):
+        rows = rows[np.argsort(rows[:, 0], kind='stable')]
+        chunk = chunk_days * 86_400_000 // LEVELS[0][1]
+        for i in range(0, len(rows), chunk):
+            self.update(symbol, rows[i:i + chunk])
+        return len(rows)
+
+    def build(self, symbol, data_dir=None, chunk_days=30):
+        """(Re)build a symbol's pyramid from its stored 1m candles; returns candles processed."""
+        df = load_candles(symbol, '1m', data_dir=data_dir)
+        count = self._update_chunked(symbol, df[COLUMNS].to_numpy(np.float64), chunk_days)
+        logging.info(f"Built {symbol} pyramid from {count} 1m candles")
+        return count
+
+    def sync(self, symbol, data_dir=None):
+        """
+        Bring a symbol's pyramid up to date with its 1m candle store; returns candles rolled up.
+        The first sync reads the store and adds whatever the pyramid has no 1m candle for (a pyramid
+        started by 1m backfills misses the stored history around and between them); later syncs only roll
+        up the rows appended to the store since, tracked by byte offset in synced.json, or the whole
+        store if it was replaced.
+        """
+        version = store_version(symbol, '1m', data_dir)
+        if version is None:
+            return 0
+        path = os.path.join(self._dir(symbol), 'synced.json')
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = None
+        if state is not None and tuple(state['version']) == version:
+            return 0
+
+        rows = None
+        if state is not None:
+            appended, offset = load_appended_candles(symbol, '1m', state['offset'], data_dir)
+            if appended is not None:
+                rows = appended[COLUMNS].to_numpy(np.float64)
+        if rows is None:
+            offset = version[0]  # Taken before the read: rows appended meanwhile are rolled up again next time
+            rows = load_candles(symbol, '1m', data_dir=data_dir)[COLUMNS].to_numpy(np.float64)
+            extent = self.extent(symbol) if state is None else None  # A replaced store is rolled up in full
+            if extent is not None:
+                index = rows[:, 0].astype(np.int64) // LEVELS[0][1]
+                lo, hi = extent[0] // LEVELS[0][1], extent[1] // LEVELS[0][1]
+                inside = (index >= lo) & (index <= hi)
+                keep = ~inside
+                keep[inside] = self._missing(symbol, lo, hi)[index[inside] - lo]
+                rows = rows[keep]
+        count = self._update_chunked(symbol, rows)
+
+        os.makedirs(self._dir(symbol), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': list(version), 'offset': offset}, f)
+        os.replace(tmp_path, path)
+        if count:
+            logging.info(f"Synced {count} 1m candles of {symbol} into its pyramid")
+        return count
+
+
+def pyramid_dir(data_dir=None):
+    """Pyramid location for a candle store directory (the default store uses PYRAMID_DIR)."""
+    return os.path.join(data_dir, 'pyramid') if data_dir else PYRAMID_DIR
+
+
+candle_pyramid = CandlePyramid()
+
+
+if __name__ == "__main__":
+    from modules.export import parse_time
+
+    parser = argparse.ArgumentParser(description="Build or query the multi-resolution candle pyramid.")
+    parser.add_argument('command', choices=['build', 'sync', 'query', 'bench'])
+    parser.add_argument('symbol', help="Pair as stored, e.g. BTC/USDT")
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--points', type=int, default=800)
+    parser.add_argument('--years', type=int, default=5, help="Synthetic 1m history for 'bench'")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        count = candle_pyramid.build(args.symbol)
+        print(f"{count} candles rolled up in {time.perf_counter() - started:.2f}s")
+    elif args.command == 'sync':
+        started = time.perf_counter()
+        count = candle_pyramid.sync(args.symbol)
+        print(f"{count} candles rolled up in {time.perf_counter() - started:.2f}s")
+    elif args.command == 'query':
+        started = time.perf_counter()
+        level, rows = candle_pyramid.query(args.symbol, parse_time(args.start), parse_time(args.end), args.points)
+        print(f"level {level}: {len(rows)} candles in {(time.perf_counter() - started) * 1000:.1f} ms")
+    else:
+        import tempfile
+
+        rng = np.random.default_rng(0)
+        minutes = args.years * 525_600
+        start = 1_600_000_000_000 - 1_600_000_000_000 % 86_400_000
+        close = 10_000 * np.exp(np.cumsum(rng.normal(0, 0.0005, minutes)))
+        rows = np.column_stack([start + np.arange(minutes, dtype=np.float64) * 60_000, close, close * 1.001,
+                                close * 0.999, close, rng.uniform(0, 5, minutes)])
+        pyramid = CandlePyramid(tempfile.mkdtemp())
+        started = time.perf_counter()
+        for i in range(0, minutes, 43_200):
+            pyramid.update(args.symbol, rows[i:i + 43_200])
+        print(f"built {args.years}y of 1m candles in {time.perf_counter() - started:.1f}s")
+        end = int(rows[-1, 0])
+        for span, label in [(args.years * 365 * 86_400_000, f'{args.years}y'), (30 * 86_400_000, '30d'),
+                            (86_400_000, '1d'), (3_600_000, '1h')]:
+            started = time.perf_counter()
+            level, result = pyramid.query(args.symbol, end - span, end, args.points)
+            print(f"{label:>4}: level {level}, {len(result)} candles in {(time.perf_counter() - started) * 1000:.2f} ms")
+        started = time.perf_counter()
+        pyramid.update(args.symbol, rows[-1:] * [1, 1, 1.01, 1, 1, 1])
+        print(f"incremental update of one 1m candle: {(time.perf_counter() - started) * 1000:.2f} ms")
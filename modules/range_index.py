@@ -0,0 +1,219 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+
+class SparseTable:
+    """
+    Min and max with argmin/argmax over any index range in O(1), appendable in O(log n).
+    Level k holds the position of the min/max of values[i:i + 2**k] at slot i.
+    """
+
+    def __init__(self, values=None):
+        self.values = np.empty(0, dtype=np.float64)
+        self._argmin = []
+        self._argmax = []
+        self._size = 0
+        if values is not None and len(values):
+            self._build(np.asarray(values, dtype=np.float64))
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, n):
+        if n <= len(self.values):
+            return
+        capacity = max(n, 2 * len(self.values), 16)
+        values = np.empty(capacity, dtype=np.float64)
+        values[:self._size] = self.values[:self._size]
+        self.values = values
+        for levels in (self._argmin, self._argmax):
+            for k, level in enumerate(levels):
+                grown = np.zeros(capacity, dtype=np.int64)
+                grown[:len(level)] = level
+                levels[k] = grown
+
+    def _build(self, values):
+        n = len(values)
+        self._reserve(n)
+        self.values[:n] = values
+        self._size = n
+        # Every level is sized to the capacity, so appends after a build have room
+        positions = np.zeros(len(self.values), dtype=np.int64)
+        positions[:n] = np.arange(n)
+        self._argmin = [positions.copy()]
+        self._argmax = [positions.copy()]
+        k = 1
+        while (1 << k) <= n:
+            half = 1 << (k - 1)
+            count = n - (1 << k) + 1
+            for levels, better in ((self._argmin, np.less_equal), (self._argmax, np.greater_equal)):
+                left = levels[k - 1][:count]
+                right = levels[k - 1][half:half + count]
+                level = np.zeros(len(self.values), dtype=np.int64)
+                level[:count] = np.where(better(values[left], values[right]), left, right)
+                levels.append(level)
+            k += 1
+
+    def append(self, value):
+        """Add one value at the end, filling the one new slot per level that ends at it."""
+        n = self._size
+        self._reserve(n + 1)
+        self.values[n] = value
+        self._size = n + 1
+        if not self._argmin:
+            self._argmin.append(np.zeros(len(self.values), dtype=np.int64))
+            self._argmax.append(np.zeros(len(self.values), dtype=np.int64))
+        self._argmin[0][n] = n
+        self._argmax[0][n] = n
+
+        k = 1
+        while (1 << k) <= n + 1:
+            if len(self._argmin) <= k:
+                self._argmin.append(np.zeros(len(self.values), dtype=np.int64))
+                self._argmax.append(np.zeros(len(self.values), dtype=np.int64))
+            i = n + 1 - (1 << k)
+            half = 1 << (k - 1)
+            a, b = self._argmin[k - 1][i], self._argmin[k - 1][i + half]
+            self._argmin[k][i] = a if self.values[a] <= self.values[b] else b
+            a, b = self._argmax[k - 1][i], self._argmax[k - 1][i + half]
+            self._argmax[k][i] = a if self.values[a] >= self.values[b] else b
+            k += 1
+
+    def argmin(self, lo, hi):
+        """Position of the minimum of values[lo:hi + 1]."""
+        k = (hi - lo + 1).bit_length() - 1
+        a, b = self._argmin[k][lo], self._argmin[k][hi - (1 << k) + 1]
+        return int(a if self.values[a] <= self.values[b] else b)
+
+    def argmax(self, lo, hi):
+        """Position of the maximum of values[lo:hi + 1]."""
+        k = (hi - lo + 1).bit_length() - 1
+        a, b = self._argmax[k][lo], self._argmax[k][hi - (1 << k) + 1]
+        return int(a if self.values[a] >= self.values[b] else b)
+
+
+class ProfitSegmentTree:
+    """
+    Segment tree of mergeable max-profit summaries: the best buy-then-sell pair inside any index
+    range in O(log n), appendable in O(log n).
+    """
+
+    def __init__(self, sparse_table):
+        self.table = sparse_table
+        self._capacity = 1
+        self._nodes = [None, None]
+        self._rebuild()
+
+    def _merge(self, left, right):
+        """Combine two adjacent (argmin, argmax, profit, buy, sell) summaries; left precedes right."""
+        if left is None:
+            return right
+        if right is None:
+            return left
+        values = self.table.values
+        lmin, lmax, lprofit, lbuy, lsell = left
+        rmin, rmax, rprofit, rbuy, rsell = right
+        best = (lprofit, lbuy, lsell) if lprofit >= rprofit else (rprofit, rbuy, rsell)
+        cross = values[rmax] - values[lmin]
+        if cross > best[0]:
+            best = (float(cross), lmin, rmax)
+        return (lmin if values[lmin] <= values[rmin] else rmin,
+                lmax if values[lmax] >= values[rmax] else rmax) + best
+
+    def _rebuild(self):
+        n = len(self.table)
+        while self._capacity < max(n, 1):
+            self._capacity *= 2
+        self._nodes = [None] * (2 * self._capacity)
+        for i in range(n):
+            self._nodes[self._capacity + i] = (i, i, 0.0, i, i)
+        for node in range(self._capacity - 1, 0, -1):
+            self._nodes[node] = self._merge(self._nodes[2 * node], self._nodes[2 * node + 1])
+
+    def append(self):
+        """Account for the value just appended to the underlying sparse table."""
+        i = len(self.table) - 1
+        if i >= self._capacity:
+            self._rebuild()
+            return
+        node = self._capacity + i
+        self._nodes[node] = (i, i, 0.0, i, i)
+        node //= 2
+        while node:
+            self._nodes[node] = self._merge(self._nodes[2 * node], self._nodes[2 * node + 1])
+            node //= 2
+
+    def query(self, lo, hi):
+        """Summary (argmin, argmax, profit, buy, sell) of values[lo:hi + 1]."""
+        left, right = None, None
+        lo += self._capacity
+        hi += self._capacity + 1
+        while lo < hi:
+            if lo & 1:
+                left = self._merge(left, self._nodes[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right = self._merge(self._nodes[hi], right)
+            lo //= 2
+            hi //= 2
+        return self._merge(left, right)
+
+
+class PriceRangeIndex:
+    """
+    Range-query index over one [timestamp, price] series: high/low in O(1) and best buy/sell in
+    O(log n) for any [t1, t2], updated in O(log n) as new points append.
+    """
+
+    def __init__(self, prices=None):
+        prices = [] if prices is None else prices
+        self.timestamps = [int(timestamp) for timestamp, _ in prices]
+        self.table = SparseTable([price for _, price in prices])
+        self.tree = ProfitSegmentTree(self.table)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, timestamp, price):
+        """Add a newer point; out-of-order points are ignored."""
+        if self.timestamps and timestamp <= self.timestamps[-1]:
+            return
+        self.timestamps.append(int(timestamp))
+        self.table.append(price)
+        self.tree.append()
+
+    def _bounds(self, t1, t2):
+        lo = 0 if t1 is None else bisect_left(self.timestamps, t1)
+        hi = len(self) - 1 if t2 is None else bisect_right(self.timestamps, t2) - 1
+        return lo, hi
+
+    def high_low(self, t1=None, t2=None):
+        """High and low (with their timestamps) between t1 and t2 in milliseconds, or None if empty."""
+        lo, hi = self._bounds(t1, t2)
+        if lo > hi:
+            return None
+        i_low, i_high = self.table.argmin(lo, hi), self.table.argmax(lo, hi)
+        return {
+            "low_time": self.timestamps[i_low],
+            "low_price": float(self.table.values[i_low]),
+            "high_time": self.timestamps[i_high],
+            "high_price": float(self.table.values[i_high]),
+        }
+
+    def best_trade(self, t1=None, t2=None):
+        """Best buy-then-sell pair between t1 and t2, or None when no profitable pair exists."""
+        lo, hi = self._bounds(t1, t2)
+        if lo > hi:
+            return None
+        _, _, profit, buy, sell = self.tree.query(lo, hi)
+        if profit <= 0:
+            return None
+        return {
+            "best_buy_time": self.timestamps[buy],
+            "best_buy_price": float(self.table.values[buy]),
+            "best_sell_time": self.timestamps[sell],
+            "best_sell_price": float(self.table.values[sell]),
+            "max_profit": float(profit),
+        }
@@ -0,0 +1,329 @@
+"""
+Replay of stored candles through the same interfaces as the live sources, at real-time speed, a
+multiple of it, or as fast as the consumer can take them:
+
+- ReplayExchange stands in for a ccxt exchange (fetch_ohlcv), so the real-time chart code runs
+  unchanged; make_exchange() returns one when MAICOIN_REPLAY_SPEED is set ('1', '100', 'max').
+- replay_ticks() yields {pair: close} ticks; replay_feed() publishes them to price-feed subscribers
+  keyed by CoinGecko id, and the app uses it instead of live polling when MAICOIN_REPLAY_SPEED is set.
+- benchmark() drives the indicator, alert and chart-update stages and reports ticks per second.
+
+    python -m modules.replay BTC/USDT --file BTC/USDT=BTC_USDT_data.csv --speed max --bench
+    python -m modules.replay BTC/USD ETH/USD --speed 100 --feed --alerts 20
+"""
+import argparse
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from modules.candle_store import COLUMNS, load_candles
+
+TIMEFRAME_UNITS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def timeframe_ms(timeframe):
+    """Candle length in milliseconds for a ccxt-style timeframe such as '1m', '4h' or '1d'."""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+
+
+def parse_speed(value):
+    """'max' (or 0) means unthrottled, returned as None; otherwise a float multiple of real time."""
+    if value is None or str(value).lower() in ('max', '0', 'inf'):
+        return None
+    return float(value)
+
+
+def load_series(symbol, timeframe, data_dir=None, path=None):
+    """Stored candles as a sorted, de-duplicated float64 array [n, 6] (timestamp_ms, o, h, l, c, v)."""
+    if path is not None:
+        df = pd.read_csv(path).drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
+    else:
+        df = load_candles(symbol, timeframe, data_dir=data_dir)
+    return df[COLUMNS[:-1]].to_numpy(dtype=np.float64)
+
+
+class ReplayClock:
+    """
+    Replay time in milliseconds. Throttled clocks run `speed` times faster than the wall clock from
+    the moment they start; unthrottled clocks (speed=None) only move when advance() is called.
+    """
+
+    def __init__(self, speed=1.0, start_ms=None):
+        self.speed = speed
+        self._start_ms = start_ms
+        self._started_at = time.monotonic()
+        self._cursor = start_ms
+        self._lock = threading.Lock()
+
+    def start_at(self, start_ms):
+        """Anchor the clock at `start_ms` unless it is already anchored."""
+        with self._lock:
+            if self._start_ms is None:
+                self._start_ms = self._cursor = start_ms
+                self._started_at = time.monotonic()
+
+    def advance(self, step_ms):
+        with self._lock:
+            self._cursor += step_ms
+
+    def now(self):
+        if self.speed is None:
+            return self._cursor
+        return self._start_ms + (time.monotonic() - self._started_at) * 1000 * self.speed
+
+
+class ReplayExchange:
+    """
+    ccxt-compatible exchange whose fetch_ohlcv() returns stored candles up to the replay clock.
+    The clock starts `warmup` candles into the first series requested, so the first call already
+    has a full window to chart. Unthrottled, every fetch moves the clock on by one candle.
+    """
+
+    def __init__(self, speed=1.0, data_dir=None, files=None, start=None, warmup=100):
+        self.id = 'replay'
+        self.clock = ReplayClock(speed, start)
+        self.data_dir = data_dir
+        self.files = files or {}  # symbol -> CSV path overriding the candle store
+        self.warmup = warmup
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol, timeframe):
+        with self._lock:
+            key = (symbol, timeframe)
+            if key not in self._series:
+                self._series[key] = load_series(symbol, timeframe, self.data_dir, self.files.get(symbol))
+            return self._series[key]
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        data = self._load(symbol, timeframe)
+        if not len(data):
+            return []
+        self.clock.start_at(data[min(self.warmup, len(data) - 1), 0])
+        if self.clock.speed is None:
+            self.clock.advance(timeframe_ms(timeframe))
+
+        timestamps = data[:, 0]
+        end = np.searchsorted(timestamps, self.clock.now(), side='right')
+        if since is None:
+            begin = max(0, end - limit) if limit else 0
+        else:
+            begin = np.searchsorted(timestamps, since, side='left')
+            if limit:
+                end = min(end, begin + limit)
+        return [[int(row[0]), *row[1:]] for row in data[begin:end].tolist()]
+
+
+_shared_exchanges = {}
+_shared_lock = threading.Lock()
+
+
+def shared_exchange(speed):
+    """One ReplayExchange (and clock) per speed per process, so repeated make_exchange() calls agree."""
+    with _shared_lock:
+        if speed not in _shared_exchanges:
+            _shared_exchanges[speed] = ReplayExchange(speed)
+        return _shared_exchanges[speed]
+
+
+def replay_ticks(symbols, timeframe='1m', speed=1.0, start=None, end=None, data_dir=None, files=None):
+    """
+    Yield (timestamp_ms, {symbol: close}) for every candle time in [start, end] across `symbols`,
+    carrying each symbol's last close forward. Throttled replays sleep so that candle time passes
+    `speed` times faster than wall time; speed=None never sleeps.
+    """
+    files = files or {}
+    series = {symbol: load_series(symbol, timeframe, data_dir, files.get(symbol)) for symbol in symbols}
+    series = {symbol: data for symbol, data in series.items() if len(data)}
+    if not series:
+        return
+    timeline = np.unique(np.concatenate([data[:, 0] for data in series.values()]))
+    if start is not None:
+        timeline = timeline[timeline >= start]
+    if end is not None:
+        timeline = timeline[timeline <= end]
+    if not len(timeline):
+        return
+
+    # As-of index of each symbol's latest candle at every timeline point (-1 before its first candle)
+    positions = {symbol: np.searchsorted(data[:, 0], timeline, side='right') - 1 for symbol, data in series.items()}
+    closes = {symbol: data[:, 4] for symbol, data in series.items()}
+
+    started_at, first = time.monotonic(), timeline[0]
+    for i, timestamp in enumerate(timeline):
+        if speed is not None:
+            delay = started_at + (timestamp - first) / 1000 / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield int(timestamp), {symbol: float(closes[symbol][positions[symbol][i]])
+                               for symbol in series if positions[symbol][i] >= 0}
+
+
+def pair_coin_ids(symbols):
+    """
+    CoinGecko id for each exchange pair, as the price feed keys its ticks: the watchlist coin
+    trading on that pair, else the coin the pair's base ticker resolves to. Unknown pairs keep
+    their own name.
+    """
+    from modules.coin_registry import coin_registry
+
+    by_pair = {coin['exchange_symbol']: coin['id'] for coin in coin_registry.watchlist()}
+    ids = {}
+    for symbol in symbols:
+        coin = coin_registry.resolve(symbol.split('/')[0]) if symbol not in by_pair else None
+        ids[symbol] = by_pair.get(symbol) or (coin['id'] if coin else symbol)
+        if ids[symbol] == symbol:
+            logging.warning(f"No coin id for {symbol}; its replayed ticks keep the pair name.")
+    return ids
+
+
+def replay_feed(symbols, timeframe='1m', speed=1.0, start=None, end=None, data_dir=None, files=None):
+    """
+    Push replayed ticks to the price-feed subscribers, exactly as live polls are delivered: keyed
+    by CoinGecko id, so alerts and the anomaly detector see replayed coins under their usual names.
+    """
+    from modules import price_feed
+
+    coin_ids = pair_coin_ids(symbols)
+    count = 0
+    for timestamp, prices in replay_ticks(symbols, timeframe, speed, start, end, data_dir, files):
+        price_feed.publish({coin_ids[symbol]: price for symbol, price in prices.items()}, timestamp / 1000)
+        count += 1
+    return count
+
+
+_feed_thread = None
+
+
+def ensure_feed(symbols, timeframe='1m', speed=1.0, data_dir=None):
+    """Run replay_feed in a background thread once per process, in place of live price polling."""
+    global _feed_thread
+    with _shared_lock:
+        if _feed_thread is None:
+            _feed_thread = threading.Thread(target=replay_feed, args=(list(symbols), timeframe, speed),
+                                            kwargs={'data_dir': data_dir}, name='replay-feed', daemon=True)
+            _feed_thread.start()
+            logging.info(f"Replaying {', '.join(symbols)} {timeframe} candles into the price feed")
+        return _feed_thread
+
+
+class _ChartStage:
+    """Rebuilds the real-time chart figure from a rolling window, like the dashboard does per refresh."""
+
+    def __init__(self, window):
+        self.windows = {}
+        self.window = window
+
+    def __call__(self, prices, now):
+        import plotly.graph_objs as go
+
+        for symbol, price in prices.items():
+            points = self.windows.setdefault(symbol, deque(maxlen=self.window))
+            points.append((now, price))
+            x, y = zip(*points)
+            go.Figure(go.Scatter(x=pd.to_datetime(x, unit='s'), y=y, name=symbol)).to_json()
+
+
+def benchmark(symbols, timeframe='1m', start=None, end=None, n_alerts=1000, chart=True, chart_window=100,
+              data_dir=None, files=None):
+    """
+    Replay unthrottled through the indicator (ForecastEngine), alert (AlertEngine) and optional
+    chart-update stages and return {stage: {'seconds', 'ticks_per_second'}} plus a 'total' row.
+    """
+    from modules.alerts import AlertEngine
+    from modules.forecasting import ForecastEngine
+
+    files = files or {}
+    symbols = list(symbols)
+    forecaster = ForecastEngine(symbols, timeframe_ms(timeframe))
+    alerts = AlertEngine()
+    # Thresholds spread over each symbol's stored price range, plus a few SMA-cross alerts
+    for symbol in symbols:
+        closes = load_series(symbol, timeframe, data_dir, files.get(symbol))[:, 4]
+        if not len(closes):
+            continue
+        for threshold in np.linspace(closes.min(), closes.max(), n_alerts // 2):
+            alerts.add_threshold(symbol, threshold, 'above')
+            alerts.add_threshold(symbol, threshold, 'below')
+        for period in (5, 20, 50):
+            alerts.add_indicator_cross(symbol, period, 'above')
+            alerts.add_indicator_cross(symbol, period, 'below')
+
+    def indicators(prices, now):
+        forecaster.update(int(now * 1000), [prices.get(symbol, np.nan) for symbol in symbols])
+        forecaster.forecast()
+
+    stages = [('indicators', indicators), ('alerts', alerts.on_prices)]
+    if chart:
+        stages.append(('chart', _ChartStage(chart_window)))
+
+    seconds = dict.fromkeys([name for name, _ in stages], 0.0)
+    ticks = 0
+    started = time.perf_counter()
+    for timestamp, prices in replay_ticks(symbols, timeframe, None, start, end, data_dir, files):
+        now = timestamp / 1000
+        for name, stage in stages:
+            stage_started = time.perf_counter()
+            stage(prices, now)
+            seconds[name] += time.perf_counter() - stage_started
+        ticks += 1
+    total = time.perf_counter() - started
+
+    report = {name: {'seconds': spent, 'ticks_per_second': ticks / spent if spent else float('inf')}
+              for name, spent in seconds.items()}
+    report['total'] = {'seconds': total, 'ticks_per_second': ticks / total if total else float('inf'),
+                       'ticks': ticks, 'alerts_triggered': len(alerts.triggered)}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay stored candles at 1x, Nx or unthrottled speed.")
+    parser.add_argument('symbols', nargs='+', help="Pairs as stored, e.g. BTC/USDT")
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--speed', default='1', help="Multiple of real time, or 'max' for unthrottled")
+    parser.add_argument('--start', type=int, default=None, help="Millisecond timestamp")
+    parser.add_argument('--end', type=int, default=None, help="Millisecond timestamp")
+    parser.add_argument('--file', action='append', default=[], metavar='SYMBOL=PATH',
+                        help="Read SYMBOL from this CSV instead of the candle store (repeatable)")
+    parser.add_argument('--bench', action='store_true', help="Measure pipeline throughput (always unthrottled)")
+    parser.add_argument('--feed', action='store_true',
+                        help="Publish ticks to the price feed and print the alerts and anomalies they raise")
+    parser.add_argument('--alerts', type=int, default=1000, help="Threshold alerts per symbol for --bench/--feed")
+    parser.add_argument('--no-chart', action='store_true', help="Skip the chart-update stage in --bench")
+    args = parser.parse_args()
+    files = dict(spec.split('=', 1) for spec in args.file)
+
+    if args.bench:
+        report = benchmark(args.symbols, args.timeframe, args.start, args.end, args.alerts, not args.no_chart,
+                           files=files)
+        print(f"{'stage':12} {'seconds':>10} {'ticks/s':>12}")
+        for name, row in report.items():
+            print(f"{name:12} {row['seconds']:>10.3f} {row['ticks_per_second']:>12.0f}")
+        print(f"{report['total']['ticks']} ticks, {report['total']['alerts_triggered']} alerts triggered")
+    elif args.feed:
+        from modules import price_feed
+        from modules.alerts import AlertEngine
+        from modules.anomaly import AnomalyDetector
+
+        alerts, detector = AlertEngine(), AnomalyDetector()
+        for symbol, coin_id in pair_coin_ids(args.symbols).items():
+            closes = load_series(symbol, args.timeframe, path=files.get(symbol))[:, 4]
+            for threshold in np.linspace(closes.min(), closes.max(), args.alerts) if len(closes) else []:
+                alerts.add_threshold(coin_id, threshold, 'above')
+        price_feed.subscribe(alerts.on_prices)
+        price_feed.subscribe(detector.on_prices)
+        ticks = replay_feed(args.symbols, args.timeframe, parse_speed(args.speed), args.start, args.end,
+                            files=files)
+        for event in alerts.drain(len(alerts.triggered)):
+            print('alert', event)
+        for event in detector.recent(0, 1000):
+            print('anomaly', event)
+        print(f"{ticks} ticks published")
+    else:
+        for timestamp, prices in replay_ticks(args.symbols, args.timeframe, parse_speed(args.speed), args.start,
+                                              args.end, files=files):
+            print(pd.Timestamp(timestamp, unit='ms'), prices)
@@ -0,0 +1,170 @@
+import logging
+import os
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from modules.candle_store import candle_file, load_appended_candles, load_candles, store_version
+
+MAX_DRAWDOWN_WINDOW = 1_000_000  # Candles; about two years of 1m bars
+
+
+class PrefixStats:
+    """
+    Cumulative sums over one candle series so mean, VWAP, return and volatility over any
+    [t1, t2] are O(1) after an O(n) build. New candles extend the sums in O(1) each.
+    """
+
+    def __init__(self, timestamps=(), closes=(), volumes=()):
+        self.timestamps = [int(t) for t in timestamps]
+        closes = np.asarray(closes, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        log_returns = np.diff(np.log(closes)) if len(closes) else np.empty(0)
+
+        # Each cumulative array has a leading zero so a window sum is cum[hi + 1] - cum[lo]
+        self.closes = list(closes)
+        self.cum_price = [0.0] + list(np.cumsum(closes))
+        self.cum_volume = [0.0] + list(np.cumsum(volumes))
+        self.cum_pv = [0.0] + list(np.cumsum(closes * volumes))
+        # Log return i is from candle i-1 to candle i; the first candle has none
+        self.cum_ret = [0.0, 0.0] + list(np.cumsum(log_returns)) if len(closes) else [0.0]
+        self.cum_ret_sq = [0.0, 0.0] + list(np.cumsum(log_returns ** 2)) if len(closes) else [0.0]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, timestamp, close, volume):
+        """Extend the sums with one newer candle; older or duplicate timestamps are ignored."""
+        if self.timestamps and timestamp <= self.timestamps[-1]:
+            return
+        log_return = float(np.log(close / self.closes[-1])) if self.closes else 0.0
+        if not self.closes:
+            self.cum_ret.append(0.0)
+            self.cum_ret_sq.append(0.0)
+        self.timestamps.append(int(timestamp))
+        self.closes.append(float(close))
+        self.cum_price.append(self.cum_price[-1] + close)
+        self.cum_volume.append(self.cum_volume[-1] + volume)
+        self.cum_pv.append(self.cum_pv[-1] + close * volume)
+        if len(self.closes) > 1:
+            self.cum_ret.append(self.cum_ret[-1] + log_return)
+            self.cum_ret_sq.append(self.cum_ret_sq[-1] + log_return ** 2)
+
+    def window(self, t1=None, t2=None):
+        """Mean, VWAP, return and log-return volatility between t1 and t2 (ms), or None if empty."""
+        lo = 0 if t1 is None else bisect_left(self.timestamps, t1)
+        hi = len(self) - 1 if t2 is None else bisect_right(self.timestamps, t2) - 1
+        if lo > hi:
+            return None
+
+        count = hi - lo + 1
+        volume = self.cum_volume[hi + 1] - self.cum_volume[lo]
+        # Returns inside the window are those ending at candles lo+1 .. hi
+        n_returns = hi - lo
+        sum_ret = self.cum_ret[hi + 1] - self.cum_ret[lo + 1]
+        sum_ret_sq = self.cum_ret_sq[hi + 1] - self.cum_ret_sq[lo + 1]
+        volatility = None
+        if n_returns > 1:
+            variance = (sum_ret_sq - sum_ret ** 2 / n_returns) / (n_returns - 1)
+            volatility = float(np.sqrt(max(variance, 0.0)))
+
+        return {
+            'start': self.timestamps[lo],
+            'end': self.timestamps[hi],
+            'count': count,
+            'mean_price': (self.cum_price[hi + 1] - self.cum_price[lo]) / count,
+            'vwap': (self.cum_pv[hi + 1] - self.cum_pv[lo]) / volume if volume > 0 else None,
+            'volume': volume,
+            'return': self.closes[hi] / self.closes[lo] - 1,
+            'log_return': sum_ret,
+            'volatility': volatility,
+        }
+
+
+def _trailing_max(values, window):
+    """
+    Max of values[i - window + 1:i + 1] (clipped at the start) for every i in O(n): prefix and suffix
+    maxima inside fixed blocks of `window` (van Herk / Gil-Werman), so memory stays O(n).
+    """
+    n = len(values)
+    blocks = np.full(-(-n // window) * window, -np.inf)
+    blocks[:n] = values
+    blocks = blocks.reshape(-1, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()[:n]
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()[:n]
+    result = np.maximum.accumulate(values)  # Windows that start before the first candle
+    start = np.arange(window - 1, n) - window + 1
+    result[window - 1:] = np.maximum(suffix[start], prefix[window - 1:])
+    return result
+
+
+def rolling_max_drawdown(closes, window=None):
+    """
+    Max drawdown (as a negative fraction) up to each candle: dips are measured from the running
+    peak when window is None, otherwise from the highest close within the trailing `window` candles.
+    O(n) time and memory either way.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    if window is None:
+        drawdown = closes / np.maximum.accumulate(closes) - 1
+        return np.minimum.accumulate(drawdown)
+    if not 1 <= window <= MAX_DRAWDOWN_WINDOW:
+        raise ValueError(f"drawdown window must be between 1 and {MAX_DRAWDOWN_WINDOW} candles")
+    return np.minimum.accumulate(closes / _trailing_max(closes, window) - 1)
+
+
+_stats_cache = {}
+
+
+def get_prefix_stats(symbol, timeframe='1m', data_dir=None):
+    """
+    PrefixStats for a stored series. When the store changes, only the rows appended since the last
+    read are parsed and added; a full rebuild happens only if those rows are not all newer (a
+    backfill of older candles or a revised last candle) or the file was replaced.
+    """
+    key = (symbol, timeframe, data_dir)
+    version = store_version(symbol, timeframe, data_dir)
+    cached = _stats_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[2]
+
+    if cached is not None:
+        _, offset, stats = cached
+        tail, new_offset = load_appended_candles(symbol, timeframe, offset, data_dir)
+        if tail is not None:
+            tail = tail.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
+            if not len(tail) or not len(stats) or tail['timestamp'].iloc[0] > stats.timestamps[-1]:
+                for timestamp, close, volume in zip(tail['timestamp'], tail['close'], tail['volume']):
+                    stats.append(timestamp, close, volume)
+                _stats_cache[key] = (version, new_offset, stats)
+                return stats
+
+    # Size first: rows appended while reading are simply seen again (and trigger a rebuild) next time
+    try:
+        offset = os.path.getsize(candle_file(symbol, timeframe, data_dir))
+    except FileNotFoundError:
+        offset = 0
+    df = load_candles(symbol, timeframe, data_dir=data_dir)
+    stats = PrefixStats(df['timestamp'], df['close'], df['volume'])
+    _stats_cache[key] = (version, offset, stats)
+    return stats
+
+
+def compute_window_stats(symbols, timeframe='1m', t1=None, t2=None, drawdown_window=None, data_dir=None):
+    """
+    Window statistics for several stored symbols in one call, including max drawdown over the
+    window (from the running peak, or within `drawdown_window` candles).
+    """
+    results = {}
+    for symbol in symbols:
+        stats = get_prefix_stats(symbol, timeframe, data_dir)
+        summary = stats.window(t1, t2)
+        if summary is None:
+            logging.warning(f"No candles for {symbol} {timeframe} in the requested range.")
+            results[symbol] = None
+            continue
+        lo = bisect_left(stats.timestamps, summary['start'])
+        closes = stats.closes[lo:lo + summary['count']]
+        summary['max_drawdown'] = float(rolling_max_drawdown(closes, drawdown_window).min())
+        results[symbol] = summary
+    return results
@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from modules.api import fetch_data_with_retry, get_prices, make_exchange
+
+# Memory-mapped file shared by the collector and every server worker (tmpfs when available)
+SNAPSHOT_PATH = os.environ.get('MAICOIN_SNAPSHOT_PATH',
+                               '/dev/shm/maicoin_snapshot' if os.path.isdir('/dev/shm') else 'maicoin_snapshot')
+# Header: version (uint64), updated_at ms (uint64), layout length (uint64), then the JSON layout,
+# padded so the arrays after it start on a 64-byte boundary
+HEADER_FIELDS = 24
+CANDLE_FIELDS = 6  # timestamp, open, high, low, close, volume
+
+
+def serving_role():
+    """
+    'worker' in gunicorn web workers, 'collector' in the collector process (see gunicorn.conf.py),
+    'standalone' otherwise: a single process that polls and serves everything itself.
+    """
+    return os.environ.get('MAICOIN_ROLE', 'standalone')
+
+
+def _header_size(layout_length):
+    return -(-(HEADER_FIELDS + layout_length) // 64) * 64
+
+
+def default_coins():
+    """Watchlist coins from the coin registry as snapshot entries {'id', 'pair'}."""
+    from modules.coin_registry import coin_registry
+    return [{'id': coin['id'], 'pair': coin['exchange_symbol']} for coin in coin_registry.watchlist()]
+
+
+def _map_arrays(mm, n_coins, n_candles, header_size):
+    """
+    Create NumPy views over the header counters, prices, candle counts, per-coin refresh times
+    ([price ms, candles ms]) and candle block.
+    """
+    version = np.ndarray((2,), dtype=np.uint64, buffer=mm, offset=0)
+    offset = header_size
+    prices = np.ndarray((n_coins,), dtype=np.float64, buffer=mm, offset=offset)
+    offset += prices.nbytes
+    counts = np.ndarray((n_coins,), dtype=np.int64, buffer=mm, offset=offset)
+    offset += counts.nbytes
+    stamps = np.ndarray((n_coins, 2), dtype=np.int64, buffer=mm, offset=offset)
+    offset += stamps.nbytes
+    candles = np.ndarray((n_coins, n_candles, CANDLE_FIELDS), dtype=np.float64, buffer=mm, offset=offset)
+    return version, prices, counts, stamps, candles
+
+
+class SnapshotWriter:
+    """
+    Single-writer side of the shared market snapshot. Updates follow a seqlock: the version counter
+    is odd while a write is in progress and even once it is complete.
+    """
+
+    def __init__(self, coins=None, n_candles=100, path=SNAPSHOT_PATH):
+        self.coins = coins or default_coins()
+        self.n_candles = n_candles
+        layout = json.dumps({'coins': self.coins, 'n_candles': n_candles}).encode()
+        header_size = _header_size(len(layout))
+
+        n = len(self.coins)
+        size = header_size + n * 32 + n * n_candles * CANDLE_FIELDS * 8
+        # Build the file aside and swap it in, so workers never map a half-initialised region
+        tmp_path = f'{path}.tmp'
+        self.mm = np.memmap(tmp_path, dtype=np.uint8, mode='w+', shape=(size,))
+        np.ndarray((1,), dtype=np.uint64, buffer=self.mm, offset=16)[0] = len(layout)
+        self.mm[HEADER_FIELDS:HEADER_FIELDS + len(layout)] = np.frombuffer(layout, dtype=np.uint8)
+        self.mm.flush()
+        os.replace(tmp_path, path)
+        self.version, self.prices, self.counts, self.stamps, self.candles = _map_arrays(
+            self.mm, n, n_candles, header_size)
+        self.prices[:] = np.nan
+        self._index = {coin['id']: i for i, coin in enumerate(self.coins)}
+
+    def write(self, prices, candles):
+        """
+        Publish a new snapshot. `prices` maps coin id -> USD price and `candles` maps coin id -> list of
+        [timestamp, open, high, low, close, volume] rows (most recent last). Missing or failed entries
+        (None) keep their previous values and refresh times, so readers can tell they went stale.
+        """
+        now = int(time.time() * 1000)
+        refreshed = False
+        self.version[0] += 1  # Odd: readers will retry
+        for coin_id, price in prices.items():
+            if coin_id in self._index and price is not None:
+                self.prices[self._index[coin_id]] = price
+                self.stamps[self._index[coin_id], 0] = now
+                refreshed = True
+        for coin_id, rows in candles.items():
+            if coin_id not in self._index or rows is None or not len(rows):
+                continue
+            i = self._index[coin_id]
+            rows = np.asarray(rows[-self.n_candles:], dtype=np.float64)
+            self.candles[i, :len(rows)] = rows
+            self.counts[i] = len(rows)
+            self.stamps[i, 1] = now
+            refreshed = True
+        if refreshed:
+            self.version[1] = now
+        self.version[0] += 1  # Even: snapshot is consistent again
+        self.mm.flush()
+
+
+class SnapshotReader:
+    """Read-only, zero-copy view of the shared snapshot for server workers."""
+
+    def __init__(self, path=SNAPSHOT_PATH, max_age=180):
+        self.max_age = max_age  # Seconds after which a coin's price or candles count as missing
+        self.mm = np.memmap(path, dtype=np.uint8, mode='r')
+        length = int(np.ndarray((1,), dtype=np.uint64, buffer=self.mm, offset=16)[0])
+        layout = json.loads(bytes(self.mm[HEADER_FIELDS:HEADER_FIELDS + length]))
+        self.coins = layout['coins']
+        self._version, self._prices, self._counts, self._stamps, self._candles = _map_arrays(
+            self.mm, len(self.coins), layout['n_candles'], _header_size(length))
+        self._by_id = {coin['id']: i for i, coin in enumerate(self.coins)}
+        self._by_pair = {coin['pair']: i for i, coin in enumerate(self.coins)}
+
+    @property
+    def updated_at(self):
+        """Millisecond timestamp of the last write that refreshed anything."""
+        return int(self._version[1])
+
+    def _fresh(self, stamp):
+        return time.time() * 1000 - stamp <= self.max_age * 1000
+
+    def read(self, fn, retries=100):
+        """
+        Call fn(prices, counts, candles) on the live arrays and return its result, retrying if the
+        collector published a new version mid-read. fn should copy out whatever it needs.
+        """
+        for _ in range(retries):
+            before = int(self._version[0])
+            if before % 2 == 0:
+                result = fn(self._prices, self._counts, self._candles)
+                if int(self._version[0]) == before:
+                    return result
+            time.sleep(0.001)
+        raise RuntimeError("Snapshot kept changing while being read.")
+
+    def price(self, coin_id):
+        """Latest USD price for a coin id, or None if the coin is not collected or its price is stale."""
+        if coin_id not in self._by_id:
+            return None
+        i = self._by_id[coin_id]
+        price, stamp = self.read(lambda prices, counts, candles: (float(prices[i]), int(self._stamps[i, 0])))
+        return None if np.isnan(price) or not self._fresh(stamp) else price
+
+    def candles(self, pair):
+        """Copy of the stored candles for an exchange pair as an (n, 6) array, or None if missing or stale."""
+        if pair not in self._by_pair:
+            return None
+        i = self._by_pair[pair]
+        rows, stamp = self.read(
+            lambda prices, counts, candles: (candles[i, :counts[i]].copy(), int(self._stamps[i, 1])))
+        return rows if len(rows) and self._fresh(stamp) else None
+
+
+_readers = {}
+
+
+def open_snapshot(path=SNAPSHOT_PATH, max_age=180):
+    """Return a (per-process cached) SnapshotReader if a recent snapshot exists, otherwise None."""
+    reader = _readers.get(path)
+    if reader is None or time.time() * 1000 - reader.updated_at > max_age * 1000:
+        # Missing or stale: the collector may have restarted and swapped in a new file
+        try:
+            reader = _readers[path] = SnapshotReader(path, max_age)
+        except (FileNotFoundError, ValueError):
+            _readers.pop(path, None)
+            return None
+        if time.time() * 1000 - reader.updated_at > max_age * 1000:
+            return None
+    reader.max_age = max_age
+    return reader
+
+
+_states = {}  # file -> (mtime_ns, document)
+
+
+def publish_state(name, document, path=SNAPSHOT_PATH):
+    """Publish a small JSON document (FX table, arbitrage scan, ...) next to the snapshot for the workers."""
+    state_path = f'{path}.{name}.json'
+    tmp_path = f'{state_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(document, f)
+    os.replace(tmp_path, state_path)
+
+
+def read_state(name, path=SNAPSHOT_PATH):
+    """The document last published under `name`, or None; re-parsed only when the file changes."""
+    state_path = f'{path}.{name}.json'
+    try:
+        stamp = os.stat(state_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _states.get(state_path)
+    if cached is None or cached[0] != stamp:
+        try:
+            with open(state_path) as f:
+                cached = _states[state_path] = (stamp, json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+    return cached[1]
+
+
+def start_services():
+    """
+    Background jobs that call upstream APIs, run once in the collector instead of in every worker:
+    the coin index download, FX table refreshes, arbitrage scans, chart re-renders and the price
+    feed matching alerts.
+    Workers read the published results and reach the alert engine through serve_engine's socket.
+    """
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from modules import price_feed
+    from modules.alerts import AlertEngine, serve_engine
+    from modules.arbitrage import scanner_from_env
+    from modules.chart_renderer import ChartRenderer
+    from modules.coin_registry import coin_registry
+    from modules.fx import QuoteConverter
+
+    # Workers then read the cached /coins/list from disk instead of each downloading it
+    coin_registry.warm()
+    QuoteConverter().ensure_started()
+    alert_engine = AlertEngine(track=price_feed.track)
+    price_feed.subscribe(alert_engine.on_prices)
+    price_feed.ensure_started()
+    serve_engine(alert_engine)
+    ChartRenderer(workers=int(os.environ.get('MAICOIN_CHART_WORKERS', 2))).ensure_watching()
+    scanner = scanner_from_env()
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(lambda: publish_state('arbitrage', scanner.scan_once()), 'interval',
+                      seconds=scanner.interval, id='arbitrage_scan', max_instances=1, coalesce=True,
+                      next_run_time=datetime.now())
+    scheduler.start()
+
+
+def run_collector(coins=None, exchange_name='kraken', timeframe='1m', interval=60, path=SNAPSHOT_PATH):
+    """
+    Collector loop: one batched CoinGecko price call plus one OHLCV call per pair each interval,
+    published to the shared snapshot for all server workers, with the other upstream jobs running
+    alongside (start_services).
+    """
+    os.environ['MAICOIN_ROLE'] = 'collector'
+    writer = SnapshotWriter(coins, path=path)
+    start_services()
+    exchange = make_exchange(exchange_name)
+    while True:
+        data = get_prices([coin['id'] for coin in writer.coins])
+        prices = {coin_id: quote.get('usd') for coin_id, quote in data.items()}
+        candles = {coin['id']: fetch_data_with_retry(exchange, coin['pair'], timeframe, limit=writer.n_candles)
+                   for coin in writer.coins}
+        writer.write(prices, candles)
+        logging.info(f"Published snapshot version {int(writer.version[0]) // 2}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_collector()
@@ -0,0 +1,179 @@
+"""
+Local stand-in for the upstream APIs the app uses, for offline load testing.
+
+    python -m modules.standin_server --port 8001 --latency-ms 80 --error-rate 0.01 --rate-limit 50
+    COINGECKO_API_URL=http://localhost:8001/api/v3 \\
+    CRYPTOCOMPARE_API_URL=http://localhost:8001/data/v2 \\
+    EXCHANGE_API_URL=http://localhost:8001/exchange waitress-serve --port=5000 app:app
+"""
+import argparse
+import math
+import random
+import threading
+import time
+import zlib
+
+from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+
+settings = {
+    'latency_ms': 0.0,  # Added to every response
+    'jitter_ms': 0.0,  # Uniform random extra latency
+    'error_rate': 0.0,  # Fraction of requests answered with HTTP 500
+    'rate_limit': 0,  # Requests per second before answering 429 (0 = unlimited)
+}
+
+BASE_PRICES = {'bitcoin': 97000.0, 'ethereum': 3400.0, 'dogecoin': 0.32, 'btc': 97000.0, 'eth': 3400.0,
+               'doge': 0.32}
+FX_PER_USD = {'usd': 1.0, 'eur': 0.96, 'php': 58.5, 'gbp': 0.8, 'jpy': 157.0}
+TIMEFRAME_SECONDS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '4h': 14400, '1d': 86400}
+
+_window_start = time.monotonic()
+_window_count = 0
+_window_lock = threading.Lock()
+
+
+def synthetic_price(coin, timestamp):
+    """Deterministic price for a coin at a unix time, so repeated calls agree with each other."""
+    base = BASE_PRICES.get(coin.lower(), 1.0 + zlib.crc32(coin.lower().encode()) % 1000)
+    phase = zlib.crc32(coin.encode()) % 1000
+    return base * (1 + 0.03 * math.sin((timestamp + phase) / 86400 * 2 * math.pi)
+                   + 0.01 * math.sin((timestamp + phase) / 3600 * 2 * math.pi)
+                   + 0.002 * math.sin((timestamp + phase) / 300 * 2 * math.pi))
+
+
+def synthetic_candles(coin, step, end, count):
+    """`count` OHLCV candles of `step` seconds ending at `end`: (time, open, high, low, close, volume)."""
+    end -= end % step
+    candles = []
+    for t in range(end - (count - 1) * step, end + 1, step):
+        open_, close = synthetic_price(coin, t), synthetic_price(coin, t + step)
+        candles.append((t, open_, max(open_, close) * 1.001, min(open_, close) * 0.999, close,
+                        100 + zlib.crc32(f'{coin}{t}'.encode()) % 900))
+    return candles
+
+
+@app.before_request
+def simulate_conditions():
+    global _window_start, _window_count
+    if settings['rate_limit']:
+        with _window_lock:
+            now = time.monotonic()
+            if now - _window_start >= 1:
+                _window_start, _window_count = now, 0
+            _window_count += 1
+            limited = _window_count > settings['rate_limit']
+        if limited:
+            return jsonify({'status': {'error_code': 429, 'error_message': 'rate limited'}}), 429
+
+    delay = settings['latency_ms'] + random.uniform(0, settings['jitter_ms'])
+    if delay:
+        time.sleep(delay / 1000)
+    if random.random() < settings['error_rate']:
+        return jsonify({'error': 'simulated upstream failure'}), 500
+
+
+@app.route('/api/v3/simple/price')
+def simple_price():
+    now = time.time()
+    currencies = request.args.get('vs_currencies', 'usd').lower().split(',')
+    return jsonify({coin: {currency: synthetic_price(coin, now) * FX_PER_USD[currency]
+                           for currency in currencies if currency in FX_PER_USD}
+                    for coin in request.args.get('ids', '').split(',') if coin})
+
+
+@app.route('/api/v3/coins/list')
+def coins_list():
+    return jsonify([{'id': coin, 'symbol': symbol, 'name': coin.capitalize()}
+                    for coin, symbol in (('bitcoin', 'btc'), ('ethereum', 'eth'), ('dogecoin', 'doge'))])
+
+
+@app.route('/api/v3/coins/markets')
+def coins_markets():
+    now = time.time()
+    return jsonify([{'id': coin, 'symbol': symbol, 'market_cap_rank': rank, 'current_price': synthetic_price(coin, now)}
+                    for rank, (coin, symbol) in enumerate((('bitcoin', 'btc'), ('ethereum', 'eth'),
+                                                           ('dogecoin', 'doge')), 1)])
+
+
+@app.route('/api/v3/exchange_rates')
+def exchange_rates():
+    btc_usd = synthetic_price('bitcoin', time.time())
+    rates = {'btc': {'name': 'Bitcoin', 'unit': 'BTC', 'value': 1.0, 'type': 'crypto'}}
+    for currency, per_usd in FX_PER_USD.items():
+        rates[currency] = {'name': currency.upper(), 'unit': currency, 'value': btc_usd * per_usd, 'type': 'fiat'}
+    return jsonify({'rates': rates})
+
+
+@app.route('/api/v3/coins/<coin_id>/market_chart/range')
+def market_chart_range(coin_id):
+    start = request.args.get('from', type=int)
+    end = request.args.get('to', type=int)
+    if start is None or end is None:
+        return jsonify({'error': 'from and to are required'}), 400
+    per_usd = FX_PER_USD.get(request.args.get('vs_currency', 'usd').lower(), 1.0)
+    # CoinGecko granularity: 5-minutely up to 1 day, hourly up to 90 days, daily beyond
+    span = end - start
+    step = 300 if span <= 86400 else 3600 if span <= 90 * 86400 else 86400
+    points = [[t * 1000, synthetic_price(coin_id, t) * per_usd] for t in range(start - start % step + step, end, step)]
+    volumes = [[t, 1e6] for t, _ in points]
+    return jsonify({'prices': points, 'market_caps': volumes, 'total_volumes': volumes})
+
+
+@app.route('/data/v2/<endpoint>')
+def cryptocompare_history(endpoint):
+    step = {'histoday': 86400, 'histohour': 3600, 'histominute': 60}.get(endpoint)
+    if step is None:
+        return jsonify({'Response': 'Error', 'Message': f'Unknown endpoint {endpoint}'}), 404
+    limit = min(request.args.get('limit', 30, type=int), 2000)
+    to_ts = request.args.get('toTs', int(time.time()), type=int)
+    coin = request.args.get('fsym', 'BTC')
+    candles = synthetic_candles(coin, step, to_ts, limit + 1)
+    data = [{'time': t, 'open': o, 'high': h, 'low': l, 'close': c, 'volumefrom': v, 'volumeto': v * c}
+            for t, o, h, l, c, v in candles]
+    return jsonify({'Response': 'Success', 'Data': {'TimeFrom': data[0]['time'], 'TimeTo': data[-1]['time'],
+                                                    'Data': data}})
+
+
+@app.route('/exchange/<exchange_name>/ohlcv')
+def ohlcv(exchange_name):
+    # Same shape as ccxt's fetch_ohlcv: [[timestamp_ms, open, high, low, close, volume], ...]
+    step = TIMEFRAME_SECONDS.get(request.args.get('timeframe', '1m'))
+    if step is None:
+        return jsonify({'error': 'unsupported timeframe'}), 400
+    limit = min(request.args.get('limit', 100, type=int), 720)
+    since = request.args.get('since', type=int)
+    coin = request.args.get('symbol', 'BTC/USD').split('/')[0]
+    end = int(time.time()) if since is None else min(since // 1000 + (limit - 1) * step, int(time.time()))
+    candles = synthetic_candles(coin, step, end, limit)
+    return jsonify([[t * 1000, o, h, l, c, v] for t, o, h, l, c, v in candles
+                    if since is None or t * 1000 >= since])
+
+
+@app.route('/exchange/<exchange_name>/tickers')
+def tickers(exchange_name):
+    # ccxt fetch_tickers shape, with a small per-exchange price offset so venues disagree
+    now = time.time()
+    bias = 1 + ((zlib.crc32(exchange_name.encode()) % 61) - 30) / 10000
+    result = {}
+    for symbol in request.args.get('symbols', 'BTC/USD').split(','):
+        mid = synthetic_price(symbol.split('/')[0], now) * bias
+        result[symbol] = {'symbol': symbol, 'timestamp': int(now * 1000), 'bid': mid * 0.9998, 'ask': mid * 1.0002,
+                          'last': mid, 'baseVolume': 1000.0}
+    return jsonify(result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for CoinGecko, CryptoCompare and exchange OHLCV.")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0, help="Requests per second before 429s (0 = off)")
+    args = parser.parse_args()
+    settings.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                    rate_limit=args.rate_limit)
+
+    from waitress import serve
+    serve(app, port=args.port, threads=32)
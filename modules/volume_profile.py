@@ -0,0 +1,265 @@
+"""
+Volume profiles (volume traded per price level) over stored candles. Each candle's volume is spread
+evenly over the price buckets between its low and high with two np.bincount calls on a difference
+array. Histograms are kept per UTC day on a fixed bucket grid, so a profile over months is a bincount
+merge of cached day histograms, and a refresh only reads the rows appended since the last one and
+re-bins the days they touch.
+
+    python -m modules.volume_profile BTC/USDT --timeframe 1m --days 30 --bins 50
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from modules.candle_store import DATA_DIR, load_appended_candles, load_candles, store_version
+
+PROFILE_DIR = os.environ.get('MAICOIN_PROFILE_DIR', os.path.join(DATA_DIR, 'profiles'))
+DAY_MS = 86_400_000
+VALUE_AREA = 0.7  # Share of volume inside the value area
+MAX_CANDLE_BUCKETS = 10_000  # Candles wider than this (bad ticks) count at their close only
+RECENT_COLUMNS = ['timestamp', 'low', 'high', 'volume', 'close']  # Kept for the newest day, to re-bin it
+
+
+def bin_volume(low, high, volume, close, step):
+    """
+    Histogram of volume over buckets of width `step`, each candle's volume spread evenly from its low
+    to its high bucket. Returns (first bucket index, volume per bucket).
+    """
+    low, high, volume, close = (np.asarray(a, dtype=np.float64) for a in (low, high, volume, close))
+    valid = np.isfinite(low) & np.isfinite(high) & np.isfinite(volume) & (volume > 0)
+    low, high, volume, close = low[valid], high[valid], volume[valid], close[valid]
+    if not len(volume):
+        return 0, np.zeros(0)
+    lo = np.floor(low / step).astype(np.int64)
+    hi = np.floor(high / step).astype(np.int64)
+    bad = (hi < lo) | (hi - lo > MAX_CANDLE_BUCKETS)
+    lo[bad] = hi[bad] = np.floor(close[bad] / step).astype(np.int64)
+    first = int(lo.min())
+    size = int(hi.max()) - first + 1
+    # Difference array: +w at the low bucket, -w after the high bucket; the running sum spreads it
+    per_bucket = volume / (hi - lo + 1)
+    diff = (np.bincount(lo - first, per_bucket, minlength=size + 1)
+            - np.bincount(hi - first + 1, per_bucket, minlength=size + 1))
+    return first, np.maximum(np.cumsum(diff[:size]), 0.0)
+
+
+def merge_histograms(parts):
+    """Sum [(first bucket, counts), ...] on a shared bucket grid into one (first, counts)."""
+    parts = [(first, counts) for first, counts in parts if len(counts)]
+    if not parts:
+        return 0, np.zeros(0)
+    base = min(first for first, _ in parts)
+    positions = np.concatenate([np.arange(len(counts)) + (first - base) for first, counts in parts])
+    return base, np.bincount(positions, np.concatenate([counts for _, counts in parts]))
+
+
+def summarize(first, counts, step, bins=None, value_area=VALUE_AREA):
+    """
+    Profile summary: bucket lower edges and volumes (regrouped to at most `bins` buckets), the point
+    of control (price bucket with the most volume) and the value area, i.e. the price range spanned
+    by the highest-volume buckets that together hold `value_area` of the total volume.
+    """
+    if bins and len(counts) > bins:
+        # Regroup whole fine buckets so edges stay on the fine grid
+        factor = -(-len(counts) // bins)
+        while (first % factor + len(counts) - 1) // factor >= bins:
+            factor += 1
+        offset = first % factor
+        counts = np.bincount((np.arange(len(counts)) + offset) // factor, counts)
+        first, step = (first - offset) // factor, step * factor
+    total = float(counts.sum())
+    if not total:
+        return None
+    prices = (first + np.arange(len(counts))) * step
+    poc = int(np.argmax(counts))
+    order = np.argsort(counts)[::-1]
+    inside = order[:int(np.searchsorted(np.cumsum(counts[order]), value_area * total)) + 1]
+    return {'prices': prices.tolist(), 'volumes': counts.tolist(), 'step': step, 'total_volume': total,
+            'poc': float(prices[poc] + step / 2),
+            'value_area_low': float(prices[inside.min()]), 'value_area_high': float(prices[inside.max()] + step)}
+
+
+def default_step(prices, buckets=2000):
+    """Power-of-ten bucket width giving roughly `buckets` levels between zero and the typical price."""
+    typical = float(np.nanmedian(prices))
+    return 10.0 ** np.floor(np.log10(typical / buckets)) if typical > 0 else 1.0
+
+
+def candle_profile(df, bins=50, value_area=VALUE_AREA):
+    """Profile of an in-memory OHLCV DataFrame (e.g. the candles on a chart), split into `bins` levels."""
+    if not len(df):
+        return None
+    span = float(df['high'].max() - df['low'].min())
+    step = span / bins if span > 0 else max(float(df['close'].iloc[-1]) * 1e-4, 1e-12)
+    first, counts = bin_volume(df['low'], df['high'], df['volume'], df['close'], step)
+    return summarize(first, counts, step, value_area=value_area)
+
+
+class VolumeProfiles:
+    """Per-day histograms for each stored (symbol, timeframe), cached in memory and on disk."""
+
+    def __init__(self, data_dir=None, profile_dir=PROFILE_DIR):
+        self.data_dir = data_dir
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        # (symbol, timeframe) -> {'step', 'version', 'offset' (bytes of the store read so far),
+        # 'recent' (the newest day's candles), 'days': {day: (first, counts, signature)}}
+        self._series = {}
+
+    def _path(self, symbol, timeframe):
+        return os.path.join(self.profile_dir, f'{symbol.replace("/", "_")}_{timeframe}_profile.npz')
+
+    def _load(self, symbol, timeframe):
+        if not self.profile_dir or not os.path.exists(self._path(symbol, timeframe)):
+            return None
+        path = self._path(symbol, timeframe)
+        try:
+            with np.load(path) as cached:
+                splits = np.cumsum(cached['lengths'])[:-1]
+                days = {int(day): (int(first), counts, (int(n), float(v)))
+                        for day, first, counts, n, v in zip(cached['days'], cached['firsts'],
+                                                            np.split(cached['counts'], splits),
+                                                            cached['candles'], cached['volumes'])}
+                offset = int(cached['offset']) if 'offset' in cached.files and cached['offset'] >= 0 else None
+                recent = cached['recent'] if 'recent' in cached.files else np.zeros((0, len(RECENT_COLUMNS)))
+                return {'step': float(cached['step']), 'version': tuple(cached['version'].tolist()), 'days': days,
+                        'offset': offset, 'recent': recent}
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable profile cache {path}: {e}")
+            return None
+
+    def _save(self, symbol, timeframe, series):
+        if not self.profile_dir:
+            return
+        days = sorted(series['days'])
+        entries = [series['days'][day] for day in days]
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = self._path(symbol, timeframe)
+        tmp_path = f'{path}.tmp.npz'
+        np.savez(tmp_path, step=series['step'], version=np.array(series['version'], dtype=np.int64),
+                 days=np.array(days, dtype=np.int64),
+                 firsts=np.array([first for first, _, _ in entries], dtype=np.int64),
+                 lengths=np.array([len(counts) for _, counts, _ in entries], dtype=np.int64),
+                 counts=np.concatenate([counts for _, counts, _ in entries]) if entries else np.zeros(0),
+                 candles=np.array([sig[0] for _, _, sig in entries], dtype=np.int64),
+                 volumes=np.array([sig[1] for _, _, sig in entries], dtype=np.float64),
+                 offset=-1 if series['offset'] is None else series['offset'], recent=series['recent'])
+        os.replace(tmp_path, path)
+
+    def refresh(self, symbol, timeframe='1m'):
+        """
+        Bring the day histograms up to date with the store; returns the number of days re-binned.
+        Only rows appended since the last refresh are read, unless they reach back before the newest
+        cached day (e.g. a backfill) or the file was replaced, which re-reads it in full.
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            version = store_version(symbol, timeframe, self.data_dir)
+            if version is None:
+                return 0
+            series = self._series.get(key) or self._load(symbol, timeframe)
+            if series is not None and series['version'] == version:
+                self._series[key] = series
+                return 0
+
+            appended = None
+            if series is not None and series['offset'] is not None and series['days']:
+                appended, offset = load_appended_candles(symbol, timeframe, series['offset'], self.data_dir)
+                if appended is not None and len(appended) and appended['timestamp'].min() // DAY_MS < max(series['days']):
+                    appended = None
+            if appended is None:
+                offset = version[0]  # Taken before the read: rows appended meanwhile are read again next time
+                rows = load_candles(symbol, timeframe, data_dir=self.data_dir)[RECENT_COLUMNS].to_numpy(np.float64)
+                if series is None:
+                    series = {'step': default_step(rows[:, 4]) if len(rows) else 1.0, 'days': {}}
+            else:
+                # The newest cached day plus everything appended: only those days are re-binned
+                rows = np.concatenate([series['recent'], appended[RECENT_COLUMNS].to_numpy(np.float64)])
+                rows = rows[::-1][np.unique(rows[::-1, 0], return_index=True)[1]]  # Sorted, latest row per time
+            rebinned = self._bin_days(series, rows, replace=appended is None)
+            series.update(version=version, offset=offset)
+            self._series[key] = series
+            self._save(symbol, timeframe, series)
+            return rebinned
+
+    def _bin_days(self, series, rows, replace):
+        """
+        Re-bin the days covered by sorted, de-duplicated RECENT_COLUMNS rows into series['days'];
+        with replace=True the rows are the whole store and days missing from them are dropped.
+        """
+        day_of = rows[:, 0].astype(np.int64) // DAY_MS
+        days, starts, candles = np.unique(day_of, return_index=True, return_counts=True)
+        volumes = np.add.reduceat(rows[:, 3], starts) if len(starts) else np.zeros(0)
+
+        # A day is re-binned only when its candle count or volume differs from the cached histogram
+        cached = series['days']
+        fresh = {} if replace else cached
+        rebinned = 0
+        for day, start, n, v in zip(days.tolist(), starts.tolist(), candles.tolist(), volumes.tolist()):
+            entry = cached.get(day)
+            if entry is not None and entry[2][0] == n and np.isclose(entry[2][1], v):
+                fresh[day] = entry
+                continue
+            day_rows = rows[start:start + n]
+            fresh[day] = bin_volume(day_rows[:, 1], day_rows[:, 2], day_rows[:, 3], day_rows[:, 4],
+                                     series['step']) + ((n, v),)
+            rebinned += 1
+        series['days'] = fresh
+        if len(days):
+            series['recent'] = rows[starts[-1]:]
+        else:
+            series.setdefault('recent', np.zeros((0, len(RECENT_COLUMNS))))
+        return rebinned
+
+    def profile(self, symbol, timeframe='1m', start=None, end=None, days=None, bins=100, value_area=VALUE_AREA):
+        """
+        Volume profile over whole UTC days from `start` to `end` (ms, inclusive, default all stored
+        days) or over the trailing `days` up to the newest stored day, merged from the cached day
+        histograms. Returns None when nothing is stored in range.
+        """
+        self.refresh(symbol, timeframe)
+        series = self._series.get((symbol, timeframe))
+        if series is None or not series['days']:
+            return None
+        if days:
+            start = (max(series['days']) - days + 1) * DAY_MS
+        first_day = -np.inf if start is None else start // DAY_MS
+        last_day = np.inf if end is None else end // DAY_MS
+        selected = [day for day in series['days'] if first_day <= day <= last_day]
+        first, counts = merge_histograms([series['days'][day][:2] for day in selected])
+        result = summarize(first, counts, series['step'], bins, value_area)
+        if result is not None:
+            result.update(symbol=symbol, timeframe=timeframe, days=len(selected),
+                          start=min(selected) * DAY_MS, end=(max(selected) + 1) * DAY_MS - 1)
+        return result
+
+
+volume_profiles = VolumeProfiles()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the volume profile of stored candles.")
+    parser.add_argument('symbol')
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--days', type=int, default=None, help="Trailing stored days to include (default: all)")
+    parser.add_argument('--bins', type=int, default=40)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rebinned = volume_profiles.refresh(args.symbol, args.timeframe)
+    print(f"refresh: {rebinned} day(s) re-binned in {(time.perf_counter() - started) * 1000:.1f} ms")
+    started = time.perf_counter()
+    result = volume_profiles.profile(args.symbol, args.timeframe, days=args.days, bins=args.bins)
+    print(f"profile: merged in {(time.perf_counter() - started) * 1000:.1f} ms")
+    if result is None:
+        print("No stored candles in range.")
+    else:
+        peak = max(result['volumes'])
+        for price, volume in zip(result['prices'], result['volumes']):
+            print(f"{price:>14.6g} {volume:>16.2f} {'#' * int(40 * volume / peak)}")
+        print(f"POC {result['poc']:.6g}, value area {result['value_area_low']:.6g} - {result['value_area_high']:.6g}, "
+              f"{result['days']} day(s)")
@@ -0,0 +1,47 @@
+from modules.alerts import AlertEngine, connect_engine, serve_engine
+
+
+def test_removed_and_fired_alerts_are_compacted_out_of_their_books():
+    engine = AlertEngine()
+    engine.on_prices({'bitcoin': 100.0}, 0)
+    ids = [engine.add_threshold('bitcoin', 200 + i, 'above') for i in range(10)]
+    move = engine.add_percent_move('bitcoin', 5)
+    engine.on_prices({'bitcoin': 99.0}, 1)  # A move each way merges the pending entries of both books
+    engine.on_prices({'bitcoin': 100.0}, 1)
+    for alert_id in ids[:6]:
+        engine.remove(alert_id)
+
+    # One leg of the percent move fires; its other leg must not linger in the 'below' book
+    events = engine.on_prices({'bitcoin': 106.0}, 2)
+    assert [event['id'] for event in events] == [move]
+    above, below = engine._books[('bitcoin', 'above')], engine._books[('bitcoin', 'below')]
+    assert below._inactive == 1
+    engine.on_prices({'bitcoin': 105.0}, 3)
+    assert len(below.ids) == 0
+
+    # The six removed entries outnumbered the live ones, so the match at 106 compacted them away
+    assert sorted(above.ids.tolist()) == ids[6:] + [move]
+    assert sorted(above.ids[above.active].tolist()) == ids[6:]
+    fired = engine.on_prices({'bitcoin': 300.0}, 5)
+    assert sorted(event['id'] for event in fired) == ids[6:]
+
+
+def test_removing_a_pending_alert():
+    engine = AlertEngine()
+    alert_id = engine.add_threshold('bitcoin', 150, 'above')
+    engine.remove(alert_id)
+    engine.on_prices({'bitcoin': 100.0}, 0)
+    assert engine.on_prices({'bitcoin': 200.0}, 1) == []
+    assert len(engine._books[('bitcoin', 'above')].ids) == 0
+
+
+def test_workers_share_the_collector_engine(tmp_path):
+    address = str(tmp_path / 'alerts.sock')
+    engine = AlertEngine()
+    serve_engine(engine, address)
+    first, second = connect_engine(address), connect_engine(address)
+    alert_id = first.add_threshold('dogecoin', 0.4, 'above')
+    assert engine.alerts[alert_id]['symbol'] == 'dogecoin'
+    engine.on_prices({'dogecoin': 0.3}, 0)
+    engine.on_prices({'dogecoin': 0.5}, 1)
+    assert [event['id'] for event in second.drain()] == [alert_id]
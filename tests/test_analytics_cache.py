@@ -0,0 +1,59 @@
+import numpy as np
+
+from modules.analytics_cache import AnalyticsCache
+from modules.crypto_analysis import analyze_best_trading_opportunities
+
+MINUTE = 60_000
+
+
+def _running_max_sum(cache, times, values, calls):
+    """Max and sum of `values`, with every extend call recorded as (start, stop)."""
+    def extend(state, start, stop):
+        calls.append((start, stop))
+        chunk = values[start:stop]
+        return {'max': max(state['max'], float(chunk.max())), 'sum': state['sum'] + float(chunk.sum())}
+
+    def merge(left, right):
+        return {'max': max(left['max'], right['max']), 'sum': left['sum'] + right['sum']}
+
+    return cache.compute('max_sum', 'coin', times, (), lambda: {'max': float('-inf'), 'sum': 0.0}, extend,
+                         lambda state: state, merge)
+
+
+def test_slid_window_is_incremental():
+    rng = np.random.default_rng(1)
+    times = np.arange(0, 3 * 24 * 60) * 5 * MINUTE  # 5-minute points over 15 days
+    values = rng.normal(size=len(times))
+    cache = AnalyticsCache()
+    window = 48 * 12  # "Last 48 hours"
+
+    calls = []
+    _running_max_sum(cache, times[:window], values[:window], calls)
+    assert cache.misses == 1
+
+    # Slide the window forward by 7 points (35 minutes)
+    calls.clear()
+    lo, hi = 7, window + 7
+    result = _running_max_sum(cache, times[lo:hi], values[lo:hi], calls)
+    assert cache.incremental == 1 and cache.misses == 1
+    assert result['max'] == values[lo:hi].max()
+    assert np.isclose(result['sum'], values[lo:hi].sum())
+    # Only the hour cut by the new start and the new points were folded in, not the whole window
+    assert sum(stop - start for start, stop in calls) < 12 + 7 + 1
+
+    calls.clear()
+    assert _running_max_sum(cache, times[lo:hi], values[lo:hi], calls) == result
+    assert calls == [] and cache.hits == 1
+
+
+def test_hourly_analysis_matches_uncached_on_slid_windows():
+    rng = np.random.default_rng(2)
+    times = 1_700_000_000_000 + np.arange(0, 4000) * 5 * MINUTE
+    prices = np.column_stack([times, 100 + rng.normal(size=len(times)).cumsum()])
+    for lo in range(0, 200, 37):
+        data = {'prices': prices[lo:lo + 576].tolist()}
+        cached = analyze_best_trading_opportunities(data, series_id='test-coin')
+        fresh = analyze_best_trading_opportunities(data)
+        assert cached['best_buy_hour'] == fresh['best_buy_hour']
+        assert cached['best_sell_hour'] == fresh['best_sell_hour']
+        assert np.allclose(list(cached['hourly_avg_prices'].values()), list(fresh['hourly_avg_prices'].values()))
@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from modules import backfill as backfill_module
+from modules.backfill import backfill, plan_ccxt_pages, plan_cryptocompare_pages
+from modules.candle_store import candle_file, load_candles
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_cryptocompare_pages_do_not_depend_on_end():
+    start = int(_utc(2025, 1, 1).timestamp())
+    end = int(_utc(2025, 1, 10).timestamp())
+    first = plan_cryptocompare_pages(start, end, '1m', limit=99)
+    later = plan_cryptocompare_pages(start, end + 37 * 60 + 13, '1m', limit=99)
+    assert set(first) <= set(later)
+    assert first == sorted(first, reverse=True)
+
+
+def test_cryptocompare_pages_cover_range_without_overlap():
+    start, end, step, limit = 1_000_000, 1_500_000, 60, 49
+    pages = plan_cryptocompare_pages(start, end, '1m', limit)
+    covered = sorted(t for anchor in pages for t in range(anchor - limit * step, anchor + 1, step))
+    assert len(covered) == len(set(covered))
+    assert covered[0] <= start - start % step and covered[-1] >= end - end % step
+    assert np.all(np.diff(covered) == step)
+
+
+def test_ccxt_pages_on_fixed_grid():
+    span = 60_000 * 100
+    pages = plan_ccxt_pages(1_234_567, 9_876_543_210, '1m', 100)
+    assert all(anchor % span == 0 for anchor in pages)
+    assert pages[0] <= 1_234_567 and pages[-1] + span > 9_876_543_210
+    assert plan_ccxt_pages(1_234_567, 9_876_543_210 + 5_000, '1m', 100)[:len(pages)] == pages
+
+
+@pytest.fixture
+def fake_cryptocompare(monkeypatch):
+    calls = []
+
+    def fetch_page(fsym, tsym, timeframe, to_ts, limit, limiter=None):
+        calls.append(to_ts)
+        times = np.arange(to_ts - limit * 60, to_ts + 1, 60, dtype=np.float64) * 1000
+        return np.column_stack([times, times, times + 1, times - 1, times, np.ones(len(times))])
+
+    monkeypatch.setattr(backfill_module, 'fetch_cryptocompare_page', fetch_page)
+    return calls
+
+
+def test_resume_with_later_end_fetches_only_new_pages(tmp_path, fake_cryptocompare):
+    start = _utc(2025, 1, 1)
+    written = backfill('DOGE', '1m', start, _utc(2025, 1, 1, 12, 7), limit=99, workers=2, data_dir=str(tmp_path))
+    first_calls = len(fake_cryptocompare)
+    assert written == 12 * 60 + 8
+
+    fake_cryptocompare.clear()
+    written = backfill('DOGE', '1m', start, _utc(2025, 1, 1, 12, 30), limit=99, workers=2, data_dir=str(tmp_path))
+    # Only the page cut short by the first `end`, and pages after it, are fetched
+    first_end = int(_utc(2025, 1, 1, 12, 7).timestamp())
+    assert 0 < len(fake_cryptocompare) < first_calls
+    assert all(anchor > first_end for anchor in fake_cryptocompare)
+    assert min(anchor - 99 * 60 for anchor in fake_cryptocompare) <= first_end
+
+    fake_cryptocompare.clear()
+    assert backfill('DOGE', '1m', start, _utc(2025, 1, 1, 12, 30), limit=99, data_dir=str(tmp_path)) == 0
+    assert fake_cryptocompare == []
+
+    df = load_candles('DOGE/USD', '1m', data_dir=str(tmp_path))
+    assert len(df) == 12 * 60 + 31
+    assert (np.diff(df['timestamp']) == 60_000).all()
+    with open(candle_file('DOGE/USD', '1m', str(tmp_path))) as f:
+        stored_rows = sum(1 for _ in f) - 1
+    # Rows of the re-fetched partial page are appended again, nothing else
+    assert stored_rows <= len(df) + 100
+
+
+def test_short_pages_are_fetched_again_and_checkpoint_stays_compact(tmp_path, monkeypatch):
+    calls = []
+    listed = int(_utc(2025, 1, 1, 3).timestamp())  # Nothing before this time comes back
+
+    def fetch_page(fsym, tsym, timeframe, to_ts, limit, limiter=None):
+        calls.append(to_ts)
+        times = np.arange(max(to_ts - limit * 60, listed), to_ts + 1, 60, dtype=np.float64) * 1000
+        return np.column_stack([times, times, times + 1, times - 1, times, np.ones(len(times))])
+
+    monkeypatch.setattr(backfill_module, 'fetch_cryptocompare_page', fetch_page)
+    start, end = _utc(2025, 1, 1), _utc(2025, 1, 1, 6)
+    backfill('DOGE', '1m', start, end, limit=99, workers=2, data_dir=str(tmp_path))
+    path = candle_file('DOGE/USD', '1m', str(tmp_path)) + '.checkpoint.json'
+    # Every page that returned candles merges into one range, starting at the first real candle
+    assert backfill_module._load_checkpoint(path) == [(listed * 1000, int(end.timestamp()) * 1000)]
+
+    first_calls = len(calls)
+    calls.clear()
+    backfill('DOGE', '1m', start, end, limit=99, workers=2, data_dir=str(tmp_path))
+    # Empty pages and the page cut short by the listing are asked for again, nothing else
+    assert 0 < len(calls) < first_calls
+    assert all(anchor - 99 * 60 < listed for anchor in calls)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from modules.candle_store import append_candles, latest_timestamp, load_candles
+
+MINUTE = 60_000
+
+
+def _rows(start, count, price):
+    return np.column_stack([start + np.arange(count) * MINUTE, np.full((count, 4), float(price)), np.ones(count)])
+
+
+def test_load_from_start_matches_a_full_read(tmp_path):
+    data_dir = str(tmp_path)
+    append_candles('BTC/USDT', '1m', _rows(100 * MINUTE, 400, 1), data_dir)
+    append_candles('BTC/USDT', '1m', _rows(490 * MINUTE, 30, 2), data_dir)  # Overlaps the end
+    append_candles('BTC/USDT', '1m', _rows(0, 50, 3), data_dir)  # Backfill
+    append_candles('BTC/USDT', '1m', _rows(520 * MINUTE, 10, 4), data_dir)
+    assert latest_timestamp('BTC/USDT', '1m', data_dir) == 529 * MINUTE
+
+    full = load_candles('BTC/USDT', '1m', data_dir=data_dir)
+    for start in [0, 30 * MINUTE, 300 * MINUTE, 495 * MINUTE, 529 * MINUTE, 600 * MINUTE]:
+        tail = load_candles('BTC/USDT', '1m', start=start, data_dir=data_dir)
+        expected = full[full['timestamp'] >= start]
+        assert tail['timestamp'].tolist() == expected['timestamp'].tolist()
+        assert tail['close'].tolist() == expected['close'].tolist()
@@ -0,0 +1,24 @@
+import time
+
+from modules import coin_registry as registry_module
+from modules.coin_registry import CoinRegistry, FAILED_INDEX_TTL
+
+
+def test_failed_build_is_retried_after_short_ttl(tmp_path, monkeypatch):
+    responses = [None, [{'id': 'shiba-inu', 'symbol': 'shib', 'name': 'Shiba Inu'}]]
+    monkeypatch.setattr(registry_module, 'get_json_with_retry', lambda *args, **kwargs: responses.pop(0))
+    registry = CoinRegistry(config_path=str(tmp_path / 'coins.json'), cache_path=str(tmp_path / 'coins_list.json'))
+
+    assert registry.resolve('shib') is None
+    coins, aliases, expires = registry._index
+    assert expires <= time.time() + FAILED_INDEX_TTL
+
+    # Once expired, the stale index still answers while a rebuild runs in the background
+    registry._index = (coins, aliases, time.time() - 1)
+    assert registry.resolve('shib') is None
+    for _ in range(100):
+        if registry._index[2] > time.time():
+            break
+        time.sleep(0.01)
+    assert registry.resolve('shib')['id'] == 'shiba-inu'
+    assert registry._index[2] > time.time() + FAILED_INDEX_TTL
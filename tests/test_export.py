@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from modules import export
+from modules.candle_store import append_candles, candle_file, read_order
+from modules.export import iter_candle_chunks
+
+MINUTE = 60_000
+
+
+def _rows(start, count, price):
+    times = start + np.arange(count) * MINUTE
+    return np.column_stack([times, np.full((count, 4), float(price)), np.ones(count)])
+
+
+def _export(path, **kwargs):
+    return pd.concat(list(iter_candle_chunks(path, chunksize=100, **kwargs)), ignore_index=True)
+
+
+def test_ordered_store_streams_without_spilling(tmp_path, monkeypatch):
+    data_dir = str(tmp_path)
+    for i in range(5):
+        append_candles('BTC/USDT', '1m', _rows(i * 300 * MINUTE, 300, i), data_dir)
+    path = candle_file('BTC/USDT', '1m', data_dir)
+    assert read_order(path)['ordered_rows'] == 1500
+
+    def no_spill(*args):
+        raise AssertionError("ordered rows must not be spilled")
+
+    monkeypatch.setattr(export, '_merged_chunks', no_spill)
+    chunks = iter_candle_chunks(path, chunksize=100)
+    assert len(next(chunks)) == 100  # Available before the rest of the file is read
+    result = _export(path, start=200 * MINUTE, end=999 * MINUTE)
+    assert result['timestamp'].tolist() == list(range(200 * MINUTE, 1000 * MINUTE, MINUTE))
+
+
+def test_out_of_order_rows_are_merged_and_deduplicated(tmp_path):
+    data_dir = str(tmp_path)
+    append_candles('BTC/USDT', '1m', _rows(1000 * MINUTE, 500, 1), data_dir)
+    append_candles('BTC/USDT', '1m', _rows(1490 * MINUTE, 20, 2), data_dir)  # Overlapping fetch window
+    append_candles('BTC/USDT', '1m', _rows(0, 600, 3), data_dir)  # Backfill after live data
+    path = candle_file('BTC/USDT', '1m', data_dir)
+    order = read_order(path)
+    assert (order['ordered_rows'], order['tail_min']) == (500, 0)
+
+    result = _export(path)
+    expected = list(range(0, 600 * MINUTE, MINUTE)) + list(range(1000 * MINUTE, 1510 * MINUTE, MINUTE))
+    assert result['timestamp'].tolist() == expected
+    closes = result.set_index('timestamp')['close']
+    assert closes[0] == 3 and closes[1000 * MINUTE] == 1
+    assert closes[1495 * MINUTE] == 2  # The later row of a duplicated minute wins
+
+
+def test_files_without_order_metadata_are_still_sorted(tmp_path):
+    path = str(tmp_path / 'legacy.csv')
+    rows = pd.DataFrame(_rows(0, 300, 1)[::-1], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    rows.assign(date='').to_csv(path, index=False)
+    assert read_order(path) is None
+    assert _export(path)['timestamp'].tolist() == list(range(0, 300 * MINUTE, MINUTE))
@@ -0,0 +1,19 @@
+from modules.orderbook import TradeTape
+
+
+def _trade(trade_id, timestamp, price, amount=1.0, side='buy'):
+    return {'id': trade_id, 'timestamp': timestamp, 'price': price, 'amount': amount, 'side': side}
+
+
+def test_resumed_tape_keeps_new_trades_in_last_saved_millisecond(tmp_path):
+    tape = TradeTape()
+    tape.add([_trade('1', 1000, 10.0), _trade('2', 2000, 11.0), _trade('3', 2000, 12.0, side='sell')])
+    tape.save(str(tmp_path), release=True)
+
+    for resumed in (tape, TradeTape.resume(str(tmp_path))):
+        # The next fetch starts at the last saved millisecond and repeats what was saved in it
+        added = resumed.add([_trade('2', 2000, 11.0), _trade('3', 2000, 12.0, side='sell'),
+                             _trade('4', 2000, 12.5), _trade('5', 3000, 13.0), _trade('0', 1500, 9.0)])
+        assert added == 2
+        assert resumed.time.values.tolist() == [2000, 3000]
+        assert resumed.price.values.tolist() == [12.5, 13.0]
@@ -0,0 +1,67 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.portfolio import Portfolio
+
+HOUR = 3_600_000
+
+
+def test_average_cost_holdings():
+    portfolio = Portfolio(path=None)
+    portfolio.add_lot('bitcoin', 2, 100, 1 * HOUR)
+    portfolio.add_lot('bitcoin', 2, 200, 2 * HOUR)
+    portfolio.add_lot('bitcoin', -1, 300, 3 * HOUR)
+    holding = portfolio.holdings()['bitcoin']
+    assert holding['quantity'] == 3
+    assert holding['cost_basis'] == pytest.approx(450)
+    assert holding['realized_pnl'] == pytest.approx(150)
+
+
+def test_history_clamps_oversells_like_holdings():
+    portfolio = Portfolio(path=None)
+    portfolio.add_lot('bitcoin', 1, 100, 0)
+    portfolio.add_lot('bitcoin', -5, 120, 2 * HOUR)  # Sells more than is held
+    portfolio.add_lot('bitcoin', 2, 110, 4 * HOUR)
+    grid = np.arange(6, dtype=np.int64) * HOUR
+    prices = np.full((6, 1), 130.0)
+
+    history = portfolio.history(grid, ['bitcoin'], prices)
+    assert portfolio.holdings()['bitcoin']['quantity'] == 2
+    assert history['value'][-1] == pytest.approx(2 * 130)
+    assert (history['value'] >= 0).all()
+    # Cash in: 100 for the first buy, 120 back for the one coin actually sold, then 220
+    assert history['invested'][-1] == pytest.approx(100 - 120 + 220)
+
+
+def test_instances_sharing_a_file_do_not_lose_lots(tmp_path):
+    path = str(tmp_path / 'lots.csv')
+    first, second = Portfolio(path), Portfolio(path)
+    ids = [first.add_lot('bitcoin', 1, 100), second.add_lot('ethereum', 1, 10), first.add_lot('dogecoin', 1, 1)]
+    assert len(set(ids)) == 3
+    assert second.symbols() == ['bitcoin', 'dogecoin', 'ethereum']
+    assert second.remove_lot(ids[0])
+    assert first.symbols() == ['dogecoin', 'ethereum']
+    assert sorted(pd.read_csv(path)['id']) == sorted(ids[1:])
+
+
+def _add_lots(path, symbol, count):
+    portfolio = Portfolio(path)
+    for _ in range(count):
+        portfolio.add_lot(symbol, 1, 1)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_workers_keep_every_lot(tmp_path):
+    path = str(tmp_path / 'lots.csv')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_add_lots, args=(path, f'coin{i}', 25)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    lots = pd.read_csv(path)
+    assert len(lots) == 100
+    assert lots['id'].is_unique
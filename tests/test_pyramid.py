@@ -0,0 +1,56 @@
+import numpy as np
+
+from modules.candle_store import append_candles
+from modules.pyramid import CandlePyramid
+
+MINUTE = 60_000
+DAY = 1440 * MINUTE
+
+
+def _candles(start, count, seed):
+    close = 100 + np.random.default_rng(seed).normal(size=count).cumsum()
+    return np.column_stack([start + np.arange(count) * MINUTE, close, close + 1, close - 1, close,
+                            np.ones(count)])
+
+
+def test_sync_fills_history_a_partial_pyramid_missed(tmp_path):
+    data_dir = str(tmp_path / 'candles')
+    old, recent, live = _candles(0, 3 * 1440, 1), _candles(3 * DAY, 1440, 2), _candles(4 * DAY, 60, 3)
+    append_candles('BTC/USDT', '1m', old, data_dir)
+    append_candles('BTC/USDT', '1m', recent, data_dir)
+    pyramid = CandlePyramid(str(tmp_path / 'pyramid'))
+    pyramid.update('BTC/USDT', recent)  # As a 1m backfill of the last day leaves it
+
+    assert pyramid.sync('BTC/USDT', data_dir) == len(old)
+    assert pyramid.extent('BTC/USDT') == (0, 4 * DAY - MINUTE)
+    assert pyramid.sync('BTC/USDT', data_dir) == 0
+
+    # Rows appended to the store later are rolled up without re-reading it
+    append_candles('BTC/USDT', '1m', live, data_dir)
+    assert pyramid.sync('BTC/USDT', data_dir) == len(live)
+
+    full = CandlePyramid(str(tmp_path / 'full'))
+    full.update('BTC/USDT', np.concatenate([old, recent, live]))
+    for level in ['1m', '1h', '1d']:
+        hi = (4 * DAY + 60 * MINUTE) // {'1m': MINUTE, '1h': 60 * MINUTE, '1d': DAY}[level]
+        # The store keeps prices as CSV text, so compare up to parsing round-off
+        assert np.allclose(pyramid._read('BTC/USDT', level, 0, hi), full._read('BTC/USDT', level, 0, hi),
+                           equal_nan=True)
+
+
+def test_first_sync_fills_gap_between_backfilled_windows(tmp_path):
+    data_dir = str(tmp_path / 'candles')
+    history = _candles(0, 4 * 1440, 4)
+    append_candles('BTC/USDT', '1m', history, data_dir)
+    pyramid = CandlePyramid(str(tmp_path / 'pyramid'))
+    # Two separate backfills: the first and the last day, leaving days 1-2 empty inside the extent
+    pyramid.update('BTC/USDT', history[:1440])
+    pyramid.update('BTC/USDT', history[3 * 1440:])
+
+    assert pyramid.sync('BTC/USDT', data_dir) == 2 * 1440
+    full = CandlePyramid(str(tmp_path / 'full'))
+    full.update('BTC/USDT', history)
+    for level, period in [('1m', MINUTE), ('1h', 60 * MINUTE), ('1d', DAY)]:
+        hi = 4 * DAY // period - 1
+        assert np.allclose(pyramid._read('BTC/USDT', level, 0, hi), full._read('BTC/USDT', level, 0, hi),
+                           equal_nan=True)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from modules.range_index import PriceRangeIndex, SparseTable
+
+
+def _best_trade(values):
+    best = (0.0, None, None)
+    for i in range(len(values)):
+        for j in range(i + 1, len(values)):
+            if values[j] - values[i] > best[0]:
+                best = (values[j] - values[i], i, j)
+    return best
+
+
+@pytest.mark.parametrize('initial', [0, 1, 6, 16, 17])
+def test_sparse_table_build_then_append_matches_brute_force(initial):
+    rng = np.random.default_rng(initial)
+    values = rng.integers(0, 20, 70).astype(float)  # Repeats exercise tie-breaking
+    table = SparseTable(values[:initial])
+    for value in values[initial:]:
+        table.append(value)
+    assert len(table) == len(values)
+    for lo in range(len(values)):
+        for hi in range(lo, len(values)):
+            assert values[table.argmin(lo, hi)] == values[lo:hi + 1].min()
+            assert values[table.argmax(lo, hi)] == values[lo:hi + 1].max()
+
+
+def test_price_range_index_build_then_append():
+    rng = np.random.default_rng(1)
+    prices = 100 + np.cumsum(rng.normal(0, 1, 60))
+    timestamps = 1_000 * np.arange(60)
+    index = PriceRangeIndex(np.column_stack([timestamps[:6], prices[:6]]))
+    for t, price in zip(timestamps[6:], prices[6:]):
+        index.append(t, price)
+    index.append(timestamps[10], 1e9)  # Out of order: ignored
+    assert len(index) == 60
+
+    for t1, t2 in [(None, None), (0, 5_000), (7_000, 7_000), (12_500, 48_000), (30_000, None)]:
+        window = [i for i, t in enumerate(timestamps) if (t1 is None or t >= t1) and (t2 is None or t <= t2)]
+        values = prices[window]
+        result = index.high_low(t1, t2)
+        assert result['low_price'] == values.min() and result['high_price'] == values.max()
+        profit, buy, sell = _best_trade(values)
+        trade = index.best_trade(t1, t2)
+        if buy is None:
+            assert trade is None
+        else:
+            assert trade['max_profit'] == pytest.approx(profit)
+            assert trade['best_buy_time'] < trade['best_sell_time']
+
+
+def test_empty_ranges():
+    index = PriceRangeIndex()
+    assert index.high_low() is None and index.best_trade() is None
+    index.append(5, 1.0)
+    assert index.high_low(6, 10) is None
+    assert index.best_trade() is None
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from modules import rolling_stats
+from modules.candle_store import append_candles
+from modules.rolling_stats import PrefixStats, get_prefix_stats, rolling_max_drawdown
+
+
+def _candles(n, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    timestamps = (start + np.arange(n)) * 60_000
+    return timestamps, closes, rng.uniform(0.5, 2, n)
+
+
+def test_window_matches_brute_force():
+    timestamps, closes, volumes = _candles(200)
+    stats = PrefixStats(timestamps, closes, volumes)
+    for lo, hi in [(0, 199), (10, 11), (37, 150), (199, 199)]:
+        result = stats.window(timestamps[lo], timestamps[hi])
+        c, v = closes[lo:hi + 1], volumes[lo:hi + 1]
+        returns = np.diff(np.log(c))
+        assert result['count'] == len(c)
+        assert result['mean_price'] == pytest.approx(c.mean())
+        assert result['vwap'] == pytest.approx((c * v).sum() / v.sum())
+        assert result['return'] == pytest.approx(c[-1] / c[0] - 1)
+        assert result['log_return'] == pytest.approx(returns.sum(), abs=1e-12)
+        if len(returns) > 1:
+            assert result['volatility'] == pytest.approx(returns.std(ddof=1))
+        else:
+            assert result['volatility'] is None
+    assert stats.window(10**12, None) is None
+
+
+def test_append_matches_build():
+    timestamps, closes, volumes = _candles(120)
+    built = PrefixStats(timestamps, closes, volumes)
+    grown = PrefixStats()
+    for t, c, v in zip(timestamps, closes, volumes):
+        grown.append(t, c, v)
+    grown.append(timestamps[5], 1.0, 1.0)  # Older: ignored
+    for t1, t2 in [(None, None), (timestamps[3], timestamps[90])]:
+        a, b = built.window(t1, t2), grown.window(t1, t2)
+        assert a.keys() == b.keys()
+        for key in a:
+            assert a[key] == pytest.approx(b[key])
+
+
+def _brute_drawdown(closes, window):
+    worst = 0.0
+    for j in range(len(closes)):
+        peak = closes[max(0, j - window + 1):j + 1].max()
+        worst = min(worst, closes[j] / peak - 1)
+    return worst
+
+
+@pytest.mark.parametrize('window', [1, 2, 7, 50, 500])
+def test_windowed_drawdown_matches_brute_force(window):
+    _, closes, _ = _candles(300, seed=window)
+    result = rolling_max_drawdown(closes, window)
+    assert len(result) == len(closes)
+    assert result.min() == pytest.approx(_brute_drawdown(closes, window))
+    assert (np.diff(result) <= 0).all()
+
+
+def test_drawdown_window_validated():
+    with pytest.raises(ValueError):
+        rolling_max_drawdown([1.0, 2.0], 0)
+    with pytest.raises(ValueError):
+        rolling_max_drawdown([1.0, 2.0], rolling_stats.MAX_DRAWDOWN_WINDOW + 1)
+
+
+def test_prefix_stats_extend_incrementally(tmp_path, monkeypatch):
+    data_dir = str(tmp_path)
+    timestamps, closes, volumes = _candles(100)
+    rows = np.column_stack([timestamps, closes, closes, closes, closes, volumes])
+    append_candles('BTC/USD', '1m', rows[:60], data_dir)
+    stats = get_prefix_stats('BTC/USD', '1m', data_dir)
+    assert len(stats) == 60
+
+    monkeypatch.setattr(rolling_stats, 'load_candles', lambda *a, **k: pytest.fail("full reload"))
+    append_candles('BTC/USD', '1m', rows[60:], data_dir)
+    assert get_prefix_stats('BTC/USD', '1m', data_dir) is stats
+    assert len(stats) == 100
+    assert stats.window()['vwap'] == pytest.approx((closes * volumes).sum() / volumes.sum())
+    monkeypatch.undo()
+
+    # Older rows (a backfill) force a rebuild that includes them
+    older = rows[:1].copy()
+    older[0, 0] = -60_000
+    append_candles('BTC/USD', '1m', older, data_dir)
+    rebuilt = get_prefix_stats('BTC/USD', '1m', data_dir)
+    assert rebuilt is not stats and len(rebuilt) == 101
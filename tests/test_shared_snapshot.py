@@ -0,0 +1,23 @@
+import numpy as np
+
+from modules.shared_snapshot import SnapshotReader, SnapshotWriter, publish_state, read_state
+
+
+def test_snapshot_holds_hundreds_of_coins(tmp_path):
+    path = str(tmp_path / 'snapshot')
+    coins = [{'id': f'coin-number-{i}', 'pair': f'C{i}/USDT'} for i in range(500)]
+    writer = SnapshotWriter(coins, n_candles=10, path=path)
+    writer.write({'coin-number-499': 1.5}, {'coin-number-3': [[1, 2, 3, 4, 5, 6]]})
+
+    reader = SnapshotReader(path)
+    assert reader.coins == coins
+    assert reader.price('coin-number-499') == 1.5
+    assert reader.price('coin-number-0') is None
+    assert np.array_equal(reader.candles('C3/USDT'), [[1, 2, 3, 4, 5, 6]])
+
+
+def test_published_state_round_trips(tmp_path):
+    path = str(tmp_path / 'snapshot')
+    assert read_state('fx_rates', path) is None
+    publish_state('fx_rates', {'rates': {'usd': 2.0}, 'at': 1.0}, path)
+    assert read_state('fx_rates', path) == {'rates': {'usd': 2.0}, 'at': 1.0}